@@ -0,0 +1,232 @@
+import asyncio
+import os
+import weakref
+
+from ecs_connect_cli.session import DESCRIBE_SERVICES_BATCH
+from ecs_connect_cli.session import DESCRIBE_TASKS_BATCH
+from ecs_connect_cli.session import LIST_PAGE_SIZE
+from ecs_connect_cli.session import get_client
+from ecs_connect_cli.session import get_max_items
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+# One semaphore per event loop, asyncio primitives can't be shared between loops.
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_max_concurrency() -> int:
+    """Retrieve how many AWS calls the async backend issues at once
+
+    Returns:
+        int: ECS_CONNECT_MAX_CONCURRENCY
+    """
+    try:
+        return int(os.getenv("ECS_CONNECT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+    except ValueError:
+        return DEFAULT_MAX_CONCURRENCY
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(get_max_concurrency())
+    return _semaphores[loop]
+
+
+async def call(profile: str, resource: str, action: str, **params) -> dict:
+    """Run a boto3 call on a worker thread
+
+    Throttled calls are retried by the pooled client, see retry.get_retry_config.
+
+    Args:
+        profile (str): aws profile
+        resource (str): aws service name
+        action (str): boto3 action to call
+        **params: parameters of the boto3 action
+
+    Returns:
+        dict: JSON response from boto3 call
+    """
+    client = get_client(profile, resource)
+    async with _get_semaphore():
+        return await asyncio.to_thread(getattr(client, action), **params)
+
+
+async def paginate(
+    profile: str, resource: str, action: str, result_key: str, **params
+) -> list:
+    """Follow the nextToken of a call, LIST_PAGE_SIZE items per page, up to ECS_CONNECT_MAX_ITEMS items
+
+    Args:
+        profile (str): aws profile
+        resource (str): aws service name
+        action (str): boto3 action to call
+        result_key (str): key of the items in the response
+        **params: parameters of the boto3 action
+
+    Returns:
+        list: Items of every page
+    """
+    items = list()
+    max_items = get_max_items()
+    params.setdefault("maxResults", LIST_PAGE_SIZE)
+    next_token = None
+    while True:
+        if next_token:
+            params["nextToken"] = next_token
+        response = await call(profile, resource, action, **params)
+        items.extend(response[result_key])
+        next_token = response.get("nextToken")
+        if not next_token or len(items) >= max_items:
+            return items[:max_items]
+
+
+async def get_cluster_arn(profile: str) -> list:
+    """Retrieve cluster arn
+
+    Args:
+        profile (str): aws profile
+
+    Returns:
+        list: List of cluster(s) arn
+    """
+    return await paginate(profile, "ecs", "list_clusters", "clusterArns")
+
+
+async def get_service_arn(profile: str, cluster_name: str) -> list:
+    """Retrieve service arn from a cluster
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+
+    Returns:
+        list: List of service(s) arn
+    """
+    return await paginate(
+        profile, "ecs", "list_services", "serviceArns", cluster=cluster_name
+    )
+
+
+async def get_task_arn(profile: str, cluster_name: str, service_name: str) -> list:
+    """Retrieve task(s) arn from a service into a cluster
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+        service_name (str): name of the service to retrieve task
+
+    Returns:
+        list: List of task(s) arn
+    """
+    return await paginate(
+        profile,
+        "ecs",
+        "list_tasks",
+        "taskArns",
+        cluster=cluster_name,
+        serviceName=service_name,
+    )
+
+
+async def get_container_name(profile: str, cluster_name: str, task_name: str) -> list:
+    """Retrieve container name from task into a cluster
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+        task_name (str): name of the task to retrieve the container name
+
+    Returns:
+        list: List of container name
+    """
+    response = await call(
+        profile, "ecs", "describe_tasks", cluster=cluster_name, tasks=[task_name]
+    )
+
+    return [
+        container["name"]
+        for task in response["tasks"]
+        for container in task["containers"]
+    ]
+
+
+async def walk_task_arn(profile: str) -> dict:
+    """Retrieve the task arn of every service of every cluster, concurrently
+
+    Args:
+        profile (str): aws profile
+
+    Returns:
+        dict: {cluster arn: {service arn: [task arn]}}
+    """
+
+    async def _walk_service(cluster_arn: str, service_arn: str) -> list:
+        return await get_task_arn(
+            profile, cluster_arn, service_arn.rpartition("/")[2]
+        )
+
+    async def _walk_cluster(cluster_arn: str) -> dict:
+        service_arns = await get_service_arn(profile, cluster_arn)
+        task_arns = await asyncio.gather(
+            *(_walk_service(cluster_arn, service_arn) for service_arn in service_arns)
+        )
+        return dict(zip(service_arns, task_arns))
+
+    cluster_arns = await get_cluster_arn(profile)
+    services = await asyncio.gather(
+        *(_walk_cluster(cluster_arn) for cluster_arn in cluster_arns)
+    )
+    return dict(zip(cluster_arns, services))
+
+
+async def describe_services(profile: str, cluster_name: str, service_names: list) -> list:
+    """Describe services, 10 per call (the describe_services limit), concurrently
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster of the services
+        service_names (list): service arn or name to describe
+
+    Returns:
+        list: Service descriptions
+    """
+    responses = await asyncio.gather(
+        *(
+            call(
+                profile,
+                "ecs",
+                "describe_services",
+                cluster=cluster_name,
+                services=service_names[index : index + DESCRIBE_SERVICES_BATCH],
+            )
+            for index in range(0, len(service_names), DESCRIBE_SERVICES_BATCH)
+        )
+    )
+    return [service for response in responses for service in response["services"]]
+
+
+async def describe_tasks(profile: str, cluster_name: str, task_names: list) -> list:
+    """Describe tasks, 100 per call (the describe_tasks limit), concurrently
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster of the tasks
+        task_names (list): task arn or id to describe
+
+    Returns:
+        list: Task descriptions
+    """
+    responses = await asyncio.gather(
+        *(
+            call(
+                profile,
+                "ecs",
+                "describe_tasks",
+                cluster=cluster_name,
+                tasks=task_names[index : index + DESCRIBE_TASKS_BATCH],
+            )
+            for index in range(0, len(task_names), DESCRIBE_TASKS_BATCH)
+        )
+    )
+    return [task for response in responses for task in response["tasks"]]
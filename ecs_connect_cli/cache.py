@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+from typing import Callable
+
+# Default time to live (in seconds) of each level of the inventory,
+# clusters change rarely while tasks come and go with every deployment.
+DEFAULT_TTL = {
+    "clusters": 3600,
+    "services": 600,
+    "tasks": 30,
+    "regions": 604800,
+}
+
+# Default maximum age (in seconds) of the stale entries served while they are
+# revalidated, older entries are fetched again first. A task list a few minutes
+# old is still worth showing, a week old one lists tasks stopped long ago.
+DEFAULT_MAX_STALE = {
+    "clusters": 604800,
+    "services": 86400,
+    "tasks": 300,
+}
+
+# Default maximum size (in bytes) of each level of immutable entries,
+# the least recently used entries are evicted beyond it.
+DEFAULT_MAX_SIZE = {
+    "task_definitions": 20 * 1024 * 1024,
+}
+
+_state = {"refresh": False}
+
+
+def set_refresh(refresh: bool) -> None:
+    """Force (or not) a fresh fetch, ignoring cached entries
+
+    Args:
+        refresh (bool): True to bypass the cache
+    """
+    _state["refresh"] = refresh
+
+
+def get_refresh() -> bool:
+    """Tell if a fresh fetch was forced with --refresh"""
+    return _state["refresh"]
+
+
+def get_cache_dir() -> Path:
+    """Retrieve the directory of the on-disk cache
+
+    Returns:
+        Path: ECS_CONNECT_CACHE_DIR, or ecs-connect-cli under XDG_CACHE_HOME (~/.cache)
+    """
+    if os.getenv("ECS_CONNECT_CACHE_DIR"):
+        return Path(os.environ["ECS_CONNECT_CACHE_DIR"])
+
+    cache_home = os.getenv("XDG_CACHE_HOME") or f"{Path.home()}/.cache"
+    return Path(cache_home) / "ecs-connect-cli"
+
+
+def get_ttl(level: str) -> int:
+    """Retrieve the time to live of a level, see ECS_CONNECT_CACHE_TTL_<LEVEL>
+
+    Args:
+        level (str): cached level (clusters, services, tasks, ...)
+
+    Returns:
+        int: Time to live in seconds, 0 disables the cache for this level
+    """
+    try:
+        return int(
+            os.getenv(f"ECS_CONNECT_CACHE_TTL_{level.upper()}", DEFAULT_TTL.get(level, 0))
+        )
+    except ValueError:
+        return DEFAULT_TTL.get(level, 0)
+
+
+def get_max_stale(level: str) -> int:
+    """Retrieve the maximum age of the stale entries of a level, see ECS_CONNECT_CACHE_MAX_STALE_<LEVEL>
+
+    Args:
+        level (str): cached level (clusters, services, tasks, ...)
+
+    Returns:
+        int: Maximum age in seconds, 0 serves stale entries however old
+    """
+    try:
+        return int(
+            os.getenv(
+                f"ECS_CONNECT_CACHE_MAX_STALE_{level.upper()}",
+                DEFAULT_MAX_STALE.get(level, 0),
+            )
+        )
+    except ValueError:
+        return DEFAULT_MAX_STALE.get(level, 0)
+
+
+def _is_servable(level: str, entry: dict) -> bool:
+    """Tell if an entry is fresh, or stale but young enough to be served"""
+    max_stale = get_max_stale(level)
+    return max_stale <= 0 or time.time() - entry["updated_at"] < max(
+        max_stale, get_ttl(level)
+    )
+
+
+def get_max_size(level: str) -> int:
+    """Retrieve the maximum size of a level of immutable entries, see ECS_CONNECT_CACHE_MAX_SIZE_<LEVEL>
+
+    Args:
+        level (str): cached level (task_definitions, ...)
+
+    Returns:
+        int: Maximum size in bytes, 0 disables the cache for this level
+    """
+    try:
+        return int(
+            os.getenv(
+                f"ECS_CONNECT_CACHE_MAX_SIZE_{level.upper()}",
+                DEFAULT_MAX_SIZE.get(level, 0),
+            )
+        )
+    except ValueError:
+        return DEFAULT_MAX_SIZE.get(level, 0)
+
+
+def get_scope(profile: str, region_name: str = None) -> list:
+    """Retrieve the part of the cache key identifying the account
+
+    Args:
+        profile (str): aws profile
+        region_name (str, optional): aws region, resolved from the environment when not set. Defaults to None.
+
+    Returns:
+        list: profile, region and endpoint url in use
+    """
+    return [
+        profile,
+        region_name or os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION"),
+        os.getenv("ECS_CONNECT_AWS_ENDPOINT_URL") or os.getenv("AWS_ENDPOINT_URL"),
+    ]
+
+
+def _cache_path(level: str, key: list) -> Path:
+    digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+    return get_cache_dir() / level / f"{digest}.json"
+
+
+def read(level: str, key: list) -> dict:
+    """Read an entry of the cache
+
+    Args:
+        level (str): cached level
+        key (list): key of the entry
+
+    Returns:
+        dict: Entry with its "value" and its "updated_at" timestamp, None if missing
+    """
+    try:
+        with open(_cache_path(level, key), "r") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write(level: str, key: list, value, updated_at: float = None) -> None:
+    """Write an entry of the cache atomically
+
+    Args:
+        level (str): cached level
+        key (list): key of the entry
+        value: JSON serializable value to store
+        updated_at (float, optional): timestamp of the value. Defaults to now.
+    """
+    path = _cache_path(level, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            mode="w", dir=path.parent, suffix=".tmp", delete=False
+        ) as tf:
+            json.dump(
+                {
+                    "key": key,
+                    "updated_at": time.time() if updated_at is None else updated_at,
+                    "value": value,
+                },
+                tf,
+            )
+        os.replace(tf.name, path)
+    except OSError:
+        # The cache is an optimization, never fail a command because of it.
+        pass
+
+
+def _revalidate(level: str, key: list, fetch: Callable) -> threading.Thread:
+    def _refresh_entry():
+        try:
+            write(level, key, fetch())
+        except Exception:
+            # Keep serving the cached value, e.g. when working offline.
+            pass
+
+    thread = threading.Thread(target=_refresh_entry, daemon=True)
+    thread.start()
+    return thread
+
+
+def is_cached(level: str, key: list) -> bool:
+    """Check whether cached() would serve an entry without calling AWS
+
+    Args:
+        level (str): cached level
+        key (list): key of the entry
+
+    Returns:
+        bool: True if the entry can be served from the cache
+    """
+    if get_ttl(level) <= 0 or _state["refresh"]:
+        return False
+
+    entry = read(level, key)
+    return entry is not None and _is_servable(level, entry)
+
+
+def cached(level: str, key: list, fetch: Callable):
+    """Serve a value from the cache, fetching it when missing
+
+    Fresh entries are returned as is, stale entries are returned at once and
+    revalidated in the background for the next run, unless they are older
+    than ECS_CONNECT_CACHE_MAX_STALE_<LEVEL>: those are fetched again first.
+
+    Args:
+        level (str): cached level (clusters, services, tasks, ...)
+        key (list): key of the entry
+        fetch (Callable): function retrieving the value from AWS
+
+    Returns:
+        Cached or freshly fetched value
+    """
+    ttl = get_ttl(level)
+    if ttl <= 0:
+        return fetch()
+
+    if not _state["refresh"]:
+        entry = read(level, key)
+        if entry is not None and _is_servable(level, entry):
+            if time.time() - entry["updated_at"] >= ttl:
+                _revalidate(level, key, fetch)
+            return entry["value"]
+
+    value = fetch()
+    write(level, key, value)
+    return value
+
+
+def _evict(level: str, max_size: int) -> None:
+    """Remove the least recently used entries of a level until it fits in max_size"""
+    entries = list()
+    for path in (get_cache_dir() / level).glob("*.json"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    size = sum(entry_size for _, entry_size, _ in entries)
+    for _, entry_size, path in sorted(entries):
+        if size <= max_size:
+            return
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        size -= entry_size
+
+
+def cached_forever(level: str, key: list, fetch: Callable):
+    """Serve an immutable value from the cache, fetching it only the first time
+
+    Entries never expire, --refresh included. Each read marks the entry as
+    recently used, the least recently used entries are evicted once the level
+    grows beyond ECS_CONNECT_CACHE_MAX_SIZE_<LEVEL>.
+
+    Args:
+        level (str): cached level (task_definitions, ...)
+        key (list): key identifying the immutable value
+        fetch (Callable): function retrieving the value from AWS
+
+    Returns:
+        Cached or freshly fetched value
+    """
+    max_size = get_max_size(level)
+    if max_size <= 0:
+        return fetch()
+
+    entry = read(level, key)
+    if entry is not None:
+        try:
+            os.utime(_cache_path(level, key))
+        except OSError:
+            pass
+        return entry["value"]
+
+    value = fetch()
+    write(level, key, value)
+    _evict(level, max_size)
+    return value
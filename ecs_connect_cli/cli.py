@@ -1,57 +1,354 @@
 import json
 import os
 import sys
-import subprocess
 import time
 import typer
 
-from echoprompt import EchoPrompt
+from pathlib import Path
+
 from ecs_connect_cli import __app_name__, __version__
+from ecs_connect_cli import instrumentation
+from ecs_connect_cli.cache import set_refresh
+from ecs_connect_cli.daemon import serve
+from ecs_connect_cli.execute import get_session_command
+from ecs_connect_cli.execute import start_session
+from ecs_connect_cli.fanout import DEFAULT_CONCURRENCY
+from ecs_connect_cli.fanout import DEFAULT_TIMEOUT
+from ecs_connect_cli.fanout import print_summary
+from ecs_connect_cli.fanout import run_fan_out
+from ecs_connect_cli.find import DEFAULT_FIND_CONCURRENCY
+from ecs_connect_cli.find import iter_matches
+from ecs_connect_cli.logs import DEFAULT_BATCH_SIZE
+from ecs_connect_cli.logs import DEFAULT_POLL_MAX
+from ecs_connect_cli.logs import DEFAULT_POLL_MIN
+from ecs_connect_cli.logs import DEFAULT_EXPORT_CONCURRENCY
+from ecs_connect_cli.logs import DEFAULT_SLICE_MS
+from ecs_connect_cli.logs import build_log_sources
+from ecs_connect_cli.logs import export_log_events
+from ecs_connect_cli.logs import iter_merged_log_events
+from ecs_connect_cli.logs import parse_since
+from ecs_connect_cli.logs import tail_log_events
 from ecs_connect_cli.menu import make_choice
-from ecs_connect_cli.helpers import get_cluster_arn
-from ecs_connect_cli.helpers import get_service_arn
+from ecs_connect_cli.menu import make_choice_pages
+from ecs_connect_cli.readiness import check_exec_readiness
+from ecs_connect_cli.credentials import check_credentials
+from ecs_connect_cli.credentials import which_region
+from ecs_connect_cli.helpers import iter_cluster_arn
+from ecs_connect_cli.helpers import iter_service_arn
+from ecs_connect_cli.helpers import iter_task_arn
+from ecs_connect_cli.helpers import get_first_task_arn
+from ecs_connect_cli.helpers import get_service_name
 from ecs_connect_cli.helpers import get_task_arn
-from ecs_connect_cli.helpers import get_task_defintion_arn
-from ecs_connect_cli.helpers import get_log_group
+from ecs_connect_cli.helpers import describe_tasks
+from ecs_connect_cli.helpers import get_log_target
+from ecs_connect_cli.helpers import get_logged_container_name
 from ecs_connect_cli.helpers import get_secret_value
 from ecs_connect_cli.helpers import edit_secret_value
 from ecs_connect_cli.helpers import update_secret_string
 from ecs_connect_cli.helpers import is_json
 
-from deepdiff import DeepDiff
 from rich import print
+from typing import List
 from typing import Optional
 from typing_extensions import Annotated
 
 
 app = typer.Typer()
-prompt = EchoPrompt("ecs-connect")
+logs_app = typer.Typer(help="Search and export CloudWatch logs")
+app.add_typer(logs_app, name="logs")
+
+
+class _LazyPrompt:
+    """Create the prompt on first use, InquirerPy is slow to import"""
+
+    def __init__(self, store_name: str):
+        self._store_name = store_name
+        self._prompt = None
+
+    def __getattr__(self, name):
+        if self._prompt is None:
+            from ecs_connect_cli.picker import PickerPrompt
+
+            self._prompt = PickerPrompt(self._store_name)
+        return getattr(self._prompt, name)
+
+
+prompt = _LazyPrompt("ecs-connect")
+
+ProfileOption = Annotated[
+    Optional[str],
+    typer.Option(help="AWS profile to use, skip the credentials menus."),
+]
+RegionOption = Annotated[
+    Optional[str],
+    typer.Option(help="AWS region to use, EC2 instance metadata if no profile."),
+]
+ClusterOption = Annotated[Optional[str], typer.Option(help="Name of the cluster.")]
+ServiceOption = Annotated[Optional[str], typer.Option(help="Name of the service.")]
+TaskOption = Annotated[Optional[str], typer.Option(help="Task id or arn.")]
+ContainerOption = Annotated[Optional[str], typer.Option(help="Name of the container.")]
+TargetOption = Annotated[
+    Optional[str],
+    typer.Option(
+        help="Selector cluster/service:container, the first running task is used."
+    ),
+]
+
+
+def _select_profile(profile: str = None, region: str = None) -> str:
+    """Select the credentials to use, prompting only for what is missing
+
+    Args:
+        profile (str, optional): aws profile given as option. Defaults to None.
+        region (str, optional): aws region given as option. Defaults to None.
+
+    Returns:
+        str: aws profile or EC2_INSTANCE_METADATA
+    """
+    if region:
+        os.environ["AWS_DEFAULT_REGION"] = region
+    if profile:
+        return profile
+    if region:
+        return "EC2_INSTANCE_METADATA"
+
+    credentials_type = prompt.prompt_choice(
+        "credentials_type",
+        choices=("EC2_INSTANCE_METADATA", "AWS_CREDENTIALS_FILE"),
+    )
+    if credentials_type:
+        profile_name = credentials_type
+        if credentials_type == "AWS_CREDENTIALS_FILE":
+            profile_name = prompt.prompt_choice(
+                "profile_name", choices=make_choice(choice="profile_name")
+            )
+
+        else:
+            region = prompt.prompt_choice(
+                "region", choices=make_choice(choice="region")
+            )
+            if region:
+                os.environ["AWS_DEFAULT_REGION"] = region
+
+    return profile_name
+
+
+def _select_cluster(profile_name: str, cluster: str = None) -> str:
+    """Select the cluster, prompting only when not given as option"""
+    if cluster:
+        return cluster
+
+    return prompt.prompt_choice(
+        "cluster_name",
+        choices=make_choice_pages(choice="cluster_name", profile=profile_name),
+    )
+
+
+def _select_service(profile_name: str, cluster_name: str, service: str = None) -> str:
+    """Select the service, prompting only when not given as option"""
+    if service:
+        return service
+
+    return prompt.prompt_choice(
+        "service_name",
+        choices=make_choice_pages(
+            choice="service_name", profile=profile_name, cluster_name=cluster_name
+        ),
+    )
+
+
+def _parse_target(target: str) -> tuple:
+    """Split a cluster/service:container selector
+
+    Args:
+        target (str): selector, service and container are optional
+
+    Returns:
+        tuple: cluster, service and container names (None when missing)
+    """
+    path, _, container = target.partition(":")
+    cluster, _, service = path.partition("/")
+
+    return cluster or None, service or None, container or None
+
+
+def _select_container_name(
+    profile_name: str, cluster_name: str, task_name: str, container: str = None
+) -> str:
+    """Select the container of a task, prompting only when not given as option"""
+    if container:
+        return container
+
+    return prompt.prompt_choice(
+        "container_name",
+        choices=make_choice(
+            choice="container_name",
+            profile=profile_name,
+            cluster_name=cluster_name,
+            task_name=task_name,
+        ),
+    )
+
+
+def _select_container(
+    profile_name: str,
+    cluster: str = None,
+    service: str = None,
+    task: str = None,
+    container: str = None,
+    target: str = None,
+    select_container_name: bool = True,
+) -> tuple:
+    """Select the cluster, task and container, prompting only for what is missing
+
+    With a target selector, the first running task of the service is used
+    instead of the task menu.
+
+    Returns:
+        tuple: cluster name, task arn (or id) and container name
+    """
+    if target:
+        target_cluster, target_service, target_container = _parse_target(target)
+        cluster = cluster or target_cluster
+        service = service or target_service
+        container = container or target_container
+
+    cluster_name = _select_cluster(profile_name, cluster)
+
+    task_name = task
+    if not task_name and target and service:
+        task_name = get_first_task_arn(profile_name, cluster_name, service)
+        if not task_name:
+            print(f"[red]ERROR: No running task found for {target} ![/red]")
+            sys.exit(-1)
+
+    if not task_name:
+        service_name = _select_service(profile_name, cluster_name, service)
+        task_name = prompt.prompt_choice(
+            "task_arn",
+            choices=make_choice_pages(
+                choice="task_arn",
+                profile=profile_name,
+                cluster_name=cluster_name,
+                service_name=service_name,
+            ),
+        )
+
+    container_name = container
+    if select_container_name:
+        container_name = _select_container_name(
+            profile_name, cluster_name, task_name, container
+        )
+
+    return cluster_name, task_name, container_name
+
+
+def _select_service_tasks(
+    profile_name: str,
+    cluster: str = None,
+    service: str = None,
+    container: str = None,
+    target: str = None,
+    all_services: bool = False,
+) -> tuple:
+    """Select every task of a service (or of every service of the cluster)
+
+    Returns:
+        tuple: cluster name, list of task arn and container name (None if not given)
+    """
+    if target:
+        target_cluster, target_service, target_container = _parse_target(target)
+        cluster = cluster or target_cluster
+        service = service or target_service
+        container = container or target_container
+
+    cluster_name = _select_cluster(profile_name, cluster)
+    if all_services:
+        service_names = get_service_name(profile_name, cluster_name)
+    else:
+        service_names = [_select_service(profile_name, cluster_name, service)]
+
+    task_names = list()
+    for service_name in service_names:
+        task_names.extend(get_task_arn(profile_name, cluster_name, service_name))
+
+    if not task_names:
+        print(f"[red]ERROR: No running task found in {cluster_name} ![/red]")
+        sys.exit(-1)
+
+    return cluster_name, task_names, container
+
+
+def _select_log_targets(
+    profile_name: str,
+    cluster: str = None,
+    service: str = None,
+    task: str = None,
+    container: str = None,
+    target: str = None,
+    all_tasks: bool = False,
+    all_containers: bool = False,
+) -> list:
+    """Select the log group and log stream of one or several containers
+
+    Returns:
+        list: (log group, log stream) pairs
+    """
+    if all_tasks:
+        cluster_name, task_names, container_name = _select_service_tasks(
+            profile_name, cluster, service, container, target
+        )
+        if not all_containers:
+            container_name = _select_container_name(
+                profile_name, cluster_name, task_names[0], container_name
+            )
+    else:
+        cluster_name, task_name, container_name = _select_container(
+            profile_name,
+            cluster,
+            service,
+            task,
+            container,
+            target,
+            select_container_name=not all_containers,
+        )
+        task_names = [task_name]
+
+    if len(task_names) > 1:
+        # One batched call primes the memo read by every get_log_target
+        describe_tasks(profile_name, cluster_name, task_names)
+
+    log_targets = list()
+    logged_container_names = list()
+    for task_name in task_names:
+        if all_containers:
+            container_names = get_logged_container_name(
+                profile_name, cluster_name, task_name
+            )
+        else:
+            container_names = [container_name]
+        for name in container_names:
+            log_targets.append(
+                get_log_target(profile_name, cluster_name, task_name, name)
+            )
+            logged_container_names.append(name)
+
+    if len(log_targets) == 1:
+        print(f"Retrieving log for {logged_container_names[0]} ...")
+    else:
+        print(f"Retrieving log for {len(log_targets)} container(s) ...")
+
+    return log_targets
 
 
 @app.command()
-def list_cluster():
+def list_cluster(profile: ProfileOption = None, region: RegionOption = None):
     """List cluster into an AWS account"""
     try:
-        credentials_type = prompt.prompt_choice(
-            "credentials_type",
-            choices=("EC2_INSTANCE_METADATA", "AWS_CREDENTIALS_FILE"),
-        )
-        if credentials_type:
-            profile_name = credentials_type
-            if credentials_type == "AWS_CREDENTIALS_FILE":
-                profile_name = prompt.prompt_choice(
-                    "profile_name", choices=make_choice(choice="profile_name")
-                )
-
-            else:
-                region = prompt.prompt_choice(
-                    "region", choices=make_choice(choice="region")
-                )
-                if region:
-                    os.environ["AWS_DEFAULT_REGION"] = region
+        profile_name = _select_profile(profile, region)
 
         print("Cluster(s) ARN available in your account: ")
-        for cluster_arn in get_cluster_arn(profile_name):
+        for cluster_arn in iter_cluster_arn(profile_name):
             print(f"[green]{cluster_arn}[/green]")
 
     except (KeyboardInterrupt, TypeError):
@@ -60,35 +357,20 @@ def list_cluster():
 
 
 @app.command()
-def list_service():
+def list_service(
+    profile: ProfileOption = None,
+    region: RegionOption = None,
+    cluster: ClusterOption = None,
+):
     """List service(s) into a cluster"""
 
     try:
-        credentials_type = prompt.prompt_choice(
-            "credentials_type",
-            choices=("EC2_INSTANCE_METADATA", "AWS_CREDENTIALS_FILE"),
-        )
-        if credentials_type:
-            profile_name = credentials_type
-            if credentials_type == "AWS_CREDENTIALS_FILE":
-                profile_name = prompt.prompt_choice(
-                    "profile_name", choices=make_choice(choice="profile_name")
-                )
+        profile_name = _select_profile(profile, region)
 
-            else:
-                region = prompt.prompt_choice(
-                    "region", choices=make_choice(choice="region")
-                )
-                if region:
-                    os.environ["AWS_DEFAULT_REGION"] = region
-
-        cluster_name = prompt.prompt_choice(
-            "cluster_name",
-            choices=make_choice(choice="cluster_name", profile=profile_name),
-        )
+        cluster_name = _select_cluster(profile_name, cluster)
 
         print(f"Service(s) ARN in cluster {cluster_name}: ")
-        for service_arn in get_service_arn(profile_name, cluster_name):
+        for service_arn in iter_service_arn(profile_name, cluster_name):
             print(f"[green]{service_arn}[/green]")
 
     except (KeyboardInterrupt, TypeError):
@@ -97,41 +379,21 @@ def list_service():
 
 
 @app.command()
-def list_task():
+def list_task(
+    profile: ProfileOption = None,
+    region: RegionOption = None,
+    cluster: ClusterOption = None,
+    service: ServiceOption = None,
+):
     """List task(s) into a service into a cluster"""
     try:
-        credentials_type = prompt.prompt_choice(
-            "credentials_type",
-            choices=("EC2_INSTANCE_METADATA", "AWS_CREDENTIALS_FILE"),
-        )
-        if credentials_type:
-            profile_name = credentials_type
-            if credentials_type == "AWS_CREDENTIALS_FILE":
-                profile_name = prompt.prompt_choice(
-                    "profile_name", choices=make_choice(choice="profile_name")
-                )
-
-            else:
-                region = prompt.prompt_choice(
-                    "region", choices=make_choice(choice="region")
-                )
-                if region:
-                    os.environ["AWS_DEFAULT_REGION"] = region
+        profile_name = _select_profile(profile, region)
 
-        cluster_name = prompt.prompt_choice(
-            "cluster_name",
-            choices=make_choice(choice="cluster_name", profile=profile_name),
-        )
-
-        service_name = prompt.prompt_choice(
-            "service_name",
-            choices=make_choice(
-                choice="service_name", profile=profile_name, cluster_name=cluster_name
-            ),
-        )
+        cluster_name = _select_cluster(profile_name, cluster)
+        service_name = _select_service(profile_name, cluster_name, service)
 
         print(f"Task(s) ARN in cluster {cluster_name} and service {service_name}: ")
-        for task_arn in get_task_arn(
+        for task_arn in iter_task_arn(
             profile=profile_name, cluster_name=cluster_name, service_name=service_name
         ):
             print(f"[green]{task_arn}[/green]")
@@ -142,67 +404,26 @@ def list_task():
 
 
 @app.command("connect")
-def ecs_connect_cli():
+def ecs_connect_cli(
+    profile: ProfileOption = None,
+    region: RegionOption = None,
+    cluster: ClusterOption = None,
+    service: ServiceOption = None,
+    task: TaskOption = None,
+    container: ContainerOption = None,
+    target: TargetOption = None,
+):
     """Connect to an ECS Fargate container"""
 
     try:
-        credentials_type = prompt.prompt_choice(
-            "credentials_type",
-            choices=("EC2_INSTANCE_METADATA", "AWS_CREDENTIALS_FILE"),
-        )
-        if credentials_type:
-            profile_name = credentials_type
-            if credentials_type == "AWS_CREDENTIALS_FILE":
-                profile_name = prompt.prompt_choice(
-                    "profile_name", choices=make_choice(choice="profile_name")
-                )
-
-            else:
-                region = prompt.prompt_choice(
-                    "region", choices=make_choice(choice="region")
-                )
-                if region:
-                    os.environ["AWS_DEFAULT_REGION"] = region
-
-        cluster_name = prompt.prompt_choice(
-            "cluster_name",
-            choices=make_choice(choice="cluster_name", profile=profile_name),
-        )
-
-        service_name = prompt.prompt_choice(
-            "service_name",
-            choices=make_choice(
-                choice="service_name", profile=profile_name, cluster_name=cluster_name
-            ),
-        )
-
-        task_name = prompt.prompt_choice(
-            "task_arn",
-            choices=make_choice(
-                choice="task_arn",
-                profile=profile_name,
-                cluster_name=cluster_name,
-                service_name=service_name,
-            ),
-        )
+        profile_name = _select_profile(profile, region)
 
-        container_name = prompt.prompt_choice(
-            "container_name",
-            choices=make_choice(
-                choice="container_name",
-                profile=profile_name,
-                cluster_name=cluster_name,
-                task_name=task_name,
-            ),
+        cluster_name, task_name, container_name = _select_container(
+            profile_name, cluster, service, task, container, target
         )
 
         print(f"Connection to {container_name} ...")
-        command = f'aws ecs execute-command --cluster {cluster_name} --task {task_name} --container {container_name} --command "/bin/bash" --interactive'
-
-        if profile_name != "EC2_INSTANCE_METADATA":
-            command = f"{command} --profile {profile_name}"
-
-        subprocess.run(command, shell=True)
+        start_session(profile_name, cluster_name, task_name, container_name, "/bin/bash")
 
     except (KeyboardInterrupt, TypeError):
         print("Bye bye !")
@@ -210,76 +431,63 @@ def ecs_connect_cli():
 
 
 @app.command("tail")
-def tail_logs():
+def tail_logs(
+    profile: ProfileOption = None,
+    region: RegionOption = None,
+    cluster: ClusterOption = None,
+    service: ServiceOption = None,
+    task: TaskOption = None,
+    container: ContainerOption = None,
+    target: TargetOption = None,
+    since: str = typer.Option(
+        "10m", help="Start from this duration before now (30s, 10m, 2h, 1d)."
+    ),
+    follow: bool = typer.Option(True, help="Keep polling for new log events."),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE, help="Maximum number of log events fetched per call."
+    ),
+    poll_min: float = typer.Option(
+        DEFAULT_POLL_MIN, help="Shortest polling interval in seconds."
+    ),
+    poll_max: float = typer.Option(
+        DEFAULT_POLL_MAX, help="Longest polling interval in seconds, when idle."
+    ),
+    all_tasks: bool = typer.Option(
+        False, help="Merge the logs of every task of the service."
+    ),
+    all_containers: bool = typer.Option(
+        False, help="Merge the logs of every container of the task(s)."
+    ),
+):
     """Tail logs of a selected  ECS container"""
     try:
-        credentials_type = prompt.prompt_choice(
-            "credentials_type",
-            choices=("EC2_INSTANCE_METADATA", "AWS_CREDENTIALS_FILE"),
-        )
-        if credentials_type:
-            profile_name = credentials_type
-            if credentials_type == "AWS_CREDENTIALS_FILE":
-                profile_name = prompt.prompt_choice(
-                    "profile_name", choices=make_choice(choice="profile_name")
-                )
-
-            else:
-                region = prompt.prompt_choice(
-                    "region", choices=make_choice(choice="region")
-                )
-                if region:
-                    os.environ["AWS_DEFAULT_REGION"] = region
-
-        cluster_name = prompt.prompt_choice(
-            "cluster_name",
-            choices=make_choice(choice="cluster_name", profile=profile_name),
-        )
-
-        service_name = prompt.prompt_choice(
-            "service_name",
-            choices=make_choice(
-                choice="service_name", profile=profile_name, cluster_name=cluster_name
-            ),
-        )
-
-        task_name = prompt.prompt_choice(
-            "task_arn",
-            choices=make_choice(
-                choice="task_arn",
-                profile=profile_name,
-                cluster_name=cluster_name,
-                service_name=service_name,
-            ),
+        profile_name = _select_profile(profile, region)
+
+        log_targets = _select_log_targets(
+            profile_name,
+            cluster,
+            service,
+            task,
+            container,
+            target,
+            all_tasks,
+            all_containers,
         )
 
-        container_name = prompt.prompt_choice(
-            "container_name",
-            choices=make_choice(
-                choice="container_name",
-                profile=profile_name,
-                cluster_name=cluster_name,
-                task_name=task_name,
-            ),
-        )
-
-        task_defition_arn = get_task_defintion_arn(
-            profile=profile_name, cluster_name=cluster_name, task_name=task_name
-        )
-
-        log_group = get_log_group(
-            profile=profile_name,
-            container_name=container_name,
-            task_definition_arn=task_defition_arn,
+        tail_log_events(
+            iter_merged_log_events(
+                build_log_sources(
+                    profile_name,
+                    log_targets,
+                    start_time=parse_since(since),
+                    batch_size=batch_size,
+                ),
+                follow=follow,
+                poll_min=poll_min,
+                poll_max=poll_max,
+            )
         )
 
-        print(f"Retrieving log for {container_name} ...")
-        command = f"aws logs tail {log_group} --follow --color=on"
-        if profile_name != "EC2_INSTANCE_METADATA":
-            command = f"{command} --profile {profile_name}"
-
-        subprocess.run(command, shell=True)
-
     except (KeyboardInterrupt, TypeError):
         print("Bye bye !")
         sys.exit()
@@ -291,66 +499,64 @@ def exec_command(
     output_filename: Optional[str] = typer.Option(
         "", help="Filename to output results"
     ),
+    profile: ProfileOption = None,
+    region: RegionOption = None,
+    cluster: ClusterOption = None,
+    service: ServiceOption = None,
+    task: TaskOption = None,
+    container: ContainerOption = None,
+    target: TargetOption = None,
+    all_tasks: bool = typer.Option(
+        False, help="Run the command on every task of the service at once."
+    ),
+    all_services: bool = typer.Option(
+        False, help="Run the command on every task of every service of the cluster."
+    ),
+    concurrency: int = typer.Option(
+        DEFAULT_CONCURRENCY, help="Maximum number of tasks running the command at once."
+    ),
+    timeout: int = typer.Option(
+        DEFAULT_TIMEOUT, help="Seconds before the command of a task is killed."
+    ),
 ):
     """Execute a command with args and optionnal output file"""
     try:
-        credentials_type = prompt.prompt_choice(
-            "credentials_type",
-            choices=("EC2_INSTANCE_METADATA", "AWS_CREDENTIALS_FILE"),
-        )
-        if credentials_type:
-            profile_name = credentials_type
-            if credentials_type == "AWS_CREDENTIALS_FILE":
-                profile_name = prompt.prompt_choice(
-                    "profile_name", choices=make_choice(choice="profile_name")
-                )
-
-            else:
-                region = prompt.prompt_choice(
-                    "region", choices=make_choice(choice="region")
-                )
-                if region:
-                    os.environ["AWS_DEFAULT_REGION"] = region
-
-        cluster_name = prompt.prompt_choice(
-            "cluster_name",
-            choices=make_choice(choice="cluster_name", profile=profile_name),
-        )
-
-        service_name = prompt.prompt_choice(
-            "service_name",
-            choices=make_choice(
-                choice="service_name", profile=profile_name, cluster_name=cluster_name
-            ),
-        )
-
-        task_name = prompt.prompt_choice(
-            "task_arn",
-            choices=make_choice(
-                choice="task_arn",
-                profile=profile_name,
-                cluster_name=cluster_name,
-                service_name=service_name,
-            ),
-        )
+        profile_name = _select_profile(profile, region)
+
+        if all_tasks or all_services:
+            _fan_out_exec_command(
+                profile_name,
+                command,
+                output_filename,
+                all_services,
+                concurrency,
+                timeout,
+                cluster,
+                service,
+                container,
+                target,
+            )
+            return
 
-        container_name = prompt.prompt_choice(
-            "container_name",
-            choices=make_choice(
-                choice="container_name",
-                profile=profile_name,
-                cluster_name=cluster_name,
-                task_name=task_name,
-            ),
+        cluster_name, task_name, container_name = _select_container(
+            profile_name, cluster, service, task, container, target
         )
 
         print(f"Execute {command}")
-        command = f'aws ecs execute-command --cluster {cluster_name} --task {task_name} --container {container_name} --command "{command}" --interactive'
-        if profile_name != "EC2_INSTANCE_METADATA":
-            command = f"{command} --profile {profile_name}"
         if output_filename:
-            command = f"{command} > {output_filename}"
-        subprocess.run(command, shell=True)
+            with open(output_filename, "w") as output:
+                start_session(
+                    profile_name,
+                    cluster_name,
+                    task_name,
+                    container_name,
+                    command,
+                    stdout=output,
+                )
+        else:
+            start_session(
+                profile_name, cluster_name, task_name, container_name, command
+            )
 
     except (KeyboardInterrupt, TypeError):
         try:
@@ -362,27 +568,102 @@ def exec_command(
             pass
 
 
-@app.command("update-secret")
-def update_secret(secret_name: Annotated[str, typer.Argument()]):
-    """Update secret from secret manager"""
+def _get_single_container_name(task: dict, task_name: str) -> str:
+    """Retrieve the container of a task that has only one
+
+    Raises:
+        ValueError: when the task is gone or has several containers
+    """
+    if task is None:
+        raise ValueError(f"Task {task_name} not found")
+
+    container_names = [container["name"] for container in task.get("containers", [])]
+    if len(container_names) != 1:
+        raise ValueError(
+            f"Task {task_name} has {len(container_names)} containers "
+            f"({', '.join(container_names)}), use --container"
+        )
+
+    return container_names[0]
+
+
+def _fan_out_exec_command(
+    profile_name: str,
+    command: str,
+    output_filename: str,
+    all_services: bool,
+    concurrency: int,
+    timeout: int,
+    cluster: str = None,
+    service: str = None,
+    container: str = None,
+    target: str = None,
+) -> None:
+    """Execute a command on every task of a service (or of a cluster) at once"""
+    cluster_name, task_names, container_name = _select_service_tasks(
+        profile_name, cluster, service, container, target, all_services
+    )
+    # A single batched describe_tasks pass: the readiness of every task, the
+    # container menu and the sessions all read the memoized descriptions.
+    descriptions = {
+        task["taskArn"].rpartition("/")[2]: task
+        for task in describe_tasks(profile_name, cluster_name, task_names)
+    }
+    if all_services and not container_name:
+        # Services seldom share a container name: each task runs the command
+        # in its own container.
+        def _get_container_name(task_name: str) -> str:
+            return _get_single_container_name(
+                descriptions.get(task_name.rpartition("/")[2]), task_name
+            )
+
+    else:
+        container_name = _select_container_name(
+            profile_name, cluster_name, task_names[0], container_name
+        )
+
+        def _get_container_name(task_name: str) -> str:
+            return container_name
+
+    def _build_command(task_name: str) -> list:
+        task = descriptions.get(task_name.rpartition("/")[2])
+        if task is None:
+            raise ValueError(f"Task {task_name} not found")
+        task_container_name = _get_container_name(task_name)
+        # Not ready tasks fail without opening a session
+        check_exec_readiness(task, task_container_name)
+        return get_session_command(
+            profile_name, cluster_name, task_name, task_container_name, command
+        )
+
+    print(f"Execute {command} on {len(task_names)} task(s)")
+    output = open(output_filename, "w") if output_filename else None
     try:
-        credentials_type = prompt.prompt_choice(
-            "credentials_type",
-            choices=("EC2_INSTANCE_METADATA", "AWS_CREDENTIALS_FILE"),
+        results = run_fan_out(
+            task_names,
+            _build_command,
+            concurrency=concurrency,
+            timeout=timeout,
+            output=output,
         )
-        if credentials_type:
-            profile_name = credentials_type
-            if credentials_type == "AWS_CREDENTIALS_FILE":
-                profile_name = prompt.prompt_choice(
-                    "profile_name", choices=make_choice(choice="profile_name")
-                )
+    finally:
+        if output:
+            output.close()
+
+    print_summary(results)
+    if any(result["status"] != "OK" for result in results):
+        sys.exit(1)
 
-            else:
-                region = prompt.prompt_choice(
-                    "region", choices=make_choice(choice="region")
-                )
-                if region:
-                    os.environ["AWS_DEFAULT_REGION"] = region
+
+@app.command("update-secret")
+def update_secret(
+    secret_name: Annotated[str, typer.Argument()],
+    profile: ProfileOption = None,
+    region: RegionOption = None,
+):
+    """Update secret from secret manager"""
+    try:
+        profile_name = _select_profile(profile, region)
 
         # Retrieve secret string value
         initial_secret_value = get_secret_value(
@@ -411,6 +692,9 @@ def update_secret(secret_name: Annotated[str, typer.Argument()]):
 
         # Check if the file has been modified.
         if original_file_md5 != final_file_md5:
+            # Only needed here, deepdiff is slow to import
+            from deepdiff import DeepDiff
+
             diff = DeepDiff(initial_secret_value, updated_secret_string)
             print(diff)
             confirmation_choice = prompt.prompt_choice(
@@ -441,6 +725,211 @@ def update_secret(secret_name: Annotated[str, typer.Argument()]):
             pass
 
 
+@app.command("inventory")
+def inventory(
+    format: str = typer.Option("table", help="Output format: table, json or csv."),
+    profile: ProfileOption = None,
+    region: RegionOption = None,
+):
+    """Show every cluster, service and task of an AWS account"""
+    try:
+        if format not in ("table", "json", "csv"):
+            print(f"[red]ERROR: Unknown format {format} ![/red]")
+            sys.exit(-1)
+
+        profile_name = _select_profile(profile, region)
+
+        # The asynchronous backend is only needed here, asyncio is slow to import
+        import asyncio
+
+        from ecs_connect_cli.inventory import collect_inventory
+        from ecs_connect_cli.inventory import write_inventory
+
+        try:
+            records = asyncio.run(collect_inventory(profile_name))
+        except Exception as Err:
+            print(f"ERROR: {Err}")
+            exit(-1)
+
+        write_inventory(records, format)
+
+    except (KeyboardInterrupt, TypeError):
+        print("Bye bye !")
+        sys.exit()
+
+
+@app.command("daemon")
+def run_daemon(
+    profiles: List[str] = typer.Option(
+        None,
+        "--profile",
+        help="AWS profile to keep, repeat it for several. Defaults to every profile of the credentials file.",
+    ),
+    regions: List[str] = typer.Option(
+        None,
+        "--region",
+        help="AWS region to keep, repeat it for several. Defaults to AWS_REGION.",
+    ),
+    interval: int = typer.Option(
+        None, help="Seconds between two refreshes (ECS_CONNECT_DAEMON_INTERVAL)."
+    ),
+    events: Optional[str] = typer.Option(
+        None,
+        help="JSON lines file of ECS EventBridge events to apply between two refreshes (ECS_CONNECT_DAEMON_EVENTS).",
+    ),
+):
+    """Keep the inventory hot in the background and serve the menus over a Unix socket"""
+    try:
+        profiles = profiles or check_credentials()
+        region = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION")
+        regions = regions or ([region] if region else [])
+        if not regions:
+            print("[red]ERROR: No region given, use --region or AWS_REGION ![/red]")
+            sys.exit(-1)
+
+        try:
+            serve(profiles, regions, interval, Path(events) if events else None)
+        except RuntimeError as Err:
+            print(f"[red]ERROR: {Err} ![/red]")
+            sys.exit(-1)
+
+    except (KeyboardInterrupt, TypeError):
+        print("Bye bye !")
+        sys.exit()
+
+
+@app.command("find")
+def find(
+    pattern: str = typer.Argument(
+        ..., help="Part of a cluster name, service name or task id (case insensitive)."
+    ),
+    profiles: List[str] = typer.Option(
+        None,
+        "--profile",
+        help="AWS profile to search, repeat it for several. Defaults to every profile of the credentials file.",
+    ),
+    regions: List[str] = typer.Option(
+        None,
+        "--region",
+        help="AWS region to search, repeat it for several. Defaults to every region.",
+    ),
+    first: bool = typer.Option(False, help="Stop after the first match."),
+    concurrency: int = typer.Option(
+        DEFAULT_FIND_CONCURRENCY, help="Profile/region pairs searched at once."
+    ),
+    rate_limit: float = typer.Option(
+        None, help="AWS calls per second per profile (ECS_CONNECT_RATE_LIMIT)."
+    ),
+):
+    """Find which profile and region run a cluster, service or task"""
+    try:
+        profiles = profiles or check_credentials()
+        regions = regions or which_region()
+
+        print(
+            f"Searching {pattern} in {len(profiles)} profile(s) and {len(regions)} region(s) ..."
+        )
+        found = False
+        for match in iter_matches(
+            profiles,
+            regions,
+            pattern,
+            concurrency=concurrency,
+            rate_limit=rate_limit,
+            first=first,
+        ):
+            if "error" in match:
+                print(
+                    f"[red]ERROR: {match['profile']} {match['region']}: {match['error']}[/red]"
+                )
+                continue
+            found = True
+            path = "/".join(
+                match[key] for key in ("cluster", "service", "task") if match[key]
+            )
+            print(
+                f"[green]{match['profile']} {match['region']} {match['kind']} {path}[/green]"
+            )
+
+        if not found:
+            print(f"No cluster, service or task matching {pattern}")
+            sys.exit(1)
+
+    except (KeyboardInterrupt, TypeError):
+        print("Bye bye !")
+        sys.exit()
+
+
+@logs_app.command("export")
+def export_logs(
+    output: str = typer.Option(
+        ..., help="File to write the logs to as JSON lines, gzipped if it ends with .gz"
+    ),
+    since: str = typer.Option(
+        "1h", help="Start of the range, duration before now (10m, 2h, 1d) or date."
+    ),
+    until: str = typer.Option(
+        "0s", help="End of the range, duration before now (10m, 2h, 1d) or date."
+    ),
+    slice_minutes: int = typer.Option(
+        DEFAULT_SLICE_MS // 60000, help="Duration of each time slice fetched."
+    ),
+    concurrency: int = typer.Option(
+        DEFAULT_EXPORT_CONCURRENCY, help="Maximum number of slices fetched at once."
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE, help="Maximum number of log events fetched per call."
+    ),
+    resume: bool = typer.Option(
+        True, help="Resume an interrupted export from its checkpoint."
+    ),
+    profile: ProfileOption = None,
+    region: RegionOption = None,
+    cluster: ClusterOption = None,
+    service: ServiceOption = None,
+    task: TaskOption = None,
+    container: ContainerOption = None,
+    target: TargetOption = None,
+    all_tasks: bool = typer.Option(
+        False, help="Export the logs of every task of the service."
+    ),
+    all_containers: bool = typer.Option(
+        False, help="Export the logs of every container of the task(s)."
+    ),
+):
+    """Export a time range of logs of selected ECS containers to a file"""
+    try:
+        profile_name = _select_profile(profile, region)
+
+        log_targets = _select_log_targets(
+            profile_name,
+            cluster,
+            service,
+            task,
+            container,
+            target,
+            all_tasks,
+            all_containers,
+        )
+
+        count = export_log_events(
+            profile_name,
+            log_targets,
+            start_time=parse_since(since),
+            end_time=parse_since(until),
+            output_path=output,
+            slice_ms=slice_minutes * 60000,
+            concurrency=concurrency,
+            batch_size=batch_size,
+            resume=resume,
+        )
+        print(f"[green]{count} log event(s) exported to {output}[/green]")
+
+    except (KeyboardInterrupt, TypeError):
+        print("Bye bye !")
+        sys.exit()
+
+
 def _version_callback(value: bool) -> None:
     if value:
         typer.echo(f"{__app_name__} v{__version__}")
@@ -449,6 +938,7 @@ def _version_callback(value: bool) -> None:
 
 @app.callback()
 def main(
+    ctx: typer.Context,
     version: Optional[bool] = typer.Option(
         None,
         "--version",
@@ -456,6 +946,45 @@ def main(
         help="Show the application's version and exit.",
         callback=_version_callback,
         is_eager=True,
-    )
+    ),
+    refresh: bool = typer.Option(
+        False,
+        "--refresh",
+        help="Ignore the local inventory cache and fetch fresh data from AWS.",
+    ),
+    timings: bool = typer.Option(
+        False,
+        "--timings",
+        help="Print the time spent in each AWS operation when the command ends.",
+    ),
+    timings_export: Optional[str] = typer.Option(
+        None,
+        "--timings-export",
+        help="File to write every AWS call to, see --timings-format.",
+    ),
+    timings_format: str = typer.Option(
+        "jsonl",
+        "--timings-format",
+        help="Format of --timings-export: jsonl or otlp (OpenTelemetry spans).",
+    ),
 ) -> None:
-    return
+    set_refresh(refresh)
+
+    if timings_format not in ("jsonl", "otlp"):
+        print(f"[red]ERROR: Unknown timings format {timings_format} ![/red]")
+        raise typer.Exit(1)
+
+    if timings or timings_export:
+        instrumentation.enable()
+        ctx.call_on_close(
+            lambda: _report_timings(timings, timings_export, timings_format)
+        )
+
+
+def _report_timings(timings: bool, export: Optional[str], format: str) -> None:
+    calls = instrumentation.get_calls()
+    if export:
+        with open(export, "w") as output:
+            instrumentation.export_calls(calls, output, format)
+    if timings:
+        instrumentation.print_summary(calls)
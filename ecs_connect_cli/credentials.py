@@ -1,4 +1,3 @@
-import boto3
 import configparser
 import os
 
@@ -6,17 +5,38 @@ from genericpath import exists
 from pathlib import Path
 from rich.prompt import Prompt
 from rich import print
+from ecs_connect_cli import cache
+from ecs_connect_cli.session import get_client
+from ecs_connect_cli.session import get_endpoint_url
+
+
+def _bundled_regions() -> list:
+    """Retrieve the regions known by the endpoint data bundled with botocore"""
+    import boto3
+
+    return boto3.Session().get_available_regions("ec2")
+
+
+def _describe_regions() -> list:
+    """Retrieve the regions enabled for the account from EC2"""
+    client = get_client("EC2_INSTANCE_METADATA", "ec2", region_name="us-west-2")
+    return [region["RegionName"] for region in client.describe_regions()["Regions"]]
 
 
 def which_region() -> list:
     """Define which region you want to use
 
+    The list is served from the local cache, seeded with the regions bundled
+    with botocore and refreshed in the background from EC2 describe_regions.
+
     Returns:
         list: List of AWS region available
     """
-    client = boto3.client("ec2", region_name="us-west-2")
-    regions = [region["RegionName"] for region in client.describe_regions()["Regions"]]
-    return regions
+    key = [get_endpoint_url()]
+    if cache.read("regions", key) is None:
+        cache.write("regions", key, _bundled_regions(), updated_at=0)
+
+    return cache.cached("regions", key, _describe_regions)
 
 
 def which_credentials() -> list:
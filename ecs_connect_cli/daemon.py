@@ -0,0 +1,546 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from rich import print
+from ecs_connect_cli.cache import get_cache_dir
+from ecs_connect_cli.cache import get_scope
+from ecs_connect_cli.events import apply_events
+from ecs_connect_cli.events import get_events_path
+from ecs_connect_cli.events import read_events
+from ecs_connect_cli.helpers import get_task_label
+from ecs_connect_cli.session import DESCRIBE_SERVICES_BATCH
+from ecs_connect_cli.session import DESCRIBE_TASKS_BATCH
+from ecs_connect_cli.session import LIST_PAGE_SIZE
+from ecs_connect_cli.session import get_client
+from ecs_connect_cli.session import get_config_region
+
+DEFAULT_DAEMON_INTERVAL = 30
+DEFAULT_DAEMON_TIMEOUT = 0.5
+DEFAULT_DAEMON_CONCURRENCY = 8
+DEFAULT_DAEMON_FULL_REFRESH = 10
+# Snapshots older than this many intervals are not served anymore
+DAEMON_MAX_AGE_INTERVALS = 3
+# Seconds between two reads of the events file
+EVENTS_POLL_INTERVAL = 1.0
+
+# Menus the daemon can answer
+DAEMON_CHOICES = ("cluster_name", "service_name", "task_arn", "container_name")
+
+
+def get_socket_path() -> Path:
+    """Retrieve the Unix socket the daemon listens on
+
+    Returns:
+        Path: ECS_CONNECT_DAEMON_SOCKET, or daemon.sock in the cache directory
+    """
+    if os.getenv("ECS_CONNECT_DAEMON_SOCKET"):
+        return Path(os.environ["ECS_CONNECT_DAEMON_SOCKET"])
+
+    return get_cache_dir() / "daemon.sock"
+
+
+def get_daemon_interval() -> int:
+    """Retrieve how often the daemon refreshes the inventory
+
+    Returns:
+        int: ECS_CONNECT_DAEMON_INTERVAL, in seconds
+    """
+    try:
+        return int(os.getenv("ECS_CONNECT_DAEMON_INTERVAL", DEFAULT_DAEMON_INTERVAL))
+    except ValueError:
+        return DEFAULT_DAEMON_INTERVAL
+
+
+def get_daemon_timeout() -> float:
+    """Retrieve how long the cli waits for an answer of the daemon
+
+    Returns:
+        float: ECS_CONNECT_DAEMON_TIMEOUT, in seconds
+    """
+    try:
+        return float(os.getenv("ECS_CONNECT_DAEMON_TIMEOUT", DEFAULT_DAEMON_TIMEOUT))
+    except ValueError:
+        return DEFAULT_DAEMON_TIMEOUT
+
+
+def get_full_refresh() -> int:
+    """Retrieve how often the daemon walks the whole inventory again
+
+    Returns:
+        int: ECS_CONNECT_DAEMON_FULL_REFRESH, every how many refreshes, 1 to never walk incrementally
+    """
+    try:
+        return max(
+            1, int(os.getenv("ECS_CONNECT_DAEMON_FULL_REFRESH", DEFAULT_DAEMON_FULL_REFRESH))
+        )
+    except ValueError:
+        return DEFAULT_DAEMON_FULL_REFRESH
+
+
+def _iter_items(client, action: str, result_key: str, **params):
+    """Follow the nextToken of a call, LIST_PAGE_SIZE items per page"""
+    params.setdefault("maxResults", LIST_PAGE_SIZE)
+    while True:
+        response = getattr(client, action)(**params)
+        yield from response[result_key]
+        if not response.get("nextToken"):
+            return
+        params["nextToken"] = response["nextToken"]
+
+
+def _service_fingerprint(service: dict) -> str:
+    """Sum up what changes when the tasks of a service change: its deployments and task sets"""
+    return json.dumps(
+        [
+            service.get("updatedAt"),
+            [
+                [
+                    deployment.get(key)
+                    for key in (
+                        "id",
+                        "updatedAt",
+                        "taskDefinition",
+                        "desiredCount",
+                        "runningCount",
+                        "pendingCount",
+                        "rolloutState",
+                    )
+                ]
+                for deployment in service.get("deployments", [])
+            ],
+            [
+                [
+                    task_set.get(key)
+                    for key in (
+                        "id",
+                        "updatedAt",
+                        "taskDefinition",
+                        "runningCount",
+                        "pendingCount",
+                        "stabilityStatus",
+                    )
+                ]
+                for task_set in service.get("taskSets", [])
+            ],
+        ],
+        default=str,
+    )
+
+
+def _describe_tasks(client, cluster_name: str, task_arns: list) -> list:
+    tasks = list()
+    for index in range(0, len(task_arns), DESCRIBE_TASKS_BATCH):
+        tasks.extend(
+            client.describe_tasks(
+                cluster=cluster_name, tasks=task_arns[index : index + DESCRIBE_TASKS_BATCH]
+            )["tasks"]
+        )
+
+    return tasks
+
+
+def _walk_cluster(client, cluster_name: str, previous: dict = None) -> dict:
+    """List the services and describe the tasks of a cluster
+
+    Without a previous snapshot of the cluster, its tasks are listed at once
+    and grouped by service from their description, instead of one list_tasks
+    call per service. With one, only the tasks of the services whose
+    deployments or task sets changed since are listed and described again.
+    """
+    service_arns = list(
+        _iter_items(client, "list_services", "serviceArns", cluster=cluster_name)
+    )
+    # Same names as get_service_name
+    services = [service_arn.partition("/")[2] for service_arn in service_arns]
+    fingerprints = dict()
+    for index in range(0, len(service_arns), DESCRIBE_SERVICES_BATCH):
+        for service in client.describe_services(
+            cluster=cluster_name,
+            services=service_arns[index : index + DESCRIBE_SERVICES_BATCH],
+        )["services"]:
+            fingerprints[service["serviceArn"].partition("/")[2]] = _service_fingerprint(
+                service
+            )
+
+    walked = {
+        "services": services,
+        "fingerprints": fingerprints,
+        "tasks": {service: list() for service in services},
+        "descriptions": dict(),
+    }
+    if previous is None:
+        changed = services
+        task_arns = list(
+            _iter_items(client, "list_tasks", "taskArns", cluster=cluster_name)
+        )
+    else:
+        changed = list()
+        task_arns = list()
+        # Tasks not started by a service of the cluster are only listed again by a full walk
+        names = {service.rpartition("/")[2] for service in services}
+        for (cluster, task_id), task in list(previous["descriptions"].items()):
+            group = task.get("group", "")
+            if cluster == cluster_name and not (
+                group.startswith("service:") and group.partition(":")[2] in names
+            ):
+                walked["descriptions"][task_id] = task
+        for service in services:
+            fingerprint = fingerprints.get(service)
+            if fingerprint is None or previous["fingerprints"].get(
+                (cluster_name, service)
+            ) != fingerprint:
+                changed.append(service)
+                task_arns.extend(
+                    _iter_items(
+                        client,
+                        "list_tasks",
+                        "taskArns",
+                        cluster=cluster_name,
+                        serviceName=service.rpartition("/")[2],
+                    )
+                )
+                continue
+            # Unchanged, along with the task events applied to it
+            walked["tasks"][service] = previous["tasks"].get((cluster_name, service), [])
+            for task_arn in walked["tasks"][service]:
+                task_id = task_arn.rpartition("/")[2]
+                if (cluster_name, task_id) in previous["descriptions"]:
+                    walked["descriptions"][task_id] = previous["descriptions"][
+                        (cluster_name, task_id)
+                    ]
+
+    by_name = {service.rpartition("/")[2]: service for service in changed}
+    for task in _describe_tasks(client, cluster_name, list(dict.fromkeys(task_arns))):
+        # A task started by a service belongs to the group service:<name>
+        group = task.get("group", "")
+        service = by_name.get(group.partition(":")[2])
+        if previous is not None and not (group.startswith("service:") and service):
+            continue
+        walked["descriptions"][task["taskArn"].rpartition("/")[2]] = task
+        if group.startswith("service:") and service:
+            walked["tasks"][service].append(task["taskArn"])
+    walked["refreshed"] = len(changed)
+
+    return walked
+
+
+def walk_estate(
+    profile: str,
+    region: str,
+    concurrency: int = DEFAULT_DAEMON_CONCURRENCY,
+    previous: dict = None,
+) -> dict:
+    """Take a snapshot of the clusters, services and tasks of a profile and region
+
+    Given the previous snapshot, the walk is incremental: clusters and
+    services are listed again, but the tasks only of the services whose
+    deployments or task sets changed, the others are kept from it.
+
+    Args:
+        profile (str): aws profile
+        region (str): aws region
+        concurrency (int, optional): clusters walked at once. Defaults to 8.
+        previous (dict, optional): snapshot to diff against, a full walk when not set. Defaults to None.
+
+    Returns:
+        dict: time it was taken at, clusters, services per cluster, task arns per (cluster, service),
+            task descriptions per (cluster, task id), service fingerprints
+            per (cluster, service) and the number of services refetched
+    """
+    started = time.time()
+    client = get_client(profile, "ecs", region_name=region)
+    # Same names as get_cluster_name
+    clusters = [
+        cluster_arn.partition("/")[2]
+        for cluster_arn in _iter_items(client, "list_clusters", "clusterArns")
+    ]
+
+    snapshot = {
+        "taken_at": started,
+        "clusters": clusters,
+        "services": {},
+        "tasks": {},
+        "descriptions": {},
+        "fingerprints": {},
+        "refreshed": 0,
+    }
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        walked = executor.map(
+            lambda cluster_name: _walk_cluster(
+                client,
+                cluster_name,
+                previous
+                if previous is not None and cluster_name in previous["services"]
+                else None,
+            ),
+            clusters,
+        )
+        for cluster_name, cluster in zip(clusters, walked):
+            snapshot["services"][cluster_name] = cluster["services"]
+            snapshot["refreshed"] += cluster["refreshed"]
+            for service in cluster["services"]:
+                snapshot["tasks"][(cluster_name, service)] = cluster["tasks"][service]
+            for service, fingerprint in cluster["fingerprints"].items():
+                snapshot["fingerprints"][(cluster_name, service)] = fingerprint
+            for task_id, task in cluster["descriptions"].items():
+                snapshot["descriptions"][(cluster_name, task_id)] = task
+
+    return snapshot
+
+
+def lookup(
+    snapshot: dict,
+    choice: str,
+    cluster_name: str = None,
+    service_name: str = None,
+    task_name: str = None,
+    max_age: float = None,
+):
+    """Answer a menu from a snapshot, like make_choice does
+
+    Args:
+        max_age (float, optional): seconds after which the snapshot is too old to answer. Defaults to None.
+
+    Returns:
+        list: Menu choices, None when the snapshot doesn't hold them or is too old
+    """
+    if max_age is not None and time.time() - snapshot["taken_at"] > max_age:
+        return None
+
+    if choice == "cluster_name":
+        return snapshot["clusters"]
+
+    if choice == "service_name":
+        return snapshot["services"].get(cluster_name)
+
+    if choice == "task_arn":
+        task_arns = snapshot["tasks"].get((cluster_name, service_name))
+        if task_arns is None:
+            return None
+        descriptions = snapshot["descriptions"]
+        return [
+            {
+                "name": get_task_label(
+                    descriptions[(cluster_name, task_arn.rpartition("/")[2])]
+                ),
+                "value": task_arn,
+            }
+            for task_arn in task_arns
+        ]
+
+    if choice == "container_name" and task_name:
+        task = snapshot["descriptions"].get((cluster_name, task_name.rpartition("/")[2]))
+        if task is None:
+            return None
+        return [container["name"] for container in task.get("containers", [])]
+
+    return None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Answer a JSON request line with a JSON line holding the menu choices"""
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            profile, region, endpoint_url = request["scope"]
+            # Sent without region by a cli relying on the profile's config
+            region = region or self.server.regions.get(profile)
+            snapshot = self.server.snapshots.get((profile, region, endpoint_url))
+            value = None
+            if snapshot is not None:
+                value = lookup(
+                    snapshot,
+                    request["choice"],
+                    request.get("cluster_name"),
+                    request.get("service_name"),
+                    request.get("task_name"),
+                    self.server.max_age,
+                )
+            response = {"value": value}
+        except (KeyError, TypeError, ValueError) as Err:
+            response = {"error": str(Err)}
+        self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+def create_server(
+    socket_path: Path, snapshots: dict, regions: dict = None, max_age: float = None
+) -> socketserver.BaseServer:
+    """Listen on a Unix socket and answer the menus from the snapshots
+
+    Args:
+        socket_path (Path): Unix socket to listen on
+        snapshots (dict): snapshots keyed by scope tuple (profile, region, endpoint)
+        regions (dict, optional): region of each profile, for requests without one. Defaults to None.
+        max_age (float, optional): seconds after which a snapshot is not served anymore. Defaults to None.
+
+    Returns:
+        socketserver.BaseServer: server, to run with serve_forever()
+
+    Raises:
+        RuntimeError: when another daemon listens on the socket
+    """
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(str(socket_path))
+            except OSError:
+                # Left over by a daemon that was killed
+                socket_path.unlink()
+            else:
+                raise RuntimeError(f"A daemon already listens on {socket_path}")
+
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), _Handler)
+    server.daemon_threads = True
+    server.snapshots = snapshots
+    server.regions = regions or dict()
+    server.max_age = max_age
+    return server
+
+
+def serve(
+    profiles: list, regions: list, interval: int = None, events_path: Path = None
+) -> None:
+    """Keep the inventory of profiles and regions hot and answer the cli over a Unix socket
+
+    Every (profile, region) pair is walked again every interval seconds by a
+    thread of its own, through the pooled clients kept for the whole run.
+    The walks are incremental, but every ECS_CONNECT_DAEMON_FULL_REFRESH one.
+    Meanwhile, the ECS events appended to the events file are applied as they come.
+
+    Args:
+        profiles (list): aws profiles to keep
+        regions (list): aws regions to keep
+        interval (int, optional): seconds between two refreshes. Defaults to ECS_CONNECT_DAEMON_INTERVAL.
+        events_path (Path, optional): JSON lines file of EventBridge events. Defaults to ECS_CONNECT_DAEMON_EVENTS.
+    """
+    interval = get_daemon_interval() if interval is None else interval
+    events_path = get_events_path() if events_path is None else events_path
+    full_refresh = get_full_refresh()
+    socket_path = get_socket_path()
+    snapshots = dict()
+    stop = threading.Event()
+
+    def _refresh(profile: str, region: str) -> None:
+        scope = tuple(get_scope(profile, region))
+        snapshot = None
+        walks = 0
+        # Kept across walks, so that a late event can't bring back a stopped task
+        versions = dict()
+        pruned_versions = dict()
+        # Events older than the first walk are already in it
+        offset = events_path.stat().st_size if events_path and events_path.exists() else 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                full = snapshot is None or walks % full_refresh == 0
+                snapshot = walk_estate(
+                    profile, region, previous=None if full else snapshot
+                )
+                snapshots[scope] = snapshot
+                walks += 1
+                if full:
+                    # Forget the tasks gone and left unchanged for a whole full refresh
+                    for key, version in list(versions.items()):
+                        if (
+                            key not in snapshot["descriptions"]
+                            and pruned_versions.get(key) == version
+                        ):
+                            del versions[key]
+                    pruned_versions = dict(versions)
+                print(
+                    f"[green]{profile} {region}: {len(snapshot['clusters'])} cluster(s), "
+                    f"{len(snapshot['descriptions'])} task(s), "
+                    f"{snapshot['refreshed']}/{len(snapshot['fingerprints'])} service(s) "
+                    f"refetched in {time.perf_counter() - started:.1f}s[/green]"
+                )
+            except Exception as Err:
+                print(f"[red]ERROR: {profile} {region}: {Err}[/red]")
+
+            if not events_path:
+                stop.wait(interval)
+                continue
+
+            next_walk = time.monotonic() + interval
+            while time.monotonic() < next_walk:
+                if stop.wait(
+                    max(0, min(EVENTS_POLL_INTERVAL, next_walk - time.monotonic()))
+                ):
+                    break
+                events, offset = read_events(events_path, offset)
+                if events and snapshot is not None:
+                    apply_events(snapshot, events, region, versions)
+
+    # Without AWS_REGION, the cli leaves the region of the profile's config to the daemon
+    regions_of_profiles = dict()
+    for profile in profiles:
+        try:
+            regions_of_profiles[profile] = get_config_region(profile)
+        except Exception:
+            continue
+    server = create_server(
+        socket_path,
+        snapshots,
+        regions_of_profiles,
+        max_age=interval * DAEMON_MAX_AGE_INTERVALS if interval > 0 else None,
+    )
+    for profile in profiles:
+        for region in regions:
+            threading.Thread(target=_refresh, args=(profile, region), daemon=True).start()
+
+    # Remove the socket when stopped with kill as well as with Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+    print(f"Listening on {socket_path}, refreshing every {interval}s ...")
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+        try:
+            socket_path.unlink()
+        except OSError:
+            pass
+
+
+def query(
+    choice: str,
+    profile: str,
+    cluster_name: str = None,
+    service_name: str = None,
+    task_name: str = None,
+):
+    """Ask the daemon for a menu
+
+    Returns:
+        list: Menu choices, None when no daemon runs or it doesn't hold them
+    """
+    socket_path = get_socket_path()
+    if choice not in DAEMON_CHOICES or not socket_path.exists():
+        return None
+
+    request = {
+        "scope": get_scope(profile),
+        "choice": choice,
+        "cluster_name": cluster_name,
+        "service_name": service_name,
+        "task_name": task_name,
+    }
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(get_daemon_timeout())
+            client.connect(str(socket_path))
+            client.sendall((json.dumps(request) + "\n").encode())
+            with client.makefile("rb") as response:
+                return json.loads(response.readline()).get("value")
+    except (OSError, ValueError):
+        return None
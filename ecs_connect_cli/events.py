@@ -0,0 +1,155 @@
+import json
+import os
+
+from datetime import datetime
+from pathlib import Path
+
+TASK_STATE_CHANGE = "ECS Task State Change"
+# Events after which the tasks of a service are listed again
+SERVICE_EVENT_TYPES = ("ECS Service Action", "ECS Deployment State Change")
+
+
+def get_events_path():
+    """Retrieve the file the daemon reads the ECS events from
+
+    Returns:
+        Path: ECS_CONNECT_DAEMON_EVENTS, None when not set
+    """
+    if os.getenv("ECS_CONNECT_DAEMON_EVENTS"):
+        return Path(os.environ["ECS_CONNECT_DAEMON_EVENTS"])
+
+    return None
+
+
+def read_events(path: Path, offset: int = 0) -> tuple:
+    """Read the events appended to a JSON lines file since an offset
+
+    Every line is an EventBridge event, as delivered by a rule on the aws.ecs
+    source to a queue or a log file. A line not ended yet is left for the next read.
+
+    Args:
+        path (Path): JSON lines file
+        offset (int, optional): bytes already read. Defaults to 0.
+
+    Returns:
+        tuple: events read and the offset to read from next time
+    """
+    try:
+        with open(path, "rb") as events_file:
+            events_file.seek(0, os.SEEK_END)
+            if events_file.tell() < offset:
+                # Truncated or rotated, read it again from the start
+                offset = 0
+            events_file.seek(offset)
+            data = events_file.read()
+    except OSError:
+        return [], offset
+
+    end = data.rfind(b"\n") + 1
+    events = list()
+    for line in data[:end].splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+
+    return events, offset + end
+
+
+def _parse_times(task: dict) -> dict:
+    """Turn the ISO 8601 timestamps of an event into datetimes, as in describe_tasks"""
+    for key, value in task.items():
+        if key.endswith("At") and isinstance(value, str):
+            try:
+                task[key] = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                task[key] = None
+
+    return task
+
+
+def _apply_task_event(
+    snapshot: dict, cluster_name: str, task: dict, versions: dict
+) -> bool:
+    task_arn = task["taskArn"]
+    key = (cluster_name, task_arn.rpartition("/")[2])
+    # EventBridge doesn't keep the order: drop events older than the task known
+    version = task.get("version")
+    if version is not None:
+        known = max(
+            versions.get(key, -1),
+            snapshot["descriptions"].get(key, {}).get("version", -1),
+        )
+        if version <= known:
+            return False
+        versions[key] = version
+
+    group = task.get("group", "")
+    service = None
+    if group.startswith("service:"):
+        by_name = {
+            choice.rpartition("/")[2]: choice
+            for choice in snapshot["services"][cluster_name]
+        }
+        service = by_name.get(group.partition(":")[2])
+    task_arns = snapshot["tasks"].get((cluster_name, service), [])
+
+    # The lists are replaced, not changed, as menus are answered meanwhile
+    if "STOPPED" in (task.get("lastStatus"), task.get("desiredStatus")):
+        if service and task_arn in task_arns:
+            snapshot["tasks"][(cluster_name, service)] = [
+                arn for arn in task_arns if arn != task_arn
+            ]
+        snapshot["descriptions"].pop(key, None)
+        return True
+
+    snapshot["descriptions"][key] = _parse_times(task)
+    if service and task_arn not in task_arns:
+        snapshot["tasks"][(cluster_name, service)] = task_arns + [task_arn]
+    return True
+
+
+def apply_events(
+    snapshot: dict, events: list, region: str = None, versions: dict = None
+) -> int:
+    """Bring a daemon snapshot up to date from ECS events, without any AWS call
+
+    Task state changes add, update or remove the task, unless their detail
+    version is older than the last one applied to it. Service and deployment
+    events make the next incremental walk list the tasks of the service again.
+
+    Args:
+        snapshot (dict): snapshot taken by walk_estate, changed in place
+        events (list): EventBridge events
+        region (str, optional): region of the snapshot, events of others are skipped. Defaults to None.
+        versions (dict, optional): last version applied per (cluster, task id), kept across snapshots. Defaults to the snapshot's.
+
+    Returns:
+        int: number of events applied
+    """
+    versions = snapshot.setdefault("versions", dict()) if versions is None else versions
+    applied = 0
+    for event in events:
+        if region and event.get("region", region) != region:
+            continue
+
+        detail = event.get("detail") or {}
+        if event.get("detail-type") == TASK_STATE_CHANGE:
+            cluster_name = detail.get("clusterArn", "").partition("/")[2]
+            if (
+                cluster_name in snapshot["services"]
+                and detail.get("taskArn")
+                and _apply_task_event(snapshot, cluster_name, dict(detail), versions)
+            ):
+                applied += 1
+
+        elif event.get("detail-type") in SERVICE_EVENT_TYPES:
+            for resource in event.get("resources", []):
+                # Same names as get_service_name
+                service = resource.partition("/")[2]
+                if snapshot["fingerprints"].pop(
+                    (service.partition("/")[0], service), None
+                ):
+                    applied += 1
+
+    return applied
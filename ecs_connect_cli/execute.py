@@ -0,0 +1,112 @@
+import json
+import signal
+import subprocess
+
+from typing import TextIO
+
+from rich import print
+from ecs_connect_cli.helpers import describe_task
+from ecs_connect_cli.readiness import check_exec_readiness
+from ecs_connect_cli.session import get_client
+
+
+def get_session_command(
+    profile: str,
+    cluster_name: str,
+    task_name: str,
+    container_name: str,
+    command: str,
+) -> list:
+    """Open an ECS execute-command session and build its session-manager-plugin command line
+
+    This is what `aws ecs execute-command` does, without starting the aws cli
+    nor a shell. Tasks that can't run ECS Exec are rejected before any call,
+    from their memoized description.
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster of the task
+        task_name (str): task arn or id
+        container_name (str): name of the container to execute the command in
+        command (str): command to execute
+
+    Returns:
+        list: session-manager-plugin command line
+
+    Raises:
+        ExecNotReady: when the task or its ExecuteCommandAgent isn't ready
+    """
+    task = describe_task(profile, cluster_name, task_name)
+    check_exec_readiness(task, container_name)
+
+    client = get_client(profile, "ecs")
+    response = client.execute_command(
+        cluster=cluster_name,
+        task=task_name,
+        container=container_name,
+        command=command,
+        interactive=True,
+    )
+
+    runtime_id = None
+    for container in task["containers"]:
+        if container["name"] == container_name:
+            runtime_id = container.get("runtimeId")
+
+    target = "ecs:{}_{}_{}".format(
+        response["clusterArn"].rpartition("/")[2],
+        response["taskArn"].rpartition("/")[2],
+        runtime_id,
+    )
+
+    return [
+        "session-manager-plugin",
+        json.dumps(response["session"]),
+        client.meta.region_name,
+        "StartSession",
+        "" if profile == "EC2_INSTANCE_METADATA" else profile,
+        json.dumps({"Target": target}),
+        client.meta.endpoint_url,
+    ]
+
+
+def start_session(
+    profile: str,
+    cluster_name: str,
+    task_name: str,
+    container_name: str,
+    command: str,
+    stdout: TextIO = None,
+) -> int:
+    """Execute a command in a container through session-manager-plugin
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster of the task
+        task_name (str): task arn or id
+        container_name (str): name of the container to execute the command in
+        command (str): command to execute
+        stdout (TextIO, optional): file receiving the output. Defaults to the terminal.
+
+    Returns:
+        int: Exit code of session-manager-plugin
+    """
+    try:
+        args = get_session_command(
+            profile, cluster_name, task_name, container_name, command
+        )
+    except Exception as Err:
+        print(f"ERROR: {Err}")
+        exit(-1)
+
+    # Let Ctrl-C reach the remote command instead of killing the session.
+    sigint_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        return subprocess.run(args, stdout=stdout).returncode
+    except FileNotFoundError:
+        print(
+            "[red]ERROR: session-manager-plugin not found, please install it first ![/red]"
+        )
+        exit(-1)
+    finally:
+        signal.signal(signal.SIGINT, sigint_handler)
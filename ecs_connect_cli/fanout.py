@@ -0,0 +1,129 @@
+import subprocess
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from typing import Callable
+from typing import TextIO
+
+from rich import print
+from rich.table import Table
+
+DEFAULT_CONCURRENCY = 10
+DEFAULT_TIMEOUT = 300
+
+
+def _run_on_task(task_name: str, build_command: Callable, timeout: int) -> dict:
+    """Run a command for one task and collect its output
+
+    Args:
+        task_name (str): task arn or id
+        build_command (Callable): function returning the command line of the task
+        timeout (int): seconds before the command is killed
+
+    Returns:
+        dict: task, status, exit code, duration and output of the command
+    """
+    start = time.monotonic()
+    try:
+        completed = subprocess.run(
+            build_command(task_name),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout,
+        )
+        returncode = completed.returncode
+        status = "OK" if returncode == 0 else "FAILED"
+        output = completed.stdout
+    except subprocess.TimeoutExpired as Err:
+        returncode = None
+        status = "TIMEOUT"
+        output = Err.stdout or ""
+        if isinstance(output, bytes):
+            output = output.decode(errors="replace")
+    except Exception as Err:
+        returncode = None
+        status = "FAILED"
+        output = f"ERROR: {Err}\n"
+    except SystemExit as Err:
+        # The describe and session helpers exit on errors, fail this task only
+        returncode = None
+        status = "FAILED"
+        output = f"ERROR: session setup exited with status {Err.code}\n"
+
+    return {
+        "task": task_name,
+        "status": status,
+        "returncode": returncode,
+        "duration": time.monotonic() - start,
+        "output": output,
+    }
+
+
+def run_fan_out(
+    task_names: list,
+    build_command: Callable,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: int = DEFAULT_TIMEOUT,
+    output: TextIO = None,
+) -> list:
+    """Run the same command on several tasks at the same time
+
+    The output of each task is written, prefixed with the task id, as soon as
+    the task is done so that outputs of different tasks never interleave.
+
+    Args:
+        task_names (list): task arn (or id) to target
+        build_command (Callable): function returning the command line of a task,
+            called on the worker thread so that session setup runs in parallel too
+        concurrency (int, optional): maximum number of commands running at once. Defaults to 10.
+        timeout (int, optional): seconds before a command is killed. Defaults to 300.
+        output (TextIO, optional): where to write the outputs. Defaults to stdout.
+
+    Returns:
+        list: Result of each task, see _run_on_task
+    """
+    output = output or sys.stdout
+    results = list()
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        futures = [
+            executor.submit(_run_on_task, task_name, build_command, timeout)
+            for task_name in task_names
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            task_id = result["task"].rpartition("/")[2]
+            for line in result["output"].splitlines():
+                output.write(f"[{task_id}] {line}\n")
+            output.flush()
+            results.append(result)
+
+    return results
+
+
+def print_summary(results: list) -> None:
+    """Display the exit status and duration of each task
+
+    Args:
+        results (list): results returned by run_fan_out
+    """
+    table = Table(title="Summary")
+    table.add_column("Task")
+    table.add_column("Status")
+    table.add_column("Exit code", justify="right")
+    table.add_column("Duration", justify="right")
+
+    for result in sorted(results, key=lambda result: result["task"]):
+        color = "green" if result["status"] == "OK" else "red"
+        table.add_row(
+            result["task"].rpartition("/")[2],
+            f"[{color}]{result['status']}[/{color}]",
+            "-" if result["returncode"] is None else str(result["returncode"]),
+            f"{result['duration']:.1f}s",
+        )
+
+    print(table)
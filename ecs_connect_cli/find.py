@@ -0,0 +1,156 @@
+import queue
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from ecs_connect_cli.ratelimit import get_rate_limiter
+from ecs_connect_cli.session import DESCRIBE_TASKS_BATCH
+from ecs_connect_cli.session import LIST_PAGE_SIZE
+from ecs_connect_cli.session import get_client
+
+DEFAULT_FIND_CONCURRENCY = 16
+
+# Sentinel put on the queue by a worker once its (profile, region) is searched
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """Raised in a worker when the search was stopped"""
+
+
+def _iter_items(client, stop, action: str, result_key: str, **params):
+    """Follow the nextToken of a call, checking before each page if the search was stopped"""
+    params.setdefault("maxResults", LIST_PAGE_SIZE)
+    while True:
+        if stop.is_set():
+            raise _Stopped()
+        response = getattr(client, action)(**params)
+        yield from response[result_key]
+        if not response.get("nextToken"):
+            return
+        params["nextToken"] = response["nextToken"]
+
+
+def _search(profile: str, region: str, pattern: str, stop, put) -> None:
+    """Search the clusters, services and tasks of one profile and region
+
+    The running tasks of a cluster are listed at once, only the matching tasks
+    are described to find their service.
+    """
+    client = get_client(profile, "ecs", region_name=region)
+    pattern = pattern.lower()
+
+    def _match(kind: str, cluster: str, service: str = None, task: str = None):
+        put(
+            {
+                "profile": profile,
+                "region": region,
+                "kind": kind,
+                "cluster": cluster,
+                "service": service,
+                "task": task,
+            }
+        )
+
+    for cluster_arn in _iter_items(
+        client, stop, "list_clusters", "clusterArns"
+    ):
+        cluster_name = cluster_arn.rpartition("/")[2]
+        if pattern in cluster_name.lower():
+            _match("cluster", cluster_name)
+
+        for service_arn in _iter_items(
+            client, stop, "list_services", "serviceArns", cluster=cluster_arn
+        ):
+            service_name = service_arn.rpartition("/")[2]
+            if pattern in service_name.lower():
+                _match("service", cluster_name, service_name)
+
+        task_arns = [
+            task_arn
+            for task_arn in _iter_items(
+                client, stop, "list_tasks", "taskArns", cluster=cluster_arn
+            )
+            if pattern in task_arn.rpartition("/")[2].lower()
+        ]
+        for index in range(0, len(task_arns), DESCRIBE_TASKS_BATCH):
+            if stop.is_set():
+                raise _Stopped()
+            response = client.describe_tasks(
+                cluster=cluster_arn,
+                tasks=task_arns[index : index + DESCRIBE_TASKS_BATCH],
+            )
+            for task in response["tasks"]:
+                group = task.get("group", "")
+                _match(
+                    "task",
+                    cluster_name,
+                    group.partition(":")[2] if group.startswith("service:") else None,
+                    task["taskArn"].rpartition("/")[2],
+                )
+
+
+def iter_matches(
+    profiles: list,
+    regions: list,
+    pattern: str,
+    concurrency: int = DEFAULT_FIND_CONCURRENCY,
+    rate_limit: float = None,
+    first: bool = False,
+) -> Iterator[dict]:
+    """Search clusters, services and tasks across profiles and regions at the same time
+
+    Every (profile, region) pair is searched by a worker of the pool, the calls
+    against one profile share the same token bucket whatever the region, see
+    retry.limit_rate.
+    Matches are yielded as soon as they are found, a pair that can't be
+    searched (missing credentials, disabled region, ...) yields an error record.
+
+    Args:
+        profiles (list): aws profiles to search
+        regions (list): aws regions to search
+        pattern (str): case insensitive part of a cluster, service name or task id
+        concurrency (int, optional): number of pairs searched at once. Defaults to 16.
+        rate_limit (float, optional): calls per second per profile. Defaults to ECS_CONNECT_RATE_LIMIT.
+        first (bool, optional): stop the search after the first match. Defaults to False.
+
+    Yields:
+        Iterator[dict]: profile, region, kind, cluster, service and task of a match,
+            or profile, region and error
+    """
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def _worker(profile: str, region: str) -> None:
+        try:
+            _search(profile, region, pattern, stop, results.put)
+        except _Stopped:
+            pass
+        except Exception as Err:
+            results.put({"profile": profile, "region": region, "error": str(Err)})
+        finally:
+            results.put(_DONE)
+
+    for profile in profiles:
+        # The pooled clients of a profile take their tokens from this bucket
+        get_rate_limiter(profile, rate_limit)
+
+    pairs = [(profile, region) for profile in profiles for region in regions]
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        for profile, region in pairs:
+            executor.submit(_worker, profile, region)
+
+        pending = len(pairs)
+        while pending:
+            result = results.get()
+            if result is _DONE:
+                pending -= 1
+                continue
+            yield result
+            if first and "error" not in result:
+                return
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
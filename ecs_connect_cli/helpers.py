@@ -2,10 +2,79 @@ import tempfile
 import os
 import json
 import hashlib
+import re
+from datetime import datetime
 from subprocess import call
+from typing import Iterator
+from ecs_connect_cli.cache import cached_forever
+from ecs_connect_cli.readiness import get_exec_agent_status
+from ecs_connect_cli.readiness import get_exec_problems
+from ecs_connect_cli.session import DESCRIBE_TASKS_BATCH
+from ecs_connect_cli.session import get_endpoint_url
 from ecs_connect_cli.session import get_session
+from ecs_connect_cli.session import iter_pages
 from rich import print
 
+# Per-run memoization of describe_tasks and describe_task_definition responses,
+# so every helper needing a task or its definition shares a single API call.
+_task_descriptions = {}
+_task_definitions = {}
+
+# Full arn of a task definition revision, whose content is immutable
+TASK_DEFINITION_REVISION_ARN = re.compile(r"^arn:[^:]+:ecs:[^:]+:\d+:task-definition/[^:]+:\d+$")
+# Timestamps of a task definition, stored as ISO 8601 strings in the on-disk cache
+TASK_DEFINITION_TIMES = ("registeredAt", "deregisteredAt")
+
+
+def iter_cluster_arn(profile: str) -> Iterator[str]:
+    """Stream cluster arn page by page
+
+    Args:
+        profile (str): aws profile
+
+    Yields:
+        str: Cluster arn
+    """
+    for page in iter_pages(profile=profile, resource="ecs", action="list_clusters"):
+        yield from page
+
+
+def iter_service_arn(profile: str, cluster_name: str) -> Iterator[str]:
+    """Stream service arn from a cluster page by page
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+
+    Yields:
+        str: Service arn
+    """
+    for page in iter_pages(
+        profile=profile, resource="ecs", action="list_services", cluster=cluster_name
+    ):
+        yield from page
+
+
+def iter_task_arn(profile: str, cluster_name: str, service_name: str) -> Iterator[str]:
+    """Stream task(s) arn from a service into a cluster page by page
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+        service_name (str): name of the service to retrieve task
+
+    Yields:
+        str: Task arn
+    """
+    for page in iter_pages(
+        profile=profile,
+        resource="ecs",
+        action="list_tasks",
+        cluster=cluster_name,
+        serviceName=service_name,
+    ):
+        yield from page
+
 
 def get_cluster_arn(profile: str) -> list:
     """Retrieve cluster arn
@@ -16,11 +85,7 @@ def get_cluster_arn(profile: str) -> list:
     Returns:
         list: List of cluster(s) arn
     """
-    cluster_response = get_session(
-        profile=profile, resource="ecs", action="list_clusters"
-    )
-
-    return cluster_response["clusterArns"]
+    return list(iter_cluster_arn(profile))
 
 
 def get_service_arn(profile: str, cluster_name: str) -> list:
@@ -33,14 +98,7 @@ def get_service_arn(profile: str, cluster_name: str) -> list:
     Returns:
         list: List of service(s) arn
     """
-    service_response = get_session(
-        profile=profile,
-        resource="ecs",
-        cluster_name=cluster_name,
-        action="list_services",
-    )
-
-    return service_response["serviceArns"]
+    return list(iter_service_arn(profile, cluster_name))
 
 
 def get_task_arn(profile: str, cluster_name: str, service_name: str) -> list:
@@ -54,15 +112,195 @@ def get_task_arn(profile: str, cluster_name: str, service_name: str) -> list:
     Returns:
         list: List of task(s) arn
     """
-    task_response = get_session(
+    return list(iter_task_arn(profile, cluster_name, service_name))
+
+
+def get_first_task_arn(profile: str, cluster_name: str, service_name: str) -> str:
+    """Retrieve the first running task arn of a service with a single call
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+        service_name (str): name of the service to retrieve task
+
+    Returns:
+        str: Task arn, None if the service has no running task
+    """
+    for page in iter_pages(
         profile=profile,
         resource="ecs",
-        cluster_name=cluster_name,
-        service_name=service_name,
         action="list_tasks",
-    )
+        max_items=1,
+        cluster=cluster_name,
+        serviceName=service_name,
+        desiredStatus="RUNNING",
+    ):
+        for task_arn in page:
+            return task_arn
+
+    return None
+
+
+def describe_tasks(profile: str, cluster_name: str, task_names: list) -> list:
+    """Retrieve the description of tasks, DESCRIBE_TASKS_BATCH per call, memoized for the whole run
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+        task_names (list): task ids or task arns to describe
+
+    Returns:
+        list: Task descriptions from describe_tasks, in the order of task_names,
+            without the tasks that don't exist anymore
+    """
+    keys = [(profile, cluster_name, task_name.rpartition("/")[2]) for task_name in task_names]
+    missing = [
+        task_name
+        for task_name, key in zip(task_names, keys)
+        if key not in _task_descriptions
+    ]
+    for index in range(0, len(missing), DESCRIBE_TASKS_BATCH):
+        task_response = get_session(
+            profile=profile,
+            resource="ecs",
+            cluster_name=cluster_name,
+            task_names=missing[index : index + DESCRIBE_TASKS_BATCH],
+            action="describe_tasks",
+        )
+        for task in task_response["tasks"]:
+            key = (profile, cluster_name, task["taskArn"].rpartition("/")[2])
+            _task_descriptions[key] = task
 
-    return task_response["taskArns"]
+    return [_task_descriptions[key] for key in keys if key in _task_descriptions]
+
+
+def describe_task(profile: str, cluster_name: str, task_name: str) -> dict:
+    """Retrieve the description of a task, memoized for the whole run
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+        task_name (str): task id or task arn to describe
+
+    Returns:
+        dict: Task description from describe_tasks
+    """
+    tasks = describe_tasks(profile, cluster_name, [task_name])
+    if not tasks:
+        print(f"[red]ERROR: Task {task_name} not found in {cluster_name} ![/red]")
+        print("Bye Bye !")
+        exit(-1)
+
+    return tasks[0]
+
+
+def get_task_label(task: dict) -> str:
+    """Describe a task on one line: id, status, health, start, revision, AZ and exec agent
+
+    Tasks ECS Exec can't connect to are marked [no exec].
+
+    Args:
+        task (dict): Task description from describe_tasks
+
+    Returns:
+        str: Label of the task in the menu
+    """
+    started_at = task.get("startedAt")
+    label = [
+        task["taskArn"].rpartition("/")[2],
+        task.get("lastStatus", "UNKNOWN"),
+        task.get("healthStatus", "UNKNOWN"),
+        started_at.strftime("%Y-%m-%d %H:%M") if started_at else "-",
+        task.get("taskDefinitionArn", "").rpartition("/")[2] or "-",
+        task.get("availabilityZone", "-"),
+        f"exec:{get_exec_agent_status(task)}",
+    ]
+    if get_exec_problems(task):
+        label.append("[no exec]")
+
+    return "  ".join(label)
+
+
+def get_task_choices(profile: str, cluster_name: str, task_arns: list) -> list:
+    """Retrieve the task menu choices, labelled with a single describe_tasks call
+
+    Only the first DESCRIBE_TASKS_BATCH tasks are labelled, the others are
+    displayed by id. The descriptions are memoized, so the container and task
+    definition lookups of the selected task don't call AWS again.
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster to retrieve service
+        task_arns (list): task arns to display
+
+    Returns:
+        list: Choices with the task label as name and the task arn as value
+    """
+    labels = {
+        task["taskArn"]: get_task_label(task)
+        for task in describe_tasks(
+            profile, cluster_name, task_arns[:DESCRIBE_TASKS_BATCH]
+        )
+    }
+
+    return [
+        {"name": labels.get(task_arn, task_arn.rpartition("/")[2]), "value": task_arn}
+        for task_arn in task_arns
+    ]
+
+
+def describe_task_definition(profile: str, task_definition_arn: str) -> dict:
+    """Retrieve a task definition, memoized for the whole run
+
+    A revision arn (family:N) never changes, its task definition is also
+    kept in the on-disk cache, keyed by the arn, and served without calling
+    AWS in later runs.
+
+    Args:
+        profile (str): aws profile
+        task_definition_arn (str): task definition arn to describe
+
+    Returns:
+        dict: Task definition from describe_task_definition
+    """
+    key = (profile, task_definition_arn)
+    if key not in _task_definitions:
+
+        def _fetch():
+            return get_session(
+                profile=profile,
+                resource="ecs",
+                task_definition_arn=task_definition_arn,
+                action="describe_task_definition",
+            )["taskDefinition"]
+
+        def _fetch_serializable():
+            task_definition = _fetch()
+            for name in TASK_DEFINITION_TIMES:
+                if isinstance(task_definition.get(name), datetime):
+                    task_definition[name] = task_definition[name].isoformat()
+            return task_definition
+
+        # A local stand-in reuses revision arns once restarted
+        if TASK_DEFINITION_REVISION_ARN.match(task_definition_arn) and not get_endpoint_url():
+            task_definition = cached_forever(
+                "task_definitions", [task_definition_arn], _fetch_serializable
+            )
+            # Same types as a fresh describe_task_definition
+            for name in TASK_DEFINITION_TIMES:
+                if isinstance(task_definition.get(name), str):
+                    task_definition[name] = datetime.fromisoformat(task_definition[name])
+            _task_definitions[key] = task_definition
+        else:
+            _task_definitions[key] = _fetch()
+
+    return _task_definitions[key]
+
+
+def clear_describe_cache() -> None:
+    """Forget every memoized task and task definition description"""
+    _task_descriptions.clear()
+    _task_definitions.clear()
 
 
 def get_container_name(profile: str, cluster_name: str, task_name: str) -> list:
@@ -78,17 +316,8 @@ def get_container_name(profile: str, cluster_name: str, task_name: str) -> list:
     """
     list_container_name = list()
 
-    container_response = get_session(
-        profile=profile,
-        resource="ecs",
-        cluster_name=cluster_name,
-        task_name=task_name,
-        action="describe_tasks",
-    )
-
-    for task in container_response["tasks"]:
-        for container in task["containers"]:
-            list_container_name.append(container["name"])
+    for container in describe_task(profile, cluster_name, task_name)["containers"]:
+        list_container_name.append(container["name"])
 
     return list_container_name
 
@@ -104,38 +333,28 @@ def get_task_defintion_arn(profile: str, cluster_name: str, task_name: str) -> s
     Returns:
         str: Task definition arn
     """
-    container_response = get_session(
-        profile=profile,
-        resource="ecs",
-        cluster_name=cluster_name,
-        task_name=task_name,
-        action="describe_tasks",
-    )
-    return container_response["tasks"][0]["taskDefinitionArn"]
+    return describe_task(profile, cluster_name, task_name)["taskDefinitionArn"]
 
 
-def get_log_group(profile: str, container_name: str, task_definition_arn: str) -> str:
-    """Retrieve the log group of task definition to get cloudwatch logs
+def get_log_configuration(
+    profile: str, container_name: str, task_definition_arn: str
+) -> dict:
+    """Retrieve the awslogs options of a container from its task definition
 
     Args:
         profile (str): aws profile
         container_name (str): name of the container to target in task definition
-        task_definition_arn (str): task definition arn to retrieve log group
+        task_definition_arn (str): task definition arn to retrieve log configuration
 
     Returns:
-        str: Log group name
+        dict: awslogs options (awslogs-group, awslogs-stream-prefix, ...)
     """
-    log_group_response = get_session(
-        profile=profile,
-        resource="ecs",
-        task_definition_arn=task_definition_arn,
-        action="describe_task_definition",
-    )
+    task_definition = describe_task_definition(profile, task_definition_arn)
 
-    for container in log_group_response["taskDefinition"]["containerDefinitions"]:
+    for container in task_definition["containerDefinitions"]:
         if container["name"] == container_name:
             if "logConfiguration" in container:
-                return container["logConfiguration"]["options"]["awslogs-group"]
+                return container["logConfiguration"]["options"]
             else:
                 print(
                     f"[red]ERROR: LogConfiguration not found for {container_name} ![/red]"
@@ -143,6 +362,85 @@ def get_log_group(profile: str, container_name: str, task_definition_arn: str) -
                 print("Bye Bye !")
                 exit(-1)
 
+    print(
+        f"[red]ERROR: Container {container_name} not found in task definition {task_definition_arn} ![/red]"
+    )
+    print("Bye Bye !")
+    exit(-1)
+
+
+def get_log_group(profile: str, container_name: str, task_definition_arn: str) -> str:
+    """Retrieve the log group of task definition to get cloudwatch logs
+
+    Args:
+        profile (str): aws profile
+        container_name (str): name of the container to target in task definition
+        task_definition_arn (str): task definition arn to retrieve log group
+
+    Returns:
+        str: Log group name
+    """
+    return get_log_configuration(profile, container_name, task_definition_arn)[
+        "awslogs-group"
+    ]
+
+
+def get_logged_container_name(profile: str, cluster_name: str, task_name: str) -> list:
+    """Retrieve the name of the containers of a task having a log configuration
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster of the task
+        task_name (str): task arn or id
+
+    Returns:
+        list: List of container name
+    """
+    task_definition = describe_task_definition(
+        profile, get_task_defintion_arn(profile, cluster_name, task_name)
+    )
+
+    return [
+        container["name"]
+        for container in task_definition["containerDefinitions"]
+        if "logConfiguration" in container
+    ]
+
+
+def get_log_target(
+    profile: str, cluster_name: str, task_name: str, container_name: str
+) -> tuple:
+    """Retrieve the log group and the log stream of a container of a task
+
+    The awslogs driver names the stream prefix/container-name/task-id.
+
+    Args:
+        profile (str): aws profile
+        cluster_name (str): name of the cluster of the task
+        task_name (str): task arn or id
+        container_name (str): name of the container
+
+    Returns:
+        tuple: Log group name and log stream name (None without awslogs-stream-prefix)
+    """
+    options = get_log_configuration(
+        profile,
+        container_name,
+        get_task_defintion_arn(profile, cluster_name, task_name),
+    )
+
+    log_stream_name = None
+    if options.get("awslogs-stream-prefix"):
+        log_stream_name = "/".join(
+            [
+                options["awslogs-stream-prefix"],
+                container_name,
+                task_name.rpartition("/")[2],
+            ]
+        )
+
+    return options["awslogs-group"], log_stream_name
+
 
 def get_cluster_name(profile: str) -> list:
     """Retrieve list of cluster name from aws profile
@@ -0,0 +1,295 @@
+import json
+import os
+import threading
+import time
+
+from typing import TextIO
+
+from rich import print
+from rich.table import Table
+
+from ecs_connect_cli.retry import THROTTLING_ERROR_CODES
+
+# Key of the per call data stored in the botocore request context
+_CONTEXT_KEY = "ecs_connect_instrumentation"
+
+_state = {"enabled": False}
+_calls = []
+_calls_lock = threading.Lock()
+
+
+def enable(enabled: bool = True) -> None:
+    """Record (or not) every AWS call made by the clients created from now on
+
+    Args:
+        enabled (bool, optional): True to record the calls. Defaults to True.
+    """
+    _state["enabled"] = enabled
+
+
+def is_enabled() -> bool:
+    return _state["enabled"]
+
+
+def get_calls() -> list:
+    """Retrieve the recorded calls
+
+    Returns:
+        list: One dict per call with service, operation, region, start time,
+            duration, retries, throttles, request and response sizes, status and error
+    """
+    with _calls_lock:
+        return list(_calls)
+
+
+def clear() -> None:
+    """Forget the recorded calls"""
+    with _calls_lock:
+        _calls.clear()
+
+
+def _before_call(model, context, **kwargs) -> None:
+    context[_CONTEXT_KEY] = {
+        "start_time": time.time(),
+        "started": time.perf_counter(),
+        "request_bytes": 0,
+        "throttles": 0,
+    }
+
+
+def _before_send(request, **kwargs) -> None:
+    call = request.context.get(_CONTEXT_KEY)
+    if call is not None and request.body:
+        # Sent again on each retry
+        call["request_bytes"] += len(request.body)
+
+
+def _needs_retry(response, request_dict, **kwargs) -> None:
+    call = request_dict["context"].get(_CONTEXT_KEY)
+    if call is None or response is None:
+        return
+    code = response[1].get("Error", {}).get("Code")
+    if code in THROTTLING_ERROR_CODES:
+        call["throttles"] += 1
+
+
+def _record(client, model, context, status, error, retries, response_bytes) -> None:
+    call = context.pop(_CONTEXT_KEY, None)
+    if call is None:
+        return
+    with _calls_lock:
+        _calls.append(
+            {
+                "service": model.service_model.service_name,
+                "operation": model.name,
+                "region": client.meta.region_name,
+                "start_time": call["start_time"],
+                "duration": time.perf_counter() - call["started"],
+                "retries": retries,
+                "throttles": call["throttles"],
+                "request_bytes": call["request_bytes"],
+                "response_bytes": response_bytes,
+                "status": status,
+                "error": error,
+            }
+        )
+
+
+def instrument(client) -> None:
+    """Record the calls of a boto3 client through botocore event hooks
+
+    Args:
+        client (botocore.client.BaseClient): boto3 client
+    """
+
+    def _after_call(http_response, parsed, model, context, **kwargs):
+        _record(
+            client,
+            model,
+            context,
+            http_response.status_code,
+            parsed.get("Error", {}).get("Code"),
+            parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+            int(http_response.headers.get("content-length", 0)),
+        )
+
+    def _after_call_error(exception, model, context, **kwargs):
+        _record(client, model, context, None, type(exception).__name__, 0, 0)
+
+    events = client.meta.events
+    events.register("before-call", _before_call, unique_id=f"{_CONTEXT_KEY}-before-call")
+    events.register("before-send", _before_send, unique_id=f"{_CONTEXT_KEY}-before-send")
+    events.register("needs-retry", _needs_retry, unique_id=f"{_CONTEXT_KEY}-needs-retry")
+    events.register("after-call", _after_call, unique_id=f"{_CONTEXT_KEY}-after-call")
+    events.register(
+        "after-call-error", _after_call_error, unique_id=f"{_CONTEXT_KEY}-after-call-error"
+    )
+
+
+def summarize(calls: list) -> list:
+    """Aggregate calls per service and operation, slowest total first
+
+    Args:
+        calls (list): recorded calls
+
+    Returns:
+        list: One dict per operation with its call count, total, average and max
+            duration, retries, throttles, errors and bytes received
+    """
+    operations = dict()
+    for call in calls:
+        key = (call["service"], call["operation"])
+        summary = operations.setdefault(
+            key,
+            {
+                "service": call["service"],
+                "operation": call["operation"],
+                "calls": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "retries": 0,
+                "throttles": 0,
+                "errors": 0,
+                "response_bytes": 0,
+            },
+        )
+        summary["calls"] += 1
+        summary["total"] += call["duration"]
+        summary["max"] = max(summary["max"], call["duration"])
+        summary["retries"] += call["retries"]
+        summary["throttles"] += call["throttles"]
+        summary["errors"] += 1 if call["error"] else 0
+        summary["response_bytes"] += call["response_bytes"]
+
+    for summary in operations.values():
+        summary["average"] = summary["total"] / summary["calls"]
+
+    return sorted(operations.values(), key=lambda summary: -summary["total"])
+
+
+def print_summary(calls: list) -> None:
+    """Print the time spent per AWS operation"""
+    summaries = summarize(calls)
+    table = Table(
+        title=f"{len(calls)} AWS call(s), {sum(call['duration'] for call in calls):.3f}s"
+    )
+    for column in (
+        "Operation",
+        "Calls",
+        "Total (s)",
+        "Avg (ms)",
+        "Max (ms)",
+        "Retries",
+        "Throttles",
+        "Errors",
+        "Received (KB)",
+    ):
+        if column == "Operation":
+            table.add_column(column, no_wrap=True)
+        else:
+            table.add_column(column, justify="right")
+    for summary in summaries:
+        table.add_row(
+            f"{summary['service']}.{summary['operation']}",
+            str(summary["calls"]),
+            f"{summary['total']:.3f}",
+            f"{summary['average'] * 1000:.1f}",
+            f"{summary['max'] * 1000:.1f}",
+            str(summary["retries"]),
+            str(summary["throttles"]),
+            str(summary["errors"]),
+            f"{summary['response_bytes'] / 1024:.1f}",
+        )
+    print(table)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(calls: list) -> dict:
+    """Convert calls to OpenTelemetry spans, in the OTLP/JSON format
+
+    Every call is a client span of a single trace, named after the
+    operation and described with the rpc.* and aws.* semantic conventions.
+
+    Args:
+        calls (list): recorded calls
+
+    Returns:
+        dict: OTLP/JSON ExportTraceServiceRequest
+    """
+    trace_id = os.urandom(16).hex()
+    spans = list()
+    for call in calls:
+        start = int(call["start_time"] * 1e9)
+        attributes = {
+            "rpc.system": "aws-api",
+            "rpc.service": call["service"],
+            "rpc.method": call["operation"],
+            "aws.region": call["region"],
+            "aws.retries": call["retries"],
+            "aws.throttles": call["throttles"],
+            "http.request.body.size": call["request_bytes"],
+            "http.response.body.size": call["response_bytes"],
+        }
+        if call["status"] is not None:
+            attributes["http.response.status_code"] = call["status"]
+        if call["error"]:
+            attributes["error.type"] = call["error"]
+        spans.append(
+            {
+                "traceId": trace_id,
+                "spanId": os.urandom(8).hex(),
+                "name": f"{call['service']}.{call['operation']}",
+                # SPAN_KIND_CLIENT
+                "kind": 3,
+                "startTimeUnixNano": str(start),
+                "endTimeUnixNano": str(start + int(call["duration"] * 1e9)),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in attributes.items()
+                    if value is not None
+                ],
+                # STATUS_CODE_ERROR or STATUS_CODE_UNSET
+                "status": {"code": 2, "message": call["error"]}
+                if call["error"]
+                else {"code": 0},
+            }
+        )
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": "ecs-connect-cli"}}
+                    ]
+                },
+                "scopeSpans": [
+                    {"scope": {"name": "ecs_connect_cli.instrumentation"}, "spans": spans}
+                ],
+            }
+        ]
+    }
+
+
+def export_calls(calls: list, output: TextIO, format: str = "jsonl") -> None:
+    """Write the calls as JSON lines or as OpenTelemetry spans (OTLP/JSON)
+
+    Args:
+        calls (list): recorded calls
+        output (TextIO): where to write
+        format (str, optional): jsonl or otlp. Defaults to "jsonl".
+    """
+    if format == "otlp":
+        json.dump(to_otlp(calls), output)
+        output.write("\n")
+        return
+
+    for call in calls:
+        output.write(json.dumps(call) + "\n")
@@ -0,0 +1,145 @@
+import asyncio
+import csv
+import json
+import sys
+
+from typing import TextIO
+
+from rich import print
+from rich.table import Table
+from ecs_connect_cli import async_helpers
+from ecs_connect_cli.readiness import get_exec_problems
+
+INVENTORY_FIELDS = (
+    "cluster",
+    "service",
+    "task",
+    "status",
+    "health",
+    "revision",
+    "launch_type",
+    "containers",
+    "exec",
+)
+
+
+def _task_record(cluster_name: str, service_name: str, task: dict, service: dict = None) -> dict:
+    """Flatten a task description into an inventory record"""
+    problems = get_exec_problems(task, service=service)
+    return {
+        "cluster": cluster_name,
+        "service": service_name,
+        "task": task["taskArn"].rpartition("/")[2],
+        "status": task.get("lastStatus"),
+        "health": task.get("healthStatus"),
+        "revision": task["taskDefinitionArn"].rpartition("/")[2],
+        "launch_type": task.get("launchType") or task.get("capacityProviderName"),
+        "containers": [container["name"] for container in task.get("containers", [])],
+        "exec": "; ".join(problems) if problems else "ready",
+    }
+
+
+async def _collect_cluster(profile: str, cluster_arn: str) -> list:
+    """Collect the services and tasks of a cluster with batched describe calls"""
+    cluster_name = cluster_arn.rpartition("/")[2]
+    service_arns, task_arns = await asyncio.gather(
+        async_helpers.get_service_arn(profile, cluster_arn),
+        async_helpers.paginate(
+            profile, "ecs", "list_tasks", "taskArns", cluster=cluster_arn
+        ),
+    )
+    services, tasks = await asyncio.gather(
+        async_helpers.describe_services(profile, cluster_arn, service_arns),
+        async_helpers.describe_tasks(profile, cluster_arn, task_arns),
+    )
+
+    # A task started by a service belongs to the group service:<name>
+    tasks_by_service = dict()
+    for task in tasks:
+        group = task.get("group", "")
+        service_name = group.partition(":")[2] if group.startswith("service:") else None
+        tasks_by_service.setdefault(service_name, []).append(task)
+
+    records = list()
+    for service in services:
+        service_tasks = tasks_by_service.pop(service["serviceName"], [])
+        for task in service_tasks:
+            records.append(
+                _task_record(cluster_name, service["serviceName"], task, service)
+            )
+        if not service_tasks:
+            records.append(
+                {
+                    "cluster": cluster_name,
+                    "service": service["serviceName"],
+                    "task": None,
+                    "status": service.get("status"),
+                    "health": None,
+                    "revision": service.get("taskDefinition", "").rpartition("/")[2],
+                    "launch_type": service.get("launchType"),
+                    "containers": [],
+                    "exec": None,
+                }
+            )
+
+    # Standalone tasks (run-task, scheduled tasks, ...)
+    for service_name, standalone_tasks in tasks_by_service.items():
+        for task in standalone_tasks:
+            records.append(_task_record(cluster_name, service_name, task))
+
+    return records
+
+
+async def collect_inventory(profile: str) -> list:
+    """Walk every cluster, service and task of an account concurrently
+
+    Services are described 10 per call and tasks 100 per call, the running
+    tasks of a cluster are listed at once instead of service by service.
+
+    Args:
+        profile (str): aws profile
+
+    Returns:
+        list: One record per task (or per service without task)
+    """
+    cluster_arns = await async_helpers.get_cluster_arn(profile)
+    clusters = await asyncio.gather(
+        *(_collect_cluster(profile, cluster_arn) for cluster_arn in cluster_arns)
+    )
+    return [record for records in clusters for record in records]
+
+
+def write_inventory(records: list, format: str = "table", output: TextIO = None) -> None:
+    """Write the inventory as a table, JSON or CSV
+
+    Args:
+        records (list): records returned by collect_inventory
+        format (str, optional): table, json or csv. Defaults to "table".
+        output (TextIO, optional): where to write json and csv. Defaults to stdout.
+    """
+    output = output or sys.stdout
+
+    if format == "json":
+        json.dump(records, output, indent=4)
+        output.write("\n")
+
+    elif format == "csv":
+        writer = csv.DictWriter(output, fieldnames=INVENTORY_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(dict(record, containers=" ".join(record["containers"])))
+
+    else:
+        table = Table(title=f"{len(records)} task(s)")
+        for field in INVENTORY_FIELDS:
+            table.add_column(field.replace("_", " ").title())
+        for record in records:
+            table.add_row(
+                *(
+                    ", ".join(record[field])
+                    if field == "containers"
+                    else str(record[field] or "-")
+                    for field in INVENTORY_FIELDS
+                )
+            )
+        print(table)
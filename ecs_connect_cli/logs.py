@@ -0,0 +1,421 @@
+import gzip
+import heapq
+import json
+import shutil
+import sys
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import Iterator
+from typing import TextIO
+
+from ecs_connect_cli.session import get_client
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_POLL_MIN = 0.5
+DEFAULT_POLL_MAX = 10.0
+DEFAULT_SEEN_EVENTS = 10000
+DEFAULT_SLICE_MS = 300000
+DEFAULT_EXPORT_CONCURRENCY = 8
+# Maximum number of log streams of a filter_log_events call
+MAX_LOG_STREAMS = 100
+
+
+class SeenEvents:
+    """Bounded set of the last event ids, to drop events fetched twice"""
+
+    def __init__(self, maxsize: int = DEFAULT_SEEN_EVENTS):
+        self.maxsize = maxsize
+        self._event_ids = OrderedDict()
+
+    def add(self, event_id: str) -> bool:
+        """Remember an event id
+
+        Returns:
+            bool: False if the event was already seen
+        """
+        if event_id in self._event_ids:
+            return False
+
+        self._event_ids[event_id] = None
+        if len(self._event_ids) > self.maxsize:
+            self._event_ids.popitem(last=False)
+        return True
+
+
+class LogSource:
+    """Log group (optionally restricted to some log streams) polled with filter_log_events"""
+
+    def __init__(
+        self,
+        profile: str,
+        log_group: str,
+        log_stream_names: list = None,
+        start_time: int = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        end_time: int = None,
+    ):
+        self.client = get_client(profile, "logs")
+        self.params = {"logGroupName": log_group, "limit": batch_size}
+        if log_stream_names:
+            self.params["logStreamNames"] = log_stream_names
+        if end_time is not None:
+            self.params["endTime"] = end_time
+        self.start_time = (
+            int(time.time() * 1000) if start_time is None else start_time
+        )
+        self.seen = SeenEvents()
+
+    def poll(self) -> Iterator[dict]:
+        """Fetch the events received since the previous poll, in timestamp order
+
+        Each poll restarts from the timestamp of the last event, so events
+        sharing that timestamp are fetched again and dropped by event id.
+
+        Yields:
+            dict: Log event (timestamp, message, logStreamName, eventId)
+        """
+        next_token = None
+        latest = self.start_time
+        while True:
+            call_params = dict(self.params, startTime=self.start_time)
+            if next_token:
+                call_params["nextToken"] = next_token
+            try:
+                response = self.client.filter_log_events(**call_params)
+            except Exception as Err:
+                print(f"ERROR: {Err}")
+                exit(-1)
+
+            for event in response["events"]:
+                if self.seen.add(event["eventId"]):
+                    latest = max(latest, event["timestamp"])
+                    yield event
+
+            next_token = response.get("nextToken")
+            if not next_token:
+                break
+
+        self.start_time = latest
+
+
+def build_log_sources(
+    profile: str,
+    log_targets: list,
+    start_time: int = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    end_time: int = None,
+) -> list:
+    """Group log streams by log group, in chunks of the filter_log_events limit
+
+    Args:
+        profile (str): aws profile
+        log_targets (list): (log group, log stream) pairs, a None log stream means the whole group
+        start_time (int, optional): epoch in milliseconds of the first event. Defaults to now.
+        batch_size (int, optional): events fetched per call. Defaults to 1000.
+        end_time (int, optional): epoch in milliseconds after the last event. Defaults to None.
+
+    Returns:
+        list: LogSource to poll
+    """
+    log_streams = dict()
+    for log_group, log_stream_name in log_targets:
+        if log_stream_name is None:
+            log_streams[log_group] = None
+        elif log_streams.get(log_group, []) is not None:
+            log_streams.setdefault(log_group, [])
+            if log_stream_name not in log_streams[log_group]:
+                log_streams[log_group].append(log_stream_name)
+
+    sources = list()
+    for log_group, log_stream_names in log_streams.items():
+        if log_stream_names is None:
+            sources.append(
+                LogSource(profile, log_group, None, start_time, batch_size, end_time)
+            )
+            continue
+        for index in range(0, len(log_stream_names), MAX_LOG_STREAMS):
+            sources.append(
+                LogSource(
+                    profile,
+                    log_group,
+                    log_stream_names[index : index + MAX_LOG_STREAMS],
+                    start_time,
+                    batch_size,
+                    end_time,
+                )
+            )
+
+    return sources
+
+
+def iter_merged_log_events(
+    sources: list,
+    follow: bool = True,
+    poll_min: float = DEFAULT_POLL_MIN,
+    poll_max: float = DEFAULT_POLL_MAX,
+) -> Iterator[dict]:
+    """Merge the events of several log sources into one time ordered feed
+
+    Each poll is a k-way merge of the sources, streamed without buffering.
+    While following, the polling interval doubles (up to poll_max) as long as
+    no event arrives and drops back to poll_min as soon as one does.
+
+    Args:
+        sources (list): LogSource to poll
+        follow (bool, optional): keep polling for new events. Defaults to True.
+        poll_min (float, optional): shortest polling interval in seconds. Defaults to 0.5.
+        poll_max (float, optional): longest polling interval in seconds. Defaults to 10.
+
+    Yields:
+        dict: Log event (timestamp, message, logStreamName, eventId)
+    """
+    interval = poll_min
+    while True:
+        received = False
+        for event in heapq.merge(
+            *(source.poll() for source in sources), key=lambda event: event["timestamp"]
+        ):
+            received = True
+            yield event
+
+        if not follow:
+            return
+
+        interval = poll_min if received else min(interval * 2, poll_max)
+        time.sleep(interval)
+
+
+def iter_log_events(
+    profile: str,
+    log_group: str,
+    log_stream_names: list = None,
+    start_time: int = None,
+    follow: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    poll_min: float = DEFAULT_POLL_MIN,
+    poll_max: float = DEFAULT_POLL_MAX,
+) -> Iterator[dict]:
+    """Stream the events of a log group with filter_log_events
+
+    Args:
+        profile (str): aws profile
+        log_group (str): name of the log group
+        log_stream_names (list, optional): restrict to these log streams. Defaults to None.
+        start_time (int, optional): epoch in milliseconds of the first event. Defaults to now.
+        follow (bool, optional): keep polling for new events. Defaults to True.
+        batch_size (int, optional): events fetched per call. Defaults to 1000.
+        poll_min (float, optional): shortest polling interval in seconds. Defaults to 0.5.
+        poll_max (float, optional): longest polling interval in seconds. Defaults to 10.
+
+    Yields:
+        dict: Log event (timestamp, message, logStreamName, eventId)
+    """
+    source = LogSource(profile, log_group, log_stream_names, start_time, batch_size)
+    yield from iter_merged_log_events([source], follow, poll_min, poll_max)
+
+
+def parse_since(since: str) -> int:
+    """Convert a relative duration (30s, 10m, 2h, 1d) or an ISO 8601 date into an epoch in milliseconds
+
+    Args:
+        since (str): duration before now, or date (UTC when no timezone is given)
+
+    Returns:
+        int: Epoch in milliseconds
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    try:
+        if since[-1:] in units:
+            seconds = float(since[:-1]) * units[since[-1]]
+        else:
+            seconds = float(since)
+    except ValueError:
+        # fromisoformat doesn't read a trailing Z before Python 3.11
+        date = datetime.fromisoformat(
+            since[:-1] + "+00:00" if since.endswith("Z") else since
+        )
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return int(date.timestamp() * 1000)
+
+    return int((time.time() - seconds) * 1000)
+
+
+def format_event(event: dict) -> str:
+    """Format an event like aws logs tail does
+
+    Args:
+        event (dict): log event
+
+    Returns:
+        str: timestamp, log stream and message of the event
+    """
+    timestamp = datetime.fromtimestamp(event["timestamp"] / 1000, tz=timezone.utc)
+    return f"{timestamp.isoformat()} {event['logStreamName']} {event['message'].rstrip()}"
+
+
+def tail_log_events(events: Iterator[dict], output: TextIO = None) -> None:
+    """Write events incrementally without keeping them in memory
+
+    Args:
+        events (Iterator[dict]): log events to write
+        output (TextIO, optional): where to write the events. Defaults to stdout.
+    """
+    output = output or sys.stdout
+    for event in events:
+        output.write(f"{format_event(event)}\n")
+        output.flush()
+
+
+def _export_slice(
+    profile: str,
+    log_targets: list,
+    start_time: int,
+    end_time: int,
+    batch_size: int,
+    part_path: Path,
+) -> int:
+    """Fetch the events of a time slice into a JSON lines part file"""
+    sources = build_log_sources(profile, log_targets, start_time, batch_size, end_time)
+    count = 0
+    with open(part_path, "w") as part_file:
+        for event in heapq.merge(
+            *(source.poll() for source in sources), key=lambda event: event["timestamp"]
+        ):
+            part_file.write(
+                json.dumps(
+                    {
+                        "timestamp": event["timestamp"],
+                        "logStreamName": event["logStreamName"],
+                        "eventId": event["eventId"],
+                        "message": event["message"],
+                    }
+                )
+            )
+            part_file.write("\n")
+            count += 1
+
+    return count
+
+
+def export_log_events(
+    profile: str,
+    log_targets: list,
+    start_time: int,
+    end_time: int,
+    output_path: str,
+    slice_ms: int = DEFAULT_SLICE_MS,
+    concurrency: int = DEFAULT_EXPORT_CONCURRENCY,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    resume: bool = True,
+) -> int:
+    """Export a time range of logs to a JSON lines file, gzipped for a .gz output
+
+    The range is split into slices fetched at the same time. Each slice is
+    spooled to a part file so memory stays bounded, then appended in order to
+    the output. A checkpoint written after each slice lets an interrupted
+    export resume where it stopped.
+
+    Args:
+        profile (str): aws profile
+        log_targets (list): (log group, log stream) pairs, a None log stream means the whole group
+        start_time (int): epoch in milliseconds of the first event
+        end_time (int): epoch in milliseconds after the last event
+        output_path (str): file to write the events to
+        slice_ms (int, optional): duration of a slice in milliseconds. Defaults to 5 minutes.
+        concurrency (int, optional): maximum number of slices fetched at once. Defaults to 8.
+        batch_size (int, optional): events fetched per call. Defaults to 1000.
+        resume (bool, optional): resume from a checkpoint of the same targets, slice and range duration. Defaults to True.
+
+    Returns:
+        int: Number of events written by this run
+    """
+    output = Path(output_path)
+    checkpoint_path = Path(f"{output_path}.checkpoint")
+    parts_dir = Path(f"{output_path}.parts")
+    log_targets = [list(log_target) for log_target in log_targets]
+
+    checkpoint = None
+    if resume and checkpoint_path.exists():
+        with open(checkpoint_path, "r") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        # A relative --since moves the range but keeps its duration, any other
+        # change is another export.
+        if (
+            checkpoint["log_targets"] != log_targets
+            or checkpoint["slice_ms"] != slice_ms
+            or checkpoint["end_time"] - checkpoint["start_time"] != end_time - start_time
+        ):
+            checkpoint = None
+
+    if checkpoint:
+        # Keep the original range, a relative --since would have moved.
+        start_time, end_time = checkpoint["start_time"], checkpoint["end_time"]
+        since, until = (
+            datetime.fromtimestamp(epoch / 1000, tz=timezone.utc).isoformat()
+            for epoch in (start_time, end_time)
+        )
+        print(f"Resuming the export from {since} to {until} of the checkpoint")
+        slice_ms, next_slice = checkpoint["slice_ms"], checkpoint["next_slice"]
+        with open(output, "ab") as output_file:
+            output_file.truncate(checkpoint["offset"])
+    else:
+        next_slice = 0
+        output.write_bytes(b"")
+
+    # endTime is inclusive: a slice stops 1 ms before the next one starts,
+    # or an event stamped on the boundary would be exported twice.
+    slices = [
+        (
+            slice_start,
+            slice_start + slice_ms - 1 if slice_start + slice_ms < end_time else end_time,
+        )
+        for slice_start in range(start_time, end_time, slice_ms)
+    ]
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    opener = gzip.open if output.suffix == ".gz" else open
+    count = 0
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        futures = dict()
+        for index in range(next_slice, len(slices)):
+            # Keep a bounded window of slices in flight ahead of the writer.
+            for ahead in range(index, min(index + concurrency * 2, len(slices))):
+                if ahead not in futures:
+                    futures[ahead] = executor.submit(
+                        _export_slice,
+                        profile,
+                        log_targets,
+                        slices[ahead][0],
+                        slices[ahead][1],
+                        batch_size,
+                        parts_dir / f"slice-{ahead}.jsonl",
+                    )
+
+            count += futures.pop(index).result()
+            part_path = parts_dir / f"slice-{index}.jsonl"
+            with open(part_path, "rb") as part_file, opener(output, "ab") as output_file:
+                shutil.copyfileobj(part_file, output_file)
+            part_path.unlink()
+
+            with open(checkpoint_path, "w") as checkpoint_file:
+                json.dump(
+                    {
+                        "log_targets": log_targets,
+                        "start_time": start_time,
+                        "end_time": end_time,
+                        "slice_ms": slice_ms,
+                        "next_slice": index + 1,
+                        "offset": output.stat().st_size,
+                    },
+                    checkpoint_file,
+                )
+
+    checkpoint_path.unlink(missing_ok=True)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    return count
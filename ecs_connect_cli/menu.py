@@ -1,3 +1,10 @@
+from typing import Iterator
+
+from ecs_connect_cli import cache
+from ecs_connect_cli import daemon
+from ecs_connect_cli import prefetch
+from ecs_connect_cli.cache import cached
+from ecs_connect_cli.cache import get_scope
 from ecs_connect_cli.credentials import check_credentials
 from ecs_connect_cli.credentials import which_credentials
 from ecs_connect_cli.credentials import which_region
@@ -5,6 +12,8 @@ from ecs_connect_cli.helpers import get_cluster_name
 from ecs_connect_cli.helpers import get_container_name
 from ecs_connect_cli.helpers import get_service_name
 from ecs_connect_cli.helpers import get_task_arn
+from ecs_connect_cli.helpers import get_task_choices
+from ecs_connect_cli.session import iter_pages
 
 
 def make_choice(
@@ -16,6 +25,10 @@ def make_choice(
 ) -> str:
     """Generic function to make choice in a list displayed
 
+    While the user is choosing, the next menu of the first visible choices
+    is loaded in the background and served at once when picked. Tasks are
+    choices labelled with their status, the task arn being the value.
+
     Args:
         profile (str, optional): aws profile. Defaults to None.
         cluster_name (str, optional): name of the cluster to retrieve service. Defaults to None.
@@ -25,26 +38,130 @@ def make_choice(
     Returns:
         str: String of the choice in the menu
     """
+    list_results = prefetch.result(
+        (choice, profile, cluster_name, service_name, task_name),
+        lambda: _load_choice(choice, profile, cluster_name, service_name, task_name),
+    )
+    _prefetch_next_choice(choice, profile, cluster_name, service_name, list_results)
+
+    return list_results
+
+
+def make_choice_pages(
+    choice: str = None,
+    profile: str = None,
+    cluster_name: str = None,
+    service_name: str = None,
+    task_name: str = None,
+) -> Iterator[list]:
+    """Stream the choices of a menu page by page
+
+    Menus held by the daemon, prefetched or cached are served at once as a
+    single page. Otherwise clusters, services and tasks are yielded as each
+    page of the API call arrives, and cached once complete. Nothing is loaded
+    before the first page is read.
+
+    Args:
+        profile (str, optional): aws profile. Defaults to None.
+        cluster_name (str, optional): name of the cluster to retrieve service. Defaults to None.
+        service_name (str, optional): name of the service to retrieve task. Defaults to None.
+        task_name (str, optional): name of the task to retrieve the container name. Defaults to None.
+
+    Yields:
+        Iterator[list]: Pages of choices
+    """
+    if choice == "cluster_name":
+        level, key = "clusters", get_scope(profile)
+        params = {"action": "list_clusters"}
+    elif choice == "service_name":
+        level, key = "services", get_scope(profile) + [cluster_name]
+        params = {"action": "list_services", "cluster": cluster_name}
+    elif choice == "task_arn":
+        level, key = "tasks", get_scope(profile) + [cluster_name, service_name]
+        params = {
+            "action": "list_tasks",
+            "cluster": cluster_name,
+            "serviceName": service_name,
+        }
+    else:
+        level = None
+
+    served = _query_daemon(choice, profile, cluster_name, service_name, task_name)
+    if served is not None:
+        yield served
+        return
+
+    if (
+        level is None
+        or prefetch.scheduled((choice, profile, cluster_name, service_name, task_name))
+        or cache.is_cached(level, key)
+    ):
+        yield make_choice(choice, profile, cluster_name, service_name, task_name)
+        return
+
+    list_results = list()
+    for page in iter_pages(profile=profile, resource="ecs", **params):
+        if choice == "task_arn":
+            # Cached as arns, labelled from the (memoized) task descriptions
+            choices = get_task_choices(profile, cluster_name, page)
+        else:
+            # Same names as get_cluster_name and get_service_name
+            page = choices = [arn.partition("/")[2] for arn in page]
+        if not list_results:
+            _prefetch_next_choice(choice, profile, cluster_name, service_name, choices)
+        list_results.extend(page)
+        yield choices
+
+    if cache.get_ttl(level) > 0:
+        cache.write(level, key, list_results)
+
+
+def _load_choice(
+    choice: str = None,
+    profile: str = None,
+    cluster_name: str = None,
+    service_name: str = None,
+    task_name: str = None,
+) -> list:
+    """Retrieve the choices of a menu, from the daemon when it holds them"""
+
+    list_results = _query_daemon(choice, profile, cluster_name, service_name, task_name)
+    if list_results is not None:
+        return list_results
 
     list_results = ""
 
     # choose_container
     if choice == "container_name":
         list_results = get_container_name(
-            profile, cluster_name, task_name.partition("/")[2].partition("/")[2]
+            profile, cluster_name, task_name.rpartition("/")[2]
         )
 
     # choose_task
     elif choice == "task_arn":
-        list_results = get_task_arn(profile, cluster_name, service_name)
+        list_results = get_task_choices(
+            profile,
+            cluster_name,
+            cached(
+                "tasks",
+                get_scope(profile) + [cluster_name, service_name],
+                lambda: get_task_arn(profile, cluster_name, service_name),
+            ),
+        )
 
     # choose_service
     elif choice == "service_name":
-        list_results = get_service_name(profile, cluster_name)
+        list_results = cached(
+            "services",
+            get_scope(profile) + [cluster_name],
+            lambda: get_service_name(profile, cluster_name),
+        )
 
     # choose_cluster
     elif choice == "cluster_name":
-        list_results = get_cluster_name(profile)
+        list_results = cached(
+            "clusters", get_scope(profile), lambda: get_cluster_name(profile)
+        )
 
     # choose_credentials_profile
     elif choice == "profile_name":
@@ -59,3 +176,39 @@ def make_choice(
         list_results = which_region()
 
     return list_results
+
+
+def _query_daemon(
+    choice: str,
+    profile: str,
+    cluster_name: str,
+    service_name: str,
+    task_name: str,
+) -> list:
+    """Ask the daemon for a menu, unless a fresh fetch was forced"""
+    if cache.get_refresh():
+        return None
+
+    return daemon.query(choice, profile, cluster_name, service_name, task_name)
+
+
+def _prefetch_next_choice(
+    choice: str,
+    profile: str,
+    cluster_name: str,
+    service_name: str,
+    list_results: list,
+) -> None:
+    """Load in the background the menu following each of the first choices"""
+    for item in list_results[: prefetch.get_prefetch_limit()]:
+        # Keys mirror the arguments of the next make_choice call of the cli.
+        if choice == "cluster_name":
+            key = ("service_name", profile, item, None, None)
+        elif choice == "service_name":
+            key = ("task_arn", profile, cluster_name, item, None)
+        elif choice == "task_arn":
+            key = ("container_name", profile, cluster_name, None, item["value"])
+        else:
+            return
+
+        prefetch.schedule(key, lambda key=key: _load_choice(*key))
@@ -0,0 +1,331 @@
+import asyncio
+import bisect
+import os
+import re
+import threading
+
+from collections import defaultdict
+from typing import Iterable
+from typing import Iterator
+
+from echoprompt import EchoPrompt
+from InquirerPy.prompts.fuzzy import FuzzyPrompt
+from InquirerPy.prompts.fuzzy import InquirerPyFuzzyControl
+
+DEFAULT_PICKER_THRESHOLD = 20
+DEFAULT_PICKER_LIMIT = 500
+# Longest n-gram indexed, longer queries are verified on the rarest trigram
+MAX_GRAM = 3
+
+
+def get_picker_threshold() -> int:
+    """Retrieve from how many choices the fuzzy picker replaces the plain menu
+
+    Returns:
+        int: ECS_CONNECT_PICKER_THRESHOLD, 0 always uses the fuzzy picker
+    """
+    try:
+        return int(os.getenv("ECS_CONNECT_PICKER_THRESHOLD", DEFAULT_PICKER_THRESHOLD))
+    except ValueError:
+        return DEFAULT_PICKER_THRESHOLD
+
+
+def get_picker_limit() -> int:
+    """Retrieve how many matches the fuzzy picker displays at most
+
+    Returns:
+        int: ECS_CONNECT_PICKER_LIMIT
+    """
+    try:
+        return int(os.getenv("ECS_CONNECT_PICKER_LIMIT", DEFAULT_PICKER_LIMIT))
+    except ValueError:
+        return DEFAULT_PICKER_LIMIT
+
+
+def _iter_bits(bits: int) -> Iterator[int]:
+    """Positions of the bits set in a bitset, lowest first"""
+    binary = bin(bits)[:1:-1]
+    position = binary.find("1")
+    while position >= 0:
+        yield position
+        position = binary.find("1", position + 1)
+
+
+def _subsequence_positions(query: str, name: str) -> list:
+    """Positions of the characters of query found in order in name, None if missing"""
+    positions = list()
+    position = -1
+    for char in query:
+        position = name.find(char, position + 1)
+        if position < 0:
+            return None
+        positions.append(position)
+    return positions
+
+
+class NameIndex:
+    """Incremental fuzzy index over a list of names
+
+    Every 1, 2 and 3 character n-gram points to the (ascending) ids of the
+    names containing it, every character to a bitset of these names, and a
+    sorted copy of the names answers prefix queries with a bisection. Matches are ranked prefix first, then
+    substring, then subsequence (fuzzy). A query extending the previous one
+    only checks the previous matches.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names = list()
+        self._lowered = list()
+        self._grams = defaultdict(list)
+        self._char_bits = defaultdict(int)
+        self._sorted = list()
+        self._last = None
+        self.add(names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, names: Iterable[str]) -> None:
+        """Index new names, e.g. the next page of an API call"""
+        first_id = len(self.names)
+        page_bits = defaultdict(int)
+        for name in names:
+            name_id = len(self.names)
+            lowered = name.lower()
+            self.names.append(name)
+            self._lowered.append(lowered)
+            grams = {
+                lowered[start : start + size]
+                for size in range(1, MAX_GRAM + 1)
+                for start in range(len(lowered) - size + 1)
+            }
+            for gram in grams:
+                self._grams[gram].append(name_id)
+                if len(gram) == 1:
+                    page_bits[gram] |= 1 << (name_id - first_id)
+            bisect.insort(self._sorted, (lowered, name_id))
+        for char, bits in page_bits.items():
+            self._char_bits[char] |= bits << first_id
+        self._last = None
+
+    def _substring_ids(self, query: str) -> Iterator[int]:
+        if len(query) <= MAX_GRAM:
+            return iter(self._grams.get(query, []))
+
+        rarest = min(
+            (
+                self._grams.get(query[start : start + MAX_GRAM], [])
+                for start in range(len(query) - MAX_GRAM + 1)
+            ),
+            key=len,
+        )
+        lowered = self._lowered
+        return (name_id for name_id in rarest if query in lowered[name_id])
+
+    def _prefix_ids(self, query: str) -> Iterator[int]:
+        position = bisect.bisect_left(self._sorted, (query,))
+        while position < len(self._sorted) and self._sorted[position][0].startswith(
+            query
+        ):
+            yield self._sorted[position][1]
+            position += 1
+
+    def _fuzzy_ids(self, query: str) -> Iterator[int]:
+        if self._last is not None and query.startswith(self._last[0]):
+            candidates = sorted(self._last[1])
+        else:
+            # Names holding every character of the query, in any order
+            bits = -1
+            for char in set(query):
+                bits &= self._char_bits.get(char, 0)
+            candidates = _iter_bits(bits)
+        # [^a]*a[^b]*b... matches without backtracking, one C call per name
+        match = re.compile(
+            "".join(f"[^{char}]*{char}" for char in map(re.escape, query))
+        ).match
+        lowered = self._lowered
+        return (name_id for name_id in candidates if match(lowered[name_id]))
+
+    def search(self, query: str, limit: int = None) -> list:
+        """Retrieve the ids of the names matching a query, best matches first
+
+        The work done is bounded by the limit, not by the size of the index.
+
+        Args:
+            query (str): characters to find in order, case insensitive
+            limit (int, optional): maximum number of ids returned. Defaults to None.
+
+        Returns:
+            list: ids (positions in self.names) of the matching names
+        """
+        query = query.lower()
+        limit = limit or len(self.names)
+        if not query:
+            return list(range(min(limit, len(self.names))))
+
+        matches = list()
+        seen = set()
+        for name_ids in (
+            self._prefix_ids(query),
+            self._substring_ids(query),
+            self._fuzzy_ids(query),
+        ):
+            for name_id in name_ids:
+                if name_id in seen:
+                    continue
+                if len(matches) == limit:
+                    # Truncated, the next query can't be narrowed from it
+                    self._last = None
+                    return matches
+                seen.add(name_id)
+                matches.append(name_id)
+
+        self._last = (query, matches)
+        return matches
+
+    def positions(self, name_id: int, query: str) -> list:
+        """Positions of the matched characters of a name, to highlight them"""
+        query = query.lower()
+        lowered = self._lowered[name_id]
+        start = lowered.find(query)
+        if start >= 0:
+            return list(range(start, start + len(query)))
+        return _subsequence_positions(query, lowered) or []
+
+
+class _IndexedFuzzyControl(InquirerPyFuzzyControl):
+    """Fuzzy prompt choices filtered with a NameIndex instead of scoring every choice"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = NameIndex(choice["name"] for choice in self.choices)
+        self._limit = get_picker_limit()
+
+    def extend(self, choices: list) -> None:
+        """Add choices (values or name/value dicts) while the prompt is displayed"""
+        first = len(self.choices)
+        for choice in choices:
+            if not isinstance(choice, dict):
+                choice = {"name": str(choice), "value": choice}
+            self.choices.append(
+                {
+                    "name": choice["name"],
+                    "value": choice["value"],
+                    "enabled": False,
+                    "index": len(self.choices),
+                    "indices": [],
+                }
+            )
+        self.index.add(choice["name"] for choice in self.choices[first:])
+        self._filtered_choices = self.filter()
+
+    def filter(self) -> list:
+        return [
+            self.choices[name_id]
+            for name_id in self.index.search(self._current_text(), self._limit)
+        ]
+
+    def _highlight(self, choice: dict) -> dict:
+        query = self._current_text()
+        choice["indices"] = self.index.positions(choice["index"], query) if query else []
+        return choice
+
+    def _get_hover_text(self, choice):
+        return super()._get_hover_text(self._highlight(choice))
+
+    def _get_normal_text(self, choice):
+        return super()._get_normal_text(self._highlight(choice))
+
+
+class IndexedFuzzyPrompt(FuzzyPrompt):
+    """Fuzzy prompt over a NameIndex, filled in the background with the next pages
+
+    Args:
+        message (str): question displayed
+        choices (list): choices known when the prompt is displayed
+        pages (Iterator[list], optional): next pages of choices, consumed on a daemon thread
+    """
+
+    def __init__(self, message: str, choices: list, pages: Iterator[list] = None, **kwargs):
+        super().__init__(message=message, choices=choices, **kwargs)
+        control = _IndexedFuzzyControl(
+            choices=choices,
+            pointer=self.content_control._pointer,
+            marker=self.content_control._marker,
+            current_text=self._get_current_text,
+            max_lines=self._dimmension_max_height,
+            session_result=None,
+            multiselect=False,
+            marker_pl=self.content_control._marker_pl,
+            match_exact=False,
+        )
+        self._content_control = control
+        self.choice_window.content = control
+        self._pages = pages
+
+    def _on_text_changed(self, _) -> None:
+        # Filtering is cheap enough to run on every keystroke, no debounce task
+        if self._invalid:
+            self._invalid = False
+        self.content_control._filtered_choices = self.content_control.filter()
+
+    def _on_rendered(self, app) -> None:
+        super()._on_rendered(app)
+        if self._pages is None:
+            return
+
+        loop = asyncio.get_running_loop()
+
+        def _add_page(page: list) -> None:
+            self.content_control.extend(page)
+            self._application.invalidate()
+
+        def _fill() -> None:
+            try:
+                for page in self._pages:
+                    if page:
+                        loop.call_soon_threadsafe(_add_page, page)
+            except RuntimeError:
+                # The prompt was answered and its event loop closed
+                pass
+
+        threading.Thread(target=_fill, daemon=True).start()
+
+
+class PickerPrompt(EchoPrompt):
+    """EchoPrompt switching to an indexed fuzzy picker for long choice lists
+
+    Choices can be a list or an iterator of pages, of values or of name/value
+    dicts. Pages are read until the
+    threshold is reached, the remaining pages fill the picker while it is
+    displayed. The last choice made is listed first.
+    """
+
+    def prompt_choice(self, name, choices):
+        pages = iter([choices]) if isinstance(choices, (list, tuple)) else iter(choices)
+        first_choices = list()
+        exhausted = True
+        for page in pages:
+            first_choices.extend(page)
+            if len(first_choices) > get_picker_threshold():
+                exhausted = False
+                break
+
+        if exhausted and len(first_choices) <= get_picker_threshold():
+            return super().prompt_choice(name, first_choices)
+
+        default = self.history.get(name)
+        for choice in first_choices:
+            if (choice["value"] if isinstance(choice, dict) else choice) == default:
+                first_choices.remove(choice)
+                first_choices.insert(0, choice)
+                break
+
+        res = IndexedFuzzyPrompt(
+            message=name.replace("_", " ").title(),
+            choices=first_choices,
+            pages=None if exhausted else pages,
+        ).execute()
+        if res:
+            self.history.set(name, res)
+        return res
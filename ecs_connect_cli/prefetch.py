@@ -0,0 +1,82 @@
+import os
+import threading
+
+from concurrent.futures import Future
+from typing import Callable
+
+DEFAULT_PREFETCH_LIMIT = 3
+
+# Menu choices loaded in the background, keyed by make_choice arguments.
+_futures = {}
+_lock = threading.Lock()
+
+
+def get_prefetch_limit() -> int:
+    """Retrieve how many choices of a menu get their children prefetched
+
+    Returns:
+        int: ECS_CONNECT_PREFETCH_LIMIT, 0 disables the prefetch
+    """
+    try:
+        return int(os.getenv("ECS_CONNECT_PREFETCH_LIMIT", DEFAULT_PREFETCH_LIMIT))
+    except ValueError:
+        return DEFAULT_PREFETCH_LIMIT
+
+
+def schedule(key: tuple, load: Callable) -> None:
+    """Load a menu in the background while the user is choosing
+
+    Daemon threads are used so that a pending prefetch never delays the exit.
+
+    Args:
+        key (tuple): key of the menu
+        load (Callable): function loading the menu choices
+    """
+    with _lock:
+        if key in _futures:
+            return
+        future = Future()
+        _futures[key] = future
+
+    def _run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(load())
+        except BaseException as Err:
+            future.set_exception(Err)
+
+    threading.Thread(target=_run, daemon=True).start()
+
+
+def scheduled(key: tuple) -> bool:
+    """Check whether a menu is loaded (or being loaded) in the background"""
+    with _lock:
+        return key in _futures
+
+
+def result(key: tuple, load: Callable):
+    """Retrieve a prefetched menu, loading it when it was not prefetched
+
+    Args:
+        key (tuple): key of the menu
+        load (Callable): function loading the menu choices
+
+    Returns:
+        Menu choices
+    """
+    with _lock:
+        future = _futures.pop(key, None)
+
+    if future is None:
+        return load()
+
+    return future.result()
+
+
+def clear() -> None:
+    """Forget every prefetched menu"""
+    with _lock:
+        for future in _futures.values():
+            future.cancel()
+        _futures.clear()
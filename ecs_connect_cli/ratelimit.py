@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+DEFAULT_RATE_LIMIT = 20.0
+DEFAULT_RATE_BURST = 50.0
+
+# One bucket per account (aws profile), shared by every worker thread
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limit() -> float:
+    """Retrieve how many AWS calls per second are issued against one account
+
+    Returns:
+        float: ECS_CONNECT_RATE_LIMIT, 0 disables the limit
+    """
+    try:
+        return float(os.getenv("ECS_CONNECT_RATE_LIMIT", DEFAULT_RATE_LIMIT))
+    except ValueError:
+        return DEFAULT_RATE_LIMIT
+
+
+def get_rate_burst() -> float:
+    """Retrieve how many AWS calls can be issued at once before being rate limited
+
+    Returns:
+        float: ECS_CONNECT_RATE_BURST
+    """
+    try:
+        return float(os.getenv("ECS_CONNECT_RATE_BURST", DEFAULT_RATE_BURST))
+    except ValueError:
+        return DEFAULT_RATE_BURST
+
+
+class TokenBucket:
+    """Thread safe token bucket
+
+    Tokens are refilled at `rate` per second up to `capacity`, acquire()
+    blocks until enough tokens are available. A rate of 0 never blocks.
+    """
+
+    def __init__(
+        self, rate: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep
+    ):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available
+
+        Returns:
+            float: 0 if the tokens were taken, else seconds to wait before retrying
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until tokens are taken"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            self._sleep(wait)
+
+
+def get_rate_limiter(key: str, rate: float = None) -> TokenBucket:
+    """Retrieve (or create) the token bucket of an account
+
+    Args:
+        key (str): account key, the aws profile
+        rate (float, optional): calls per second, changes the rate of an existing
+            bucket. Defaults to ECS_CONNECT_RATE_LIMIT.
+
+    Returns:
+        TokenBucket: bucket shared by every caller of the same key
+    """
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(
+                get_rate_limit() if rate is None else rate, get_rate_burst()
+            )
+        elif rate is not None:
+            _buckets[key].rate = rate
+        return _buckets[key]
+
+
+def clear_rate_limiters() -> None:
+    """Drop every token bucket"""
+    with _buckets_lock:
+        _buckets.clear()
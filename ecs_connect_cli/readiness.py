@@ -0,0 +1,88 @@
+EXEC_AGENT_NAME = "ExecuteCommandAgent"
+
+
+class ExecNotReady(Exception):
+    """Raised before opening a session on a task that can't run ECS Exec"""
+
+
+def get_exec_agent_status(task: dict, container_name: str = None) -> str:
+    """Retrieve the state of the ECS Exec agent of a task
+
+    Args:
+        task (dict): Task description from describe_tasks
+        container_name (str, optional): container to check, the first one having the agent when not set. Defaults to None.
+
+    Returns:
+        str: disabled when execute command is off, the agent lastStatus
+            (RUNNING, PENDING, STOPPED, ...) or UNKNOWN when it isn't reported
+    """
+    if not task.get("enableExecuteCommand"):
+        return "disabled"
+
+    for container in task.get("containers", []):
+        if container_name and container["name"] != container_name:
+            continue
+        for agent in container.get("managedAgents", []):
+            if agent.get("name") == EXEC_AGENT_NAME:
+                return agent.get("lastStatus", "UNKNOWN")
+
+    return "UNKNOWN"
+
+
+def get_exec_problems(
+    task: dict, container_name: str = None, service: dict = None
+) -> list:
+    """Tell why ECS Exec would fail on a task, from its describe_tasks data only
+
+    Args:
+        task (dict): Task description from describe_tasks
+        container_name (str, optional): container the command runs in. Defaults to None.
+        service (dict, optional): Service description from describe_services, for a hint. Defaults to None.
+
+    Returns:
+        list: Reasons, empty when the task is ready
+    """
+    problems = list()
+    task_id = task["taskArn"].rpartition("/")[2]
+
+    if task.get("lastStatus", "RUNNING") != "RUNNING":
+        problems.append(f"task {task_id} is {task['lastStatus']}")
+
+    if not task.get("enableExecuteCommand"):
+        if service and service.get("enableExecuteCommand"):
+            problems.append(
+                f"execute command is enabled on service {service['serviceName']} "
+                f"but not on task {task_id}, force a new deployment"
+            )
+        else:
+            problems.append(f"execute command is not enabled on task {task_id}")
+        return problems
+
+    if container_name and container_name not in [
+        container["name"] for container in task.get("containers", [])
+    ]:
+        problems.append(f"task {task_id} has no container {container_name}")
+        return problems
+
+    agent_status = get_exec_agent_status(task, container_name)
+    if agent_status != "RUNNING":
+        problems.append(
+            f"{EXEC_AGENT_NAME} of task {task_id} is {agent_status}, not RUNNING"
+        )
+
+    return problems
+
+
+def check_exec_readiness(task: dict, container_name: str = None) -> None:
+    """Fail fast, before any API call or subprocess, when ECS Exec can't work on a task
+
+    Args:
+        task (dict): Task description from describe_tasks
+        container_name (str, optional): container the command runs in. Defaults to None.
+
+    Raises:
+        ExecNotReady: with the reasons
+    """
+    problems = get_exec_problems(task, container_name)
+    if problems:
+        raise ExecNotReady("; ".join(problems))
@@ -0,0 +1,72 @@
+import os
+
+from ecs_connect_cli.ratelimit import get_rate_limiter
+
+DEFAULT_RETRY_MODE = "adaptive"
+DEFAULT_MAX_ATTEMPTS = 8
+RETRY_MODES = ("legacy", "standard", "adaptive")
+THROTTLING_ERROR_CODES = (
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+)
+
+# Key of the handlers registered on the pooled clients
+_HANDLER_ID = "ecs_connect_rate_limit"
+
+
+def get_retry_mode() -> str:
+    """Retrieve the botocore retry mode of the pooled clients
+
+    Returns:
+        str: ECS_CONNECT_RETRY_MODE (or AWS_RETRY_MODE), legacy, standard or adaptive
+    """
+    mode = os.getenv("ECS_CONNECT_RETRY_MODE") or os.getenv("AWS_RETRY_MODE")
+    return mode if mode in RETRY_MODES else DEFAULT_RETRY_MODE
+
+
+def get_max_attempts() -> int:
+    """Retrieve how many times a throttled or failed AWS call is attempted
+
+    Returns:
+        int: ECS_CONNECT_MAX_ATTEMPTS, the first call included
+    """
+    try:
+        return max(
+            1, int(os.getenv("ECS_CONNECT_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+        )
+    except ValueError:
+        return DEFAULT_MAX_ATTEMPTS
+
+
+def get_retry_config() -> dict:
+    """Retrieve the retries of the botocore Config of the pooled clients
+
+    botocore retries throttled and transient errors with a jittered
+    exponential backoff, in adaptive mode it also slows the client down to
+    the rate AWS accepts once it is throttled.
+
+    Returns:
+        dict: retry mode and max attempts
+    """
+    return {"mode": get_retry_mode(), "max_attempts": get_max_attempts()}
+
+
+def limit_rate(client, profile: str) -> None:
+    """Take a token of the profile's bucket before every call of a boto3 client
+
+    Every pooled client of a profile, whatever its region or service, shares
+    the same bucket, so threads and features issuing calls at the same time
+    stay under ECS_CONNECT_RATE_LIMIT together.
+
+    Args:
+        client (botocore.client.BaseClient): boto3 client
+        profile (str): aws profile
+    """
+    limiter = get_rate_limiter(profile)
+
+    def _acquire(**kwargs):
+        limiter.acquire()
+
+    client.meta.events.register("before-call", _acquire, unique_id=_HANDLER_ID)
@@ -1,6 +1,198 @@
 import os
+import threading
+from typing import Iterator
 
-import boto3
+from ecs_connect_cli import instrumentation
+from ecs_connect_cli.retry import get_retry_config
+from ecs_connect_cli.retry import limit_rate
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+DEFAULT_MAX_ITEMS = 10000
+# Maximum number of items per describe call
+DESCRIBE_SERVICES_BATCH = 10
+DESCRIBE_TASKS_BATCH = 100
+# Maximum number of items per page of the list actions (maxResults), the API default is 10 for list_services
+LIST_PAGE_SIZE = 100
+
+# Result key of each paginated action
+PAGINATED_ACTIONS = {
+    "list_clusters": "clusterArns",
+    "list_services": "serviceArns",
+    "list_tasks": "taskArns",
+}
+
+# Process-wide registry of boto3 sessions and clients, so every helper reuses
+# the same parsed credentials, loaded service models and HTTP connection pool.
+_sessions = {}
+_clients = {}
+_registry_lock = threading.Lock()
+
+
+def get_endpoint_url() -> str:
+    """Retrieve the custom AWS endpoint url (local stand-in) if any
+
+    Returns:
+        str: Endpoint url or None
+    """
+    return os.getenv("ECS_CONNECT_AWS_ENDPOINT_URL") or os.getenv("AWS_ENDPOINT_URL")
+
+
+def get_max_pool_connections() -> int:
+    """Retrieve the size of the HTTP connection pool of each client
+
+    Returns:
+        int: Maximum number of pooled connections per client
+    """
+    try:
+        return int(
+            os.getenv("ECS_CONNECT_MAX_POOL_CONNECTIONS", DEFAULT_MAX_POOL_CONNECTIONS)
+        )
+    except ValueError:
+        return DEFAULT_MAX_POOL_CONNECTIONS
+
+
+def get_max_items() -> int:
+    """Retrieve the upper bound of items fetched by a paginated call
+
+    Returns:
+        int: Maximum number of items
+    """
+    try:
+        return int(os.getenv("ECS_CONNECT_MAX_ITEMS", DEFAULT_MAX_ITEMS))
+    except ValueError:
+        return DEFAULT_MAX_ITEMS
+
+
+def _get_boto3_session(profile: str = None, region_name: str = None):
+    """Retrieve (or create) the boto3 session of a profile and a region
+
+    Must be called with the registry lock held, boto3 sessions are not thread safe.
+    """
+    # Imported on the first API call, boto3 is slow to import
+    import boto3
+
+    key = (profile, region_name)
+    if key not in _sessions:
+        if profile == "EC2_INSTANCE_METADATA" or profile is None:
+            _sessions[key] = boto3.Session(region_name=region_name)
+        else:
+            _sessions[key] = boto3.Session(
+                profile_name=profile, region_name=region_name
+            )
+
+    return _sessions[key]
+
+
+def get_client(profile: str = None, resource: str = None, region_name: str = None):
+    """Retrieve a pooled boto3 client
+
+    Clients are kept for the whole process and keyed by
+    (profile, region, service, endpoint_url). They retry throttled calls
+    (ECS_CONNECT_RETRY_MODE) and share the token bucket of their profile.
+
+    Args:
+        profile (str, optional): aws profile. Defaults to None.
+        resource (str, optional): aws service name (ecs, logs, ...). Defaults to None.
+        region_name (str, optional): aws region, resolved from the environment when not set. Defaults to None.
+
+    Returns:
+        botocore.client.BaseClient: boto3 client
+    """
+    region_name = (
+        region_name
+        or os.getenv("AWS_REGION")
+        or os.getenv("AWS_DEFAULT_REGION")
+    )
+    endpoint_url = get_endpoint_url()
+    key = (profile, region_name, resource, endpoint_url)
+
+    with _registry_lock:
+        if key not in _clients:
+            from botocore.config import Config
+
+            session = _get_boto3_session(profile, region_name)
+            client_kwargs = {
+                "config": Config(
+                    max_pool_connections=get_max_pool_connections(),
+                    retries=get_retry_config(),
+                )
+            }
+            if endpoint_url:
+                client_kwargs["endpoint_url"] = endpoint_url
+            _clients[key] = session.client(resource, **client_kwargs)
+            limit_rate(_clients[key], profile)
+            if instrumentation.is_enabled():
+                instrumentation.instrument(_clients[key])
+
+        return _clients[key]
+
+
+def get_config_region(profile: str = None) -> str:
+    """Retrieve the region of a profile in the aws config
+
+    The pooled clients use it when neither AWS_REGION nor AWS_DEFAULT_REGION is set.
+
+    Returns:
+        str: region of the profile, None when not set
+    """
+    import botocore.session
+
+    if profile == "EC2_INSTANCE_METADATA":
+        profile = None
+    return botocore.session.Session(profile=profile).get_scoped_config().get("region")
+
+
+def clear_clients() -> None:
+    """Drop every pooled session and client"""
+    with _registry_lock:
+        _clients.clear()
+        _sessions.clear()
+
+
+def _collect_pages(profile: str, resource: str, action: str, **params) -> dict:
+    """Gather every page of a paginated call into a single response"""
+    items = list()
+    for page in iter_pages(profile, resource, action, **params):
+        items.extend(page)
+
+    return {PAGINATED_ACTIONS[action]: items}
+
+
+def iter_pages(
+    profile: str = None,
+    resource: str = None,
+    action: str = None,
+    max_items: int = None,
+    **params,
+) -> Iterator[list]:
+    """Follow the nextToken of a paginated boto3 call and yield each page as it arrives
+
+    Args:
+        profile (str, optional): aws profile. Defaults to None.
+        resource (str, optional): aws service name. Defaults to None.
+        action (str, optional): paginated boto3 action to call. Defaults to None.
+        max_items (int, optional): upper bound of items to fetch, see ECS_CONNECT_MAX_ITEMS. Defaults to None.
+        **params: parameters of the boto3 action
+
+    Yields:
+        list: Items of the page
+    """
+    try:
+        client = get_client(profile, resource)
+        paginator = client.get_paginator(action)
+        pages = paginator.paginate(
+            **params,
+            PaginationConfig={
+                "MaxItems": max_items or get_max_items(),
+                "PageSize": LIST_PAGE_SIZE,
+            },
+        )
+        for page in pages:
+            yield page[PAGINATED_ACTIONS[action]]
+
+    except Exception as Err:
+        print(f"ERROR: {Err}")
+        exit(-1)
 
 
 def get_session(
@@ -11,6 +203,7 @@ def get_session(
     task_name: str = None,
     task_definition_arn: str = None,
     action: str = None,
+    task_names: list = None,
 ) -> list:
     """Generic function to call boto3 function to retrieve data from AWS
 
@@ -21,48 +214,36 @@ def get_session(
         task_name (str, optional): name of the task to retrieve the container name. Defaults to None.
         task_definition_arn (str, optional): task definition arn to retrieve log group. Defaults to None.
         action (str, optional): boto3 action to call. Defaults to None.
+        task_names (list, optional): tasks to describe at once, up to DESCRIBE_TASKS_BATCH. Defaults to None.
 
     Returns:
         list: JSON response from boto3 call
     """
     try:
-        if profile == "EC2_INSTANCE_METADATA":
-            session = boto3.Session()
-        else:
-            session = boto3.Session(profile_name=profile)
-
-        endpoint_url = os.getenv("ECS_CONNECT_AWS_ENDPOINT_URL") or os.getenv(
-            "AWS_ENDPOINT_URL"
-        )
-        client_kwargs = {}
-        if endpoint_url:
-            client_kwargs["endpoint_url"] = endpoint_url
-
-        client = session.client(resource, **client_kwargs)
+        client = get_client(profile, resource)
 
         if resource == "ecs":
             if action == "list_clusters":
-                response = client.list_clusters(maxResults=20)
+                response = _collect_pages(profile, resource, action)
 
             if action == "list_services":
-                response = client.list_services(
-                    cluster=cluster_name,
-                    maxResults=50,
+                response = _collect_pages(
+                    profile, resource, action, cluster=cluster_name
                 )
 
             if action == "list_tasks":
-                response = client.list_tasks(
+                response = _collect_pages(
+                    profile,
+                    resource,
+                    action,
                     cluster=cluster_name,
-                    maxResults=100,
                     serviceName=service_name,
                 )
 
             if action == "describe_tasks":
                 response = client.describe_tasks(
                     cluster=cluster_name,
-                    tasks=[
-                        task_name,
-                    ],
+                    tasks=task_names or [task_name],
                 )
 
             if action == "describe_task_definition":
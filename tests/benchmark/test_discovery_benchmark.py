@@ -0,0 +1,345 @@
+import json
+import os
+import statistics
+import time
+
+from pathlib import Path
+
+import boto3
+import pytest
+
+from ecs_connect_cli import menu
+from ecs_connect_cli import prefetch
+from ecs_connect_cli import session
+from ecs_connect_cli.helpers import clear_describe_cache
+from ecs_connect_cli.helpers import get_cluster_arn
+from ecs_connect_cli.helpers import get_container_name
+from ecs_connect_cli.helpers import get_service_arn
+from ecs_connect_cli.helpers import get_task_arn
+from ecs_connect_cli.ratelimit import clear_rate_limiters
+
+pytestmark = [pytest.mark.integration, pytest.mark.benchmark]
+
+ENDPOINT_URL = "http://localhost:4566"
+# A region of its own, so the estates are not mixed with other tests' clusters
+REGION = "eu-west-3"
+PROFILE = "EC2_INSTANCE_METADATA"
+BASELINES_PATH = Path(
+    os.getenv(
+        "ECS_CONNECT_BENCHMARK_BASELINES", Path(__file__).parent / "baselines.json"
+    )
+)
+# Number of services (and of tasks) of each seeded estate
+SCALES = [
+    int(scale)
+    for scale in os.getenv("ECS_CONNECT_BENCHMARK_SCALES", "10,100,1000").split(",")
+]
+# Latency allowed over the baseline: ratio and absolute slack in seconds
+TOLERANCE = float(os.getenv("ECS_CONNECT_BENCHMARK_TOLERANCE", "2.0"))
+SLACK = 0.05
+REPEAT = 3
+TASKS_PER_SERVICE = 10
+# Default page size of the ECS list operations, 100 at most. The local
+# endpoint returns every item at once, and the tasks of every cluster,
+# which would hide the pagination cost: the responses are cut like AWS does.
+PAGE_SIZES = {"ListClusters": 100, "ListServices": 10, "ListTasks": 100}
+RESULT_KEYS = {"ListClusters": "clusterArns", "ListServices": "serviceArns", "ListTasks": "taskArns"}
+PAGE_TOKEN = "benchmark-page:"
+
+_results = {}
+
+
+@pytest.fixture(scope="module")
+def aws_env():
+    names = (
+        "AWS_ACCESS_KEY_ID",
+        "AWS_SECRET_ACCESS_KEY",
+        "AWS_DEFAULT_REGION",
+        "ECS_CONNECT_AWS_ENDPOINT_URL",
+        "ECS_CONNECT_CACHE_TTL_CLUSTERS",
+        "ECS_CONNECT_CACHE_TTL_SERVICES",
+        "ECS_CONNECT_CACHE_TTL_TASKS",
+        "ECS_CONNECT_PREFETCH_LIMIT",
+        "ECS_CONNECT_RATE_LIMIT",
+    )
+    original_env = {name: os.environ.get(name) for name in names}
+    os.environ.update(
+        {
+            "AWS_ACCESS_KEY_ID": "test",
+            "AWS_SECRET_ACCESS_KEY": "test",
+            "AWS_DEFAULT_REGION": REGION,
+            "ECS_CONNECT_AWS_ENDPOINT_URL": ENDPOINT_URL,
+            # Measure the API calls, not the local cache, the prefetch or the rate limit
+            "ECS_CONNECT_CACHE_TTL_CLUSTERS": "0",
+            "ECS_CONNECT_CACHE_TTL_SERVICES": "0",
+            "ECS_CONNECT_CACHE_TTL_TASKS": "0",
+            "ECS_CONNECT_PREFETCH_LIMIT": "0",
+            "ECS_CONNECT_RATE_LIMIT": "0",
+        }
+    )
+    session.clear_clients()
+    clear_rate_limiters()
+    yield
+    session.clear_clients()
+    clear_rate_limiters()
+    for name, value in original_env.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+@pytest.fixture(scope="module", autouse=True)
+def baselines():
+    """Load the baselines, and rewrite them when ECS_CONNECT_BENCHMARK_UPDATE is set"""
+    try:
+        with open(BASELINES_PATH) as baselines_file:
+            loaded = json.load(baselines_file)
+    except FileNotFoundError:
+        loaded = dict()
+
+    yield loaded
+
+    if os.getenv("ECS_CONNECT_BENCHMARK_UPDATE"):
+        for scale, operations in _results.items():
+            loaded.setdefault(scale, dict()).update(operations)
+        with open(BASELINES_PATH, "w") as baselines_file:
+            json.dump(loaded, baselines_file, indent=4, sort_keys=True)
+            baselines_file.write("\n")
+
+
+def _client(resource):
+    return boto3.client(
+        resource,
+        endpoint_url=ENDPOINT_URL,
+        region_name=REGION,
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+
+
+def _seed_estate(scale: int) -> dict:
+    """Seed a cluster of `scale` services and `scale` tasks, once per endpoint
+
+    Tasks are spread TASKS_PER_SERVICE per service over the first services.
+    """
+    ecs_client = _client("ecs")
+    cluster_name = f"bench-{scale}"
+    estate = {"cluster_name": cluster_name, "service_name": "bench-service-0"}
+
+    services = ecs_client.get_paginator("list_services").paginate(cluster=cluster_name)
+    try:
+        seeded = sum(len(page["serviceArns"]) for page in services)
+    except ecs_client.exceptions.ClusterNotFoundException:
+        seeded = 0
+    if seeded >= scale:
+        return estate
+
+    ecs_client.create_cluster(clusterName=cluster_name)
+    task_definition_arn = ecs_client.register_task_definition(
+        family=f"bench-family-{scale}",
+        networkMode="bridge",
+        requiresCompatibilities=["EC2"],
+        containerDefinitions=[
+            {
+                "name": "app",
+                "image": "public.ecr.aws/docker/library/alpine:latest",
+                "essential": True,
+                "memory": 1,
+                "cpu": 1,
+            }
+        ],
+    )["taskDefinition"]["taskDefinitionArn"]
+
+    # run_task places tasks on a registered container instance
+    ec2_client = _client("ec2")
+    instance_id = ec2_client.run_instances(
+        ImageId="ami-12c6146b", MinCount=1, MaxCount=1
+    )["Instances"][0]["InstanceId"]
+    ecs_client.register_container_instance(
+        cluster=cluster_name,
+        instanceIdentityDocument=json.dumps(
+            {"instanceId": instance_id, "region": REGION}
+        ),
+    )
+
+    for index in range(scale):
+        service_name = f"bench-service-{index}"
+        ecs_client.create_service(
+            cluster=cluster_name,
+            serviceName=service_name,
+            taskDefinition=task_definition_arn,
+            desiredCount=0,
+            launchType="EC2",
+        )
+        if index * TASKS_PER_SERVICE < scale:
+            ecs_client.run_task(
+                cluster=cluster_name,
+                taskDefinition=task_definition_arn,
+                count=min(TASKS_PER_SERVICE, scale - index * TASKS_PER_SERVICE),
+                launchType="EC2",
+                startedBy=service_name,
+                group=f"service:{service_name}",
+            )
+
+    return estate
+
+
+@pytest.fixture(scope="module", params=SCALES, ids=lambda scale: f"{scale}")
+def estate(request, aws_env):
+    seeded = _seed_estate(request.param)
+    seeded["scale"] = str(request.param)
+    seeded["task_arn"] = get_task_arn(
+        PROFILE, seeded["cluster_name"], seeded["service_name"]
+    )[0]
+    return seeded
+
+
+def _strip_page_token(params, model, context, **kwargs):
+    """Take the offset out of a page token of ours before the request is sent"""
+    if model.name not in PAGE_SIZES:
+        return
+    if model.name == "ListTasks":
+        context["benchmark_cluster"] = params.get("cluster", "default").rpartition("/")[2]
+        if "serviceName" in params:
+            # The seeded tasks are started by their service
+            params["startedBy"] = params.pop("serviceName")
+    page_size = min(params.get("maxResults") or PAGE_SIZES[model.name], 100)
+    offset = 0
+    if str(params.get("nextToken", "")).startswith(PAGE_TOKEN):
+        offset = int(params.pop("nextToken")[len(PAGE_TOKEN) :])
+    context["benchmark_page"] = (offset, page_size)
+
+
+def _paginate_response(parsed, model, context, **kwargs):
+    """Cut a response holding every item into pages of the real page size"""
+    if "benchmark_page" not in context or parsed.get("nextToken"):
+        return
+    offset, page_size = context["benchmark_page"]
+    items = parsed.get(RESULT_KEYS[model.name], [])
+    if "benchmark_cluster" in context:
+        items = [item for item in items if f"/{context['benchmark_cluster']}/" in item]
+    parsed[RESULT_KEYS[model.name]] = items[offset : offset + page_size]
+    if offset + page_size < len(items):
+        parsed["nextToken"] = f"{PAGE_TOKEN}{offset + page_size}"
+
+
+@pytest.fixture
+def api_calls(monkeypatch):
+    """Count the AWS API calls of the pooled clients, paginated like AWS does"""
+    calls = list()
+    get_client = session.get_client
+
+    def _count_call(event_name, **kwargs):
+        calls.append(event_name.rpartition(".")[2])
+
+    def _counted_get_client(*args, **kwargs):
+        client = get_client(*args, **kwargs)
+        events = client.meta.events
+        events.register("before-call", _count_call, unique_id="ecs-connect-benchmark")
+        events.register(
+            "before-parameter-build.ecs",
+            _strip_page_token,
+            unique_id="ecs-connect-benchmark-page-token",
+        )
+        events.register(
+            "after-call.ecs", _paginate_response, unique_id="ecs-connect-benchmark-page"
+        )
+        return client
+
+    session.clear_clients()
+    monkeypatch.setattr(session, "get_client", _counted_get_client)
+    yield calls
+    session.clear_clients()
+
+
+def _measure(api_calls: list, operation) -> dict:
+    """Median duration of REPEAT runs and API calls of a run, without memoization"""
+    durations = list()
+    for _ in range(REPEAT):
+        clear_describe_cache()
+        prefetch.clear()
+        api_calls.clear()
+        started = time.perf_counter()
+        operation()
+        durations.append(time.perf_counter() - started)
+
+    return {"calls": len(api_calls), "seconds": round(statistics.median(durations), 4)}
+
+
+def _check_baseline(baselines: dict, scale: str, name: str, measured: dict) -> None:
+    _results.setdefault(scale, dict())[name] = measured
+    baseline = baselines.get(scale, dict()).get(name)
+    if baseline is None or os.getenv("ECS_CONNECT_BENCHMARK_UPDATE"):
+        pytest.skip(f"No baseline for {name} at scale {scale}, measured {measured}")
+
+    assert measured["calls"] <= baseline["calls"], (
+        f"{name} at scale {scale} made {measured['calls']} API calls, "
+        f"baseline is {baseline['calls']}"
+    )
+    budget = baseline["seconds"] * TOLERANCE + SLACK
+    assert measured["seconds"] <= budget, (
+        f"{name} at scale {scale} took {measured['seconds']}s, "
+        f"budget is {budget:.4f}s (baseline {baseline['seconds']}s)"
+    )
+
+
+def test_benchmark_get_cluster_arn(estate, api_calls, baselines):
+    measured = _measure(api_calls, lambda: get_cluster_arn(PROFILE))
+
+    _check_baseline(baselines, estate["scale"], "get_cluster_arn", measured)
+
+
+def test_benchmark_get_service_arn(estate, api_calls, baselines):
+    measured = _measure(
+        api_calls, lambda: get_service_arn(PROFILE, estate["cluster_name"])
+    )
+
+    _check_baseline(baselines, estate["scale"], "get_service_arn", measured)
+
+
+def test_benchmark_get_task_arn(estate, api_calls, baselines):
+    measured = _measure(
+        api_calls,
+        lambda: get_task_arn(PROFILE, estate["cluster_name"], estate["service_name"]),
+    )
+
+    _check_baseline(baselines, estate["scale"], "get_task_arn", measured)
+
+
+def test_benchmark_get_container_name(estate, api_calls, baselines):
+    measured = _measure(
+        api_calls,
+        lambda: get_container_name(
+            PROFILE, estate["cluster_name"], estate["task_arn"]
+        ),
+    )
+
+    _check_baseline(baselines, estate["scale"], "get_container_name", measured)
+
+
+def test_benchmark_connect_discovery(estate, api_calls, baselines):
+    def _discover():
+        # The menus of connect: cluster, service, task then container
+        menu.make_choice(choice="cluster_name", profile=PROFILE)
+        menu.make_choice(
+            choice="service_name",
+            profile=PROFILE,
+            cluster_name=estate["cluster_name"],
+        )
+        task_arns = menu.make_choice(
+            choice="task_arn",
+            profile=PROFILE,
+            cluster_name=estate["cluster_name"],
+            service_name=estate["service_name"],
+        )
+        menu.make_choice(
+            choice="container_name",
+            profile=PROFILE,
+            cluster_name=estate["cluster_name"],
+            task_name=task_arns[0]["value"],
+        )
+
+    measured = _measure(api_calls, _discover)
+
+    _check_baseline(baselines, estate["scale"], "connect_discovery", measured)
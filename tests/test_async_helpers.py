@@ -0,0 +1,40 @@
+import asyncio
+
+from ecs_connect_cli import async_helpers
+
+
+class _FakeEcsClient:
+    def __init__(self):
+        self.calls = []
+
+    def _record(self, action, kwargs):
+        self.calls.append((action, kwargs))
+
+    def list_clusters(self, **kwargs):
+        self._record("list_clusters", kwargs)
+        if "nextToken" not in kwargs:
+            return {"clusterArns": ["arn/cluster-a"], "nextToken": "page-2"}
+        return {"clusterArns": ["arn/cluster-b"]}
+
+    def list_services(self, **kwargs):
+        self._record("list_services", kwargs)
+        cluster = kwargs["cluster"].rpartition("/")[2]
+        return {"serviceArns": [f"arn/{cluster}/service-1", f"arn/{cluster}/service-2"]}
+
+    def list_tasks(self, **kwargs):
+        self._record("list_tasks", kwargs)
+        return {"taskArns": [f"arn/task/{kwargs['serviceName']}"]}
+
+
+def test_walk_task_arn_follows_pages_and_walks_every_service(monkeypatch):
+    client = _FakeEcsClient()
+    monkeypatch.setattr(async_helpers, "get_client", lambda profile, resource: client)
+
+    inventory = asyncio.run(async_helpers.walk_task_arn("dev-profile"))
+
+    assert list(inventory) == ["arn/cluster-a", "arn/cluster-b"]
+    assert inventory["arn/cluster-b"] == {
+        "arn/cluster-b/service-1": ["arn/task/service-1"],
+        "arn/cluster-b/service-2": ["arn/task/service-2"],
+    }
+    assert len(client.calls) == 2 + 2 + 4
@@ -0,0 +1,83 @@
+import os
+import time
+
+import pytest
+
+from ecs_connect_cli import cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("ECS_CONNECT_CACHE_DIR", str(tmp_path))
+    cache.set_refresh(False)
+    yield tmp_path
+    cache.set_refresh(False)
+
+
+def test_cached_fetches_once_while_fresh():
+    calls = []
+
+    def _fetch():
+        calls.append(1)
+        return ["cluster-a"]
+
+    assert cache.cached("clusters", ["dev-profile", "us-east-1", None], _fetch) == ["cluster-a"]
+    assert cache.cached("clusters", ["dev-profile", "us-east-1", None], _fetch) == ["cluster-a"]
+    assert len(calls) == 1
+
+
+def test_cached_serves_stale_entry_and_revalidates(monkeypatch):
+    key = ["dev-profile", "us-east-1", None, "cluster-a"]
+    cache.write("services", key, ["old-service"], updated_at=time.time() - 3600)
+    revalidated = []
+    monkeypatch.setattr(cache, "_revalidate", lambda level, key, fetch: revalidated.append(fetch()))
+
+    assert cache.cached("services", key, lambda: ["new-service"]) == ["old-service"]
+    assert revalidated == [["new-service"]]
+
+
+def test_cached_fetches_entries_too_stale_to_serve(monkeypatch):
+    key = ["dev-profile", "us-east-1", None, "cluster-a", "service-a"]
+    cache.write("tasks", key, ["stopped-task"], updated_at=time.time() - 7 * 86400)
+    monkeypatch.setattr(cache, "_revalidate", lambda level, key, fetch: pytest.fail("revalidated"))
+
+    assert not cache.is_cached("tasks", key)
+    assert cache.cached("tasks", key, lambda: ["running-task"]) == ["running-task"]
+    assert cache.read("tasks", key)["value"] == ["running-task"]
+
+
+def test_refresh_and_zero_ttl_bypass_the_cache(monkeypatch):
+    key = ["dev-profile", "us-east-1", None, "cluster-a", "service-a"]
+    cache.write("tasks", key, ["old-task"])
+
+    cache.set_refresh(True)
+    assert cache.cached("tasks", key, lambda: ["new-task"]) == ["new-task"]
+    assert cache.read("tasks", key)["value"] == ["new-task"]
+
+    cache.set_refresh(False)
+    monkeypatch.setenv("ECS_CONNECT_CACHE_TTL_TASKS", "0")
+    assert cache.cached("tasks", key, lambda: ["live-task"]) == ["live-task"]
+
+
+def test_cached_forever_evicts_least_recently_used_entries(monkeypatch, cache_dir):
+    monkeypatch.setenv("ECS_CONNECT_CACHE_MAX_SIZE_TASK_DEFINITIONS", "2500")
+    calls = []
+
+    def _fetch(revision):
+        calls.append(revision)
+        return {"revision": revision, "padding": "x" * 1000}
+
+    for revision in (1, 2):
+        cache.cached_forever("task_definitions", [f"app:{revision}"], lambda: _fetch(revision))
+    # Entries are marked as used with their mtime
+    for age, revision in ((20, 1), (30, 2)):
+        path = cache._cache_path("task_definitions", [f"app:{revision}"])
+        os.utime(path, (time.time() - age, time.time() - age))
+    assert cache.cached_forever("task_definitions", ["app:1"], lambda: _fetch(1))["revision"] == 1
+
+    cache.cached_forever("task_definitions", ["app:3"], lambda: _fetch(3))
+
+    assert cache.read("task_definitions", ["app:1"]) is not None
+    assert cache.read("task_definitions", ["app:2"]) is None
+    assert cache.read("task_definitions", ["app:3"]) is not None
+    assert calls == [1, 2, 3]
@@ -57,19 +57,26 @@ def test_connect_builds_expected_command_with_profile(monkeypatch):
             "container-a",
         ]
     )
-    command_run = {}
+    sessions = []
 
     monkeypatch.setattr(cli, "make_choice", _fake_make_choice)
     monkeypatch.setattr(cli.prompt, "prompt_choice", lambda *_args, **_kwargs: next(prompts))
-    monkeypatch.setattr(
-        cli.subprocess, "run", lambda command, shell: command_run.update({"command": command, "shell": shell})
-    )
+    monkeypatch.setattr(cli, "start_session", lambda *args, **kwargs: sessions.append((args, kwargs)))
 
     result = runner.invoke(cli.app, ["connect"])
     assert result.exit_code == 0
-    assert command_run["shell"] is True
-    assert '--command "/bin/bash" --interactive' in command_run["command"]
-    assert "--profile dev-profile" in command_run["command"]
+    assert sessions == [
+        (
+            (
+                "dev-profile",
+                "cluster-a",
+                "arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1",
+                "container-a",
+                "/bin/bash",
+            ),
+            {},
+        )
+    ]
 
 
 def test_tail_uses_region_from_ec2_metadata(monkeypatch):
@@ -87,16 +94,32 @@ def test_tail_uses_region_from_ec2_metadata(monkeypatch):
     monkeypatch.delenv("AWS_DEFAULT_REGION", raising=False)
     monkeypatch.setattr(cli, "make_choice", _fake_make_choice)
     monkeypatch.setattr(cli.prompt, "prompt_choice", lambda *_args, **_kwargs: next(prompts))
-    monkeypatch.setattr(cli, "get_task_defintion_arn", lambda **_kwargs: "task-definition-1")
-    monkeypatch.setattr(cli, "get_log_group", lambda **_kwargs: "/aws/ecs/cluster-a")
     monkeypatch.setattr(
-        cli.subprocess, "run", lambda command, shell: command_run.update({"command": command, "shell": shell})
+        cli,
+        "get_log_target",
+        lambda profile, cluster_name, task_name, container_name: (
+            "/aws/ecs/cluster-a",
+            f"ecs/{container_name}/{task_name.rpartition('/')[2]}",
+        ),
+    )
+    monkeypatch.setattr(
+        cli,
+        "build_log_sources",
+        lambda profile, log_targets, **kwargs: command_run.update(
+            {"profile": profile, "log_targets": log_targets, **kwargs}
+        ),
+    )
+    monkeypatch.setattr(
+        cli, "iter_merged_log_events", lambda sources, **kwargs: command_run.update(kwargs) or []
     )
 
-    result = runner.invoke(cli.app, ["tail"])
+    result = runner.invoke(cli.app, ["tail", "--batch-size", "200"])
     assert result.exit_code == 0
     assert os.environ["AWS_DEFAULT_REGION"] == "us-east-1"
-    assert command_run["command"] == "aws logs tail /aws/ecs/cluster-a --follow --color=on"
+    assert command_run["profile"] == "EC2_INSTANCE_METADATA"
+    assert command_run["log_targets"] == [("/aws/ecs/cluster-a", "ecs/container-a/task-1")]
+    assert command_run["follow"] is True
+    assert command_run["batch_size"] == 200
 
 
 def test_exec_command_builds_expected_command_with_output(monkeypatch):
@@ -110,19 +133,233 @@ def test_exec_command_builds_expected_command_with_output(monkeypatch):
             "container-a",
         ]
     )
-    command_run = {}
+    sessions = []
+
+    def _fake_start_session(*args, stdout=None):
+        stdout.write("PATH=/usr/bin\n")
+        sessions.append(args)
+
+    monkeypatch.setattr(cli, "make_choice", _fake_make_choice)
+    monkeypatch.setattr(cli.prompt, "prompt_choice", lambda *_args, **_kwargs: next(prompts))
+    monkeypatch.setattr(cli, "start_session", _fake_start_session)
+
+    with runner.isolated_filesystem():
+        result = runner.invoke(
+            cli.app,
+            ["exec-command", "--command", "printenv", "--output-filename", "out.txt"],
+        )
+        with open("out.txt") as output:
+            assert output.read() == "PATH=/usr/bin\n"
+
+    assert result.exit_code == 0
+    assert sessions == [
+        (
+            "dev-profile",
+            "cluster-a",
+            "arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1",
+            "container-a",
+            "printenv",
+        )
+    ]
+
+
+def test_connect_with_options_skips_every_prompt(monkeypatch):
+    sessions = []
+
+    monkeypatch.setattr(cli, "make_choice", lambda *_args, **_kwargs: pytest.fail("discovery call"))
+    monkeypatch.setattr(cli.prompt, "prompt_choice", lambda *_args, **_kwargs: pytest.fail("prompted"))
+    monkeypatch.setattr(cli, "start_session", lambda *args: sessions.append(args))
+
+    result = runner.invoke(
+        cli.app,
+        [
+            "connect",
+            "--profile",
+            "dev-profile",
+            "--cluster",
+            "cluster-a",
+            "--task",
+            "task-1",
+            "--container",
+            "container-a",
+        ],
+    )
+    assert result.exit_code == 0
+    assert sessions == [("dev-profile", "cluster-a", "task-1", "container-a", "/bin/bash")]
+
+
+def test_connect_with_target_selector_uses_first_running_task(monkeypatch):
+    sessions = []
+    monkeypatch.delenv("AWS_DEFAULT_REGION", raising=False)
+    monkeypatch.setattr(cli, "make_choice", lambda *_args, **_kwargs: pytest.fail("discovery call"))
+    monkeypatch.setattr(cli.prompt, "prompt_choice", lambda *_args, **_kwargs: pytest.fail("prompted"))
+    monkeypatch.setattr(
+        cli,
+        "get_first_task_arn",
+        lambda profile, cluster_name, service_name: f"arn:aws:ecs:us-east-1:111111111111:task/{cluster_name}/task-1",
+    )
+    monkeypatch.setattr(cli, "start_session", lambda *args: sessions.append(args))
+
+    result = runner.invoke(cli.app, ["connect", "--region", "us-east-1", "--target", "cluster-a/service-a:container-a"])
+    assert result.exit_code == 0
+    assert os.environ["AWS_DEFAULT_REGION"] == "us-east-1"
+    assert sessions == [
+        (
+            "EC2_INSTANCE_METADATA",
+            "cluster-a",
+            "arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1",
+            "container-a",
+            "/bin/bash",
+        )
+    ]
+
+
+def _ready_task(task_arn, *container_names):
+    return {
+        "taskArn": task_arn,
+        "lastStatus": "RUNNING",
+        "enableExecuteCommand": True,
+        "containers": [
+            {"name": name, "managedAgents": [{"name": "ExecuteCommandAgent", "lastStatus": "RUNNING"}]}
+            for name in container_names
+        ],
+    }
+
+
+def test_exec_command_all_tasks_fans_out_on_every_task(monkeypatch):
+    prompts = iter(["container-a"])
+    fan_out = {}
+    described = []
+
+    def _fake_run_fan_out(task_names, build_command, concurrency, timeout, output):
+        commands, errors = [], []
+        for task_name in task_names:
+            try:
+                commands.append(build_command(task_name))
+            except Exception as Err:
+                errors.append(str(Err))
+        fan_out.update({"commands": commands, "errors": errors, "concurrency": concurrency})
+        return [{"task": task_name, "status": "OK", "returncode": 0, "duration": 0.1} for task_name in task_names]
 
     monkeypatch.setattr(cli, "make_choice", _fake_make_choice)
     monkeypatch.setattr(cli.prompt, "prompt_choice", lambda *_args, **_kwargs: next(prompts))
+    monkeypatch.setattr(cli, "get_task_arn", lambda profile, cluster_name, service_name: ["task-1", "task-2", "task-3"])
     monkeypatch.setattr(
-        cli.subprocess, "run", lambda command, shell: command_run.update({"command": command, "shell": shell})
+        cli,
+        "describe_tasks",
+        lambda profile, cluster_name, task_names: described.append(task_names)
+        or [
+            _ready_task("cluster-a/task-1", "container-a"),
+            _ready_task("cluster-a/task-2", "container-a"),
+            {"taskArn": "cluster-a/task-3", "lastStatus": "RUNNING", "containers": [{"name": "container-a"}]},
+        ],
+    )
+    monkeypatch.setattr(cli, "run_fan_out", _fake_run_fan_out)
+    monkeypatch.setattr(
+        cli,
+        "get_session_command",
+        lambda profile, cluster_name, task_name, container_name, command: [
+            "session-manager-plugin",
+            profile,
+            cluster_name,
+            task_name,
+            container_name,
+            command,
+        ],
     )
 
     result = runner.invoke(
         cli.app,
-        ["exec-command", "--command", "printenv", "--output-filename", "out.txt"],
+        [
+            "exec-command",
+            "--command",
+            "cat /etc/hosts",
+            "--profile",
+            "dev-profile",
+            "--cluster",
+            "cluster-a",
+            "--service",
+            "service-a",
+            "--all-tasks",
+            "--concurrency",
+            "5",
+        ],
     )
     assert result.exit_code == 0
-    assert '--command "printenv" --interactive' in command_run["command"]
-    assert "--profile dev-profile" in command_run["command"]
-    assert command_run["command"].endswith("> out.txt")
+    assert fan_out["concurrency"] == 5
+    assert fan_out["commands"] == [
+        ["session-manager-plugin", "dev-profile", "cluster-a", "task-1", "container-a", "cat /etc/hosts"],
+        ["session-manager-plugin", "dev-profile", "cluster-a", "task-2", "container-a", "cat /etc/hosts"],
+    ]
+    # One batched describe_tasks, the not ready task fails without a session
+    assert described == [["task-1", "task-2", "task-3"]]
+    assert fan_out["errors"] == ["execute command is not enabled on task task-3"]
+
+
+def test_exec_command_all_services_uses_the_container_of_each_task(monkeypatch):
+    fan_out = {}
+
+    def _fake_run_fan_out(task_names, build_command, concurrency, timeout, output):
+        results = list()
+        for task_name in task_names:
+            try:
+                results.append({"task": task_name, "command": build_command(task_name), "status": "OK"})
+            except ValueError as Err:
+                results.append({"task": task_name, "error": str(Err), "status": "FAILED"})
+        fan_out["results"] = results
+        return results
+
+    monkeypatch.setattr(cli, "get_service_name", lambda profile, cluster_name: ["cluster-a/api", "cluster-a/web"])
+    monkeypatch.setattr(cli, "get_task_arn", lambda profile, cluster_name, service_name: [f"{service_name}-1"])
+    monkeypatch.setattr(
+        cli,
+        "describe_tasks",
+        lambda profile, cluster_name, task_names: [
+            _ready_task("cluster-a/api-1", "api"),
+            _ready_task("cluster-a/web-1", "nginx", "app"),
+        ],
+    )
+    monkeypatch.setattr(cli, "run_fan_out", _fake_run_fan_out)
+    monkeypatch.setattr(cli, "print_summary", lambda results: None)
+    monkeypatch.setattr(
+        cli,
+        "get_session_command",
+        lambda profile, cluster_name, task_name, container_name, command: [task_name, container_name],
+    )
+
+    result = runner.invoke(
+        cli.app,
+        ["exec-command", "--command", "id", "--profile", "dev-profile", "--cluster", "cluster-a", "--all-services"],
+    )
+
+    assert result.exit_code == 1
+    assert fan_out["results"][0]["command"] == ["cluster-a/api-1", "api"]
+    assert "has 2 containers (nginx, app), use --container" in fan_out["results"][1]["error"]
+
+
+def test_select_log_targets_all_tasks_describes_them_at_once(monkeypatch, capsys):
+    described = []
+    monkeypatch.setattr(cli, "_select_service_tasks", lambda *args: ("cluster-a", ["task-1", "task-2"], None))
+    monkeypatch.setattr(cli, "describe_tasks", lambda profile, cluster_name, task_names: described.append(task_names))
+    monkeypatch.setattr(cli, "get_logged_container_name", lambda profile, cluster_name, task_name: ["app"])
+    monkeypatch.setattr(
+        cli,
+        "get_log_target",
+        lambda profile, cluster_name, task_name, name: ("/ecs/app", f"ecs/{name}/{task_name}"),
+    )
+
+    log_targets = cli._select_log_targets("dev-profile", all_tasks=True, all_containers=True)
+
+    assert log_targets == [("/ecs/app", "ecs/app/task-1"), ("/ecs/app", "ecs/app/task-2")]
+    assert described == [["task-1", "task-2"]]
+    assert "Retrieving log for 2 container(s) ..." in capsys.readouterr().out
+
+
+def test_select_log_targets_names_the_single_logged_container(monkeypatch, capsys):
+    monkeypatch.setattr(cli, "_select_container", lambda *args, **kwargs: ("cluster-a", "task-1", None))
+    monkeypatch.setattr(cli, "get_logged_container_name", lambda profile, cluster_name, task_name: ["app"])
+    monkeypatch.setattr(cli, "get_log_target", lambda *args: ("/ecs/app", "ecs/app/task-1"))
+
+    cli._select_log_targets("dev-profile", all_containers=True)
+
+    assert "Retrieving log for app ..." in capsys.readouterr().out
@@ -0,0 +1,29 @@
+import pytest
+
+from ecs_connect_cli import cache
+from ecs_connect_cli import credentials
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("ECS_CONNECT_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("ECS_CONNECT_AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    cache.set_refresh(False)
+
+
+def test_which_region_is_seeded_from_bundled_endpoints(monkeypatch):
+    revalidated = []
+    monkeypatch.setattr(cache, "_revalidate", lambda level, key, fetch: revalidated.append(level))
+
+    regions = credentials.which_region()
+
+    assert "us-east-1" in regions
+    assert revalidated == ["regions"]
+
+
+def test_which_region_does_not_call_ec2_while_fresh(monkeypatch):
+    cache.write("regions", [None], ["eu-west-3"])
+    monkeypatch.setattr(credentials, "_describe_regions", lambda: pytest.fail("describe_regions called"))
+
+    assert credentials.which_region() == ["eu-west-3"]
@@ -0,0 +1,304 @@
+import json
+import threading
+
+import pytest
+
+from ecs_connect_cli import daemon
+from ecs_connect_cli import events
+
+
+class _FakeEcsClient:
+    def __init__(self):
+        self.calls = []
+
+    def list_clusters(self, **kwargs):
+        self.calls.append("list_clusters")
+        return {"clusterArns": ["arn:aws:ecs:us-east-1:1:cluster/cluster-a"]}
+
+    def list_services(self, **kwargs):
+        self.calls.append("list_services")
+        return {"serviceArns": ["arn:aws:ecs:us-east-1:1:service/cluster-a/api"]}
+
+    def describe_services(self, **kwargs):
+        self.calls.append("describe_services")
+        return {"services": [{"serviceArn": arn, "deployments": [{"id": "ecs-svc/1"}]} for arn in kwargs["services"]]}
+
+    def list_tasks(self, **kwargs):
+        self.calls.append("list_tasks")
+        if "nextToken" not in kwargs:
+            return {"taskArns": ["arn:aws:ecs:us-east-1:1:task/cluster-a/task-1"], "nextToken": "page-2"}
+        return {"taskArns": ["arn:aws:ecs:us-east-1:1:task/cluster-a/task-2"]}
+
+    def describe_tasks(self, **kwargs):
+        self.calls.append("describe_tasks")
+        return {
+            "tasks": [
+                {
+                    "taskArn": arn,
+                    "group": "service:api" if arn.endswith("task-1") else "family:batch",
+                    "lastStatus": "RUNNING",
+                    "containers": [{"name": "app"}],
+                }
+                for arn in kwargs["tasks"]
+            ]
+        }
+
+
+class _FakeEstateClient:
+    """Two services of two tasks, whose deployments can be changed"""
+
+    def __init__(self):
+        self.calls = []
+        self.deployments = {"api": "2024-01-01", "web": "2024-01-01"}
+        self.tasks = {"api": ["api-1", "api-2"], "web": ["web-1", "web-2"]}
+
+    def list_clusters(self, **kwargs):
+        self.calls.append("list_clusters")
+        return {"clusterArns": ["arn:aws:ecs:us-east-1:1:cluster/cluster-a"]}
+
+    def list_services(self, **kwargs):
+        self.calls.append("list_services")
+        return {"serviceArns": [f"arn:aws:ecs:us-east-1:1:service/cluster-a/{name}" for name in self.tasks]}
+
+    def describe_services(self, **kwargs):
+        self.calls.append("describe_services")
+        return {
+            "services": [
+                {
+                    "serviceArn": arn,
+                    "deployments": [{"id": "ecs-svc/1", "updatedAt": self.deployments[arn.rpartition("/")[2]]}],
+                }
+                for arn in kwargs["services"]
+            ]
+        }
+
+    def list_tasks(self, **kwargs):
+        self.calls.append(f"list_tasks:{kwargs.get('serviceName', '*')}")
+        names = [kwargs["serviceName"]] if "serviceName" in kwargs else list(self.tasks)
+        return {
+            "taskArns": [
+                f"arn:aws:ecs:us-east-1:1:task/cluster-a/{task_id}" for name in names for task_id in self.tasks[name]
+            ]
+        }
+
+    def describe_tasks(self, **kwargs):
+        self.calls.append(f"describe_tasks:{len(kwargs['tasks'])}")
+        return {
+            "tasks": [
+                {"taskArn": arn, "group": f"service:{arn.rpartition('/')[2].partition('-')[0]}", "lastStatus": "RUNNING"}
+                for arn in kwargs["tasks"]
+            ]
+        }
+
+
+def _task_ids(snapshot, service):
+    return [arn.rpartition("/")[2] for arn in snapshot["tasks"][("cluster-a", f"cluster-a/{service}")]]
+
+
+@pytest.fixture
+def socket_path(monkeypatch, tmp_path):
+    path = tmp_path / "daemon.sock"
+    monkeypatch.setenv("ECS_CONNECT_DAEMON_SOCKET", str(path))
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.delenv("ECS_CONNECT_AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    return path
+
+
+def test_walk_estate_lists_each_cluster_once(monkeypatch):
+    client = _FakeEcsClient()
+    monkeypatch.setattr(daemon, "get_client", lambda profile, resource, region_name=None: client)
+
+    snapshot = daemon.walk_estate("dev-profile", "us-east-1")
+
+    assert client.calls == [
+        "list_clusters",
+        "list_services",
+        "describe_services",
+        "list_tasks",
+        "list_tasks",
+        "describe_tasks",
+    ]
+    assert daemon.lookup(snapshot, "cluster_name") == ["cluster-a"]
+    assert daemon.lookup(snapshot, "service_name", "cluster-a") == ["cluster-a/api"]
+    assert daemon.lookup(snapshot, "task_arn", "cluster-a", "cluster-a/api") == [
+        {
+            "name": "task-1  RUNNING  UNKNOWN  -  -  -  exec:disabled  [no exec]",
+            "value": "arn:aws:ecs:us-east-1:1:task/cluster-a/task-1",
+        }
+    ]
+    assert daemon.lookup(snapshot, "container_name", "cluster-a", task_name="task-2") == ["app"]
+    assert daemon.lookup(snapshot, "service_name", "cluster-b") is None
+
+
+def test_query_is_answered_over_the_socket(monkeypatch, socket_path):
+    client = _FakeEcsClient()
+    monkeypatch.setattr(daemon, "get_client", lambda profile, resource, region_name=None: client)
+    snapshots = {("dev-profile", "us-east-1", None): daemon.walk_estate("dev-profile", "us-east-1")}
+    server = daemon.create_server(socket_path, snapshots)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        with pytest.raises(RuntimeError):
+            daemon.create_server(socket_path, snapshots)
+        assert daemon.query("cluster_name", "dev-profile") == ["cluster-a"]
+        assert daemon.query("service_name", "dev-profile", cluster_name="cluster-a") == ["cluster-a/api"]
+        # Not kept by the daemon
+        assert daemon.query("cluster_name", "prod-profile") is None
+        assert daemon.query("region", "dev-profile") is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_query_without_daemon_returns_none(socket_path):
+    assert daemon.query("cluster_name", "dev-profile") is None
+
+    # Left over by a killed daemon
+    socket_path.touch()
+
+    assert daemon.query("cluster_name", "dev-profile") is None
+
+
+def test_walk_estate_refetches_only_changed_services(monkeypatch):
+    client = _FakeEstateClient()
+    monkeypatch.setattr(daemon, "get_client", lambda profile, resource, region_name=None: client)
+    snapshot = daemon.walk_estate("dev-profile", "us-east-1")
+    assert snapshot["refreshed"] == 2
+
+    # Nothing deployed: the tasks are kept without listing them
+    client.calls.clear()
+    client.tasks["web"] = ["web-3"]
+    snapshot = daemon.walk_estate("dev-profile", "us-east-1", previous=snapshot)
+
+    assert client.calls == ["list_clusters", "list_services", "describe_services"]
+    assert snapshot["refreshed"] == 0
+    assert _task_ids(snapshot, "web") == ["web-1", "web-2"]
+    assert ("cluster-a", "web-1") in snapshot["descriptions"]
+
+    # A new deployment of web: only its tasks are listed and described again
+    client.calls.clear()
+    client.deployments["web"] = "2024-01-02"
+    snapshot = daemon.walk_estate("dev-profile", "us-east-1", previous=snapshot)
+
+    assert client.calls == ["list_clusters", "list_services", "describe_services", "list_tasks:web", "describe_tasks:1"]
+    assert snapshot["refreshed"] == 1
+    assert _task_ids(snapshot, "api") == ["api-1", "api-2"]
+    assert _task_ids(snapshot, "web") == ["web-3"]
+    assert ("cluster-a", "web-1") not in snapshot["descriptions"]
+
+
+def test_apply_events_updates_the_snapshot(monkeypatch):
+    client = _FakeEstateClient()
+    monkeypatch.setattr(daemon, "get_client", lambda profile, resource, region_name=None: client)
+    snapshot = daemon.walk_estate("dev-profile", "us-east-1")
+
+    def _task_event(task_id, last_status, region="us-east-1"):
+        return {
+            "detail-type": "ECS Task State Change",
+            "region": region,
+            "detail": {
+                "clusterArn": "arn:aws:ecs:us-east-1:1:cluster/cluster-a",
+                "taskArn": f"arn:aws:ecs:us-east-1:1:task/cluster-a/{task_id}",
+                "group": "service:api",
+                "lastStatus": last_status,
+                "desiredStatus": "RUNNING",
+                "startedAt": "2024-01-02T10:30:00.123Z",
+            },
+        }
+
+    applied = events.apply_events(
+        snapshot,
+        [
+            _task_event("api-3", "RUNNING"),
+            _task_event("api-1", "STOPPED"),
+            _task_event("api-4", "RUNNING", region="eu-west-1"),
+            {
+                "detail-type": "ECS Deployment State Change",
+                "region": "us-east-1",
+                "resources": ["arn:aws:ecs:us-east-1:1:service/cluster-a/web"],
+            },
+        ],
+        region="us-east-1",
+    )
+
+    assert applied == 3
+    assert _task_ids(snapshot, "api") == ["api-2", "api-3"]
+    assert ("cluster-a", "api-1") not in snapshot["descriptions"]
+    assert daemon.lookup(snapshot, "task_arn", "cluster-a", "cluster-a/api")[1]["name"].startswith(
+        "api-3  RUNNING  UNKNOWN  2024-01-02 10:30"
+    )
+
+    # The deployment event makes the next walk list the tasks of web again
+    client.calls.clear()
+    daemon.walk_estate("dev-profile", "us-east-1", previous=snapshot)
+
+    assert client.calls[3:] == ["list_tasks:web", "describe_tasks:2"]
+
+
+def test_read_events_returns_complete_lines(tmp_path):
+    path = tmp_path / "events.jsonl"
+    event = {"detail-type": "ECS Task State Change"}
+    path.write_text(json.dumps(event) + "\nnot json\n" + '{"detail-type"')
+
+    read, offset = events.read_events(path)
+
+    assert read == [event]
+    assert events.read_events(path, offset) == ([], offset)
+
+    with open(path, "a") as events_file:
+        events_file.write(': "ECS Service Action"}\n')
+
+    assert events.read_events(path, offset)[0] == [{"detail-type": "ECS Service Action"}]
+    assert events.read_events(tmp_path / "missing.jsonl", 3) == ([], 3)
+
+
+def test_query_without_region_uses_the_profile_region(monkeypatch, socket_path):
+    client = _FakeEcsClient()
+    monkeypatch.setattr(daemon, "get_client", lambda profile, resource, region_name=None: client)
+    snapshots = {("dev-profile", "eu-west-1", None): daemon.walk_estate("dev-profile", "eu-west-1")}
+    server = daemon.create_server(socket_path, snapshots, {"dev-profile": "eu-west-1"}, max_age=60)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.delenv("AWS_REGION")
+    monkeypatch.delenv("AWS_DEFAULT_REGION", raising=False)
+
+    try:
+        assert daemon.query("cluster_name", "dev-profile") == ["cluster-a"]
+
+        # Walks failing for too long: the cli calls AWS again
+        snapshots[("dev-profile", "eu-west-1", None)]["taken_at"] -= 61
+        assert daemon.query("cluster_name", "dev-profile") is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_apply_events_drops_late_events(monkeypatch):
+    client = _FakeEstateClient()
+    monkeypatch.setattr(daemon, "get_client", lambda profile, resource, region_name=None: client)
+    snapshot = daemon.walk_estate("dev-profile", "us-east-1")
+    versions = dict()
+
+    def _task_event(last_status, version):
+        return {
+            "detail-type": "ECS Task State Change",
+            "detail": {
+                "clusterArn": "arn:aws:ecs:us-east-1:1:cluster/cluster-a",
+                "taskArn": "arn:aws:ecs:us-east-1:1:task/cluster-a/api-3",
+                "group": "service:api",
+                "lastStatus": last_status,
+                "version": version,
+            },
+        }
+
+    # The RUNNING event is delivered after the STOPPED one
+    applied = events.apply_events(snapshot, [_task_event("STOPPED", 4), _task_event("RUNNING", 3)], versions=versions)
+
+    assert applied == 1
+    assert _task_ids(snapshot, "api") == ["api-1", "api-2"]
+    assert versions == {("cluster-a", "api-3"): 4}
+
+    # Versions are kept across snapshots
+    snapshot = daemon.walk_estate("dev-profile", "us-east-1")
+    assert events.apply_events(snapshot, [_task_event("PENDING", 2)], versions=versions) == 0
+    assert _task_ids(snapshot, "api") == ["api-1", "api-2"]
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from ecs_connect_cli import execute
+from ecs_connect_cli.readiness import ExecNotReady
+
+
+class _FakeEcsClient:
+    class meta:
+        region_name = "us-east-1"
+        endpoint_url = "https://ecs.us-east-1.amazonaws.com"
+
+    def __init__(self):
+        self.calls = []
+
+    def execute_command(self, **kwargs):
+        self.calls.append(kwargs)
+        return {
+            "clusterArn": "arn:aws:ecs:us-east-1:111111111111:cluster/cluster-a",
+            "taskArn": "arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1",
+            "session": {"sessionId": "session-1", "streamUrl": "wss://stream", "tokenValue": "token"},
+        }
+
+
+def test_get_session_command_builds_session_manager_plugin_call(monkeypatch):
+    client = _FakeEcsClient()
+    monkeypatch.setattr(execute, "get_client", lambda profile, resource: client)
+    monkeypatch.setattr(
+        execute,
+        "describe_task",
+        lambda profile, cluster_name, task_name: {
+            "taskArn": "arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1",
+            "lastStatus": "RUNNING",
+            "enableExecuteCommand": True,
+            "containers": [
+                {"name": "sidecar", "runtimeId": "rt-0"},
+                {
+                    "name": "app",
+                    "runtimeId": "rt-1",
+                    "managedAgents": [{"name": "ExecuteCommandAgent", "lastStatus": "RUNNING"}],
+                },
+            ],
+        },
+    )
+
+    args = execute.get_session_command("dev-profile", "cluster-a", "task-1", "app", 'echo "a b"')
+
+    assert client.calls == [
+        {"cluster": "cluster-a", "task": "task-1", "container": "app", "command": 'echo "a b"', "interactive": True}
+    ]
+    assert args[0] == "session-manager-plugin"
+    assert json.loads(args[1])["sessionId"] == "session-1"
+    assert args[2:5] == ["us-east-1", "StartSession", "dev-profile"]
+    assert json.loads(args[5]) == {"Target": "ecs:cluster-a_task-1_rt-1"}
+    assert args[6] == "https://ecs.us-east-1.amazonaws.com"
+
+
+def test_get_session_command_fails_fast_when_exec_is_disabled(monkeypatch):
+    client = _FakeEcsClient()
+    monkeypatch.setattr(execute, "get_client", lambda profile, resource: client)
+    monkeypatch.setattr(
+        execute,
+        "describe_task",
+        lambda profile, cluster_name, task_name: {
+            "taskArn": "arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1",
+            "lastStatus": "RUNNING",
+            "enableExecuteCommand": False,
+            "containers": [{"name": "app", "runtimeId": "rt-1"}],
+        },
+    )
+
+    with pytest.raises(ExecNotReady, match="not enabled on task task-1"):
+        execute.get_session_command("dev-profile", "cluster-a", "task-1", "app", "ls")
+
+    assert client.calls == []
@@ -0,0 +1,53 @@
+import io
+import sys
+
+from ecs_connect_cli import fanout
+
+
+def test_run_fan_out_prefixes_output_and_reports_status():
+    output = io.StringIO()
+
+    def _build_command(task_name):
+        code = 0 if task_name.endswith("task-1") else 3
+        return [sys.executable, "-c", f"print('hello from {task_name}'); raise SystemExit({code})"]
+
+    results = fanout.run_fan_out(
+        ["arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1", "task-2"],
+        _build_command,
+        concurrency=2,
+        output=output,
+    )
+
+    statuses = {result["task"].rpartition("/")[2]: result["status"] for result in results}
+    assert statuses == {"task-1": "OK", "task-2": "FAILED"}
+    assert "[task-1] hello from arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1\n" in output.getvalue()
+    assert "[task-2] hello from task-2\n" in output.getvalue()
+
+
+def test_run_fan_out_kills_commands_after_timeout():
+    results = fanout.run_fan_out(
+        ["task-1"],
+        lambda task_name: [sys.executable, "-c", "import time; time.sleep(10)"],
+        timeout=0.5,
+        output=io.StringIO(),
+    )
+
+    assert results[0]["status"] == "TIMEOUT"
+    assert results[0]["returncode"] is None
+    assert results[0]["duration"] < 5
+
+
+def test_run_fan_out_reports_tasks_whose_setup_exits():
+    def _build_command(task_name):
+        if task_name == "task-2":
+            # Like describe_task for a task that is gone
+            sys.exit(-1)
+        return [sys.executable, "-c", "print('ok')"]
+
+    results = fanout.run_fan_out(["task-1", "task-2", "task-3"], _build_command, output=io.StringIO())
+
+    statuses = {result["task"]: result["status"] for result in results}
+    assert statuses == {"task-1": "OK", "task-2": "FAILED", "task-3": "OK"}
+    assert next(result for result in results if result["task"] == "task-2")["output"] == (
+        "ERROR: session setup exited with status -1\n"
+    )
@@ -0,0 +1,81 @@
+from ecs_connect_cli import find
+
+
+class _FakeEcsClient:
+    def __init__(self, region, services=(), error=None):
+        self.region = region
+        self.services = services
+        self.error = error
+        self.calls = []
+
+    def list_clusters(self, **kwargs):
+        self.calls.append("list_clusters")
+        if self.error:
+            raise RuntimeError(self.error)
+        if not self.services:
+            return {"clusterArns": []}
+        return {"clusterArns": [f"arn:aws:ecs:{self.region}:1:cluster/main"]}
+
+    def list_services(self, **kwargs):
+        self.calls.append("list_services")
+        return {"serviceArns": [f"arn:aws:ecs:{self.region}:1:service/main/{name}" for name in self.services]}
+
+    def list_tasks(self, **kwargs):
+        self.calls.append("list_tasks")
+        return {"taskArns": [f"arn:aws:ecs:{self.region}:1:task/main/{name}-task" for name in self.services]}
+
+    def describe_tasks(self, **kwargs):
+        self.calls.append("describe_tasks")
+        return {
+            "tasks": [
+                {"taskArn": arn, "group": f"service:{arn.rpartition('/')[2][: -len('-task')]}"}
+                for arn in kwargs["tasks"]
+            ]
+        }
+
+
+def _fake_clients(monkeypatch, clients):
+    monkeypatch.setattr(
+        find,
+        "get_client",
+        lambda profile, resource, region_name=None: clients[(profile, region_name)],
+    )
+
+
+def test_iter_matches_searches_every_profile_and_region(monkeypatch):
+    clients = {
+        ("dev", "eu-west-1"): _FakeEcsClient("eu-west-1", services=("api", "worker")),
+        ("dev", "us-east-1"): _FakeEcsClient("us-east-1"),
+        ("prod", "eu-west-1"): _FakeEcsClient("eu-west-1", error="AccessDenied"),
+        ("prod", "us-east-1"): _FakeEcsClient("us-east-1", services=("billing-api",)),
+    }
+    _fake_clients(monkeypatch, clients)
+
+    matches = list(
+        find.iter_matches(["dev", "prod"], ["eu-west-1", "us-east-1"], "API", rate_limit=0)
+    )
+
+    found = sorted(
+        (match["profile"], match["region"], match["kind"], match["service"], match["task"])
+        for match in matches
+        if "error" not in match
+    )
+    assert found == [
+        ("dev", "eu-west-1", "service", "api", None),
+        ("dev", "eu-west-1", "task", "api", "api-task"),
+        ("prod", "us-east-1", "service", "billing-api", None),
+        ("prod", "us-east-1", "task", "billing-api", "billing-api-task"),
+    ]
+    assert [match for match in matches if "error" in match] == [
+        {"profile": "prod", "region": "eu-west-1", "error": "AccessDenied"}
+    ]
+
+
+def test_iter_matches_stops_after_the_first_match(monkeypatch):
+    client = _FakeEcsClient("eu-west-1", services=("api",))
+    _fake_clients(monkeypatch, {("dev", "eu-west-1"): client})
+
+    matches = list(find.iter_matches(["dev"], ["eu-west-1"], "api", rate_limit=0, first=True))
+
+    assert len(matches) == 1
+    assert matches[0]["kind"] == "service"
@@ -0,0 +1,145 @@
+from datetime import datetime
+from datetime import timezone
+
+import pytest
+
+from ecs_connect_cli import helpers
+
+TASK_ARN = "arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1"
+REGISTERED_AT = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def api_calls(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setenv("ECS_CONNECT_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("ECS_CONNECT_AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+
+    def _fake_get_session(**kwargs):
+        calls.append(kwargs["action"])
+        if kwargs["action"] == "describe_tasks":
+            return {
+                "tasks": [
+                    {
+                        "taskArn": TASK_ARN,
+                        "taskDefinitionArn": "arn:aws:ecs:us-east-1:111111111111:task-definition/app:3",
+                        "containers": [{"name": "app"}, {"name": "sidecar"}],
+                    }
+                ]
+            }
+        return {
+            "taskDefinition": {
+                "registeredAt": REGISTERED_AT,
+                "containerDefinitions": [
+                    {
+                        "name": "app",
+                        "logConfiguration": {
+                            "logDriver": "awslogs",
+                            "options": {"awslogs-group": "/ecs/app", "awslogs-stream-prefix": "ecs"},
+                        },
+                    }
+                ]
+            }
+        }
+
+    monkeypatch.setattr(helpers, "get_session", _fake_get_session)
+    helpers.clear_describe_cache()
+    yield calls
+    helpers.clear_describe_cache()
+
+
+def test_task_helpers_share_one_describe_tasks_call(api_calls):
+    # The menu passes the task id while the tail command passes the full arn.
+    containers = helpers.get_container_name("dev-profile", "cluster-a", "task-1")
+    task_definition_arn = helpers.get_task_defintion_arn("dev-profile", "cluster-a", TASK_ARN)
+
+    assert containers == ["app", "sidecar"]
+    assert task_definition_arn.endswith("task-definition/app:3")
+    assert api_calls == ["describe_tasks"]
+
+
+def test_log_helpers_share_one_describe_task_definition_call(api_calls):
+    arn = "arn:aws:ecs:us-east-1:111111111111:task-definition/app:3"
+    options = helpers.get_log_configuration("dev-profile", "app", arn)
+    log_group = helpers.get_log_group("dev-profile", "app", arn)
+
+    assert options["awslogs-stream-prefix"] == "ecs"
+    assert log_group == "/ecs/app"
+    assert api_calls == ["describe_task_definition"]
+
+
+def test_task_definition_revision_is_served_from_disk_in_later_runs(api_calls):
+    arn = "arn:aws:ecs:us-east-1:111111111111:task-definition/app:3"
+    helpers.get_log_group("dev-profile", "app", arn)
+    helpers.clear_describe_cache()
+
+    assert helpers.get_log_group("dev-profile", "app", arn) == "/ecs/app"
+    assert helpers.describe_task_definition("dev-profile", arn)["registeredAt"] == REGISTERED_AT
+    assert api_calls == ["describe_task_definition"]
+
+    # Without revision the latest one is described every run
+    helpers.get_log_group("dev-profile", "app", "app")
+    helpers.clear_describe_cache()
+    helpers.get_log_group("dev-profile", "app", "app")
+
+    assert api_calls == ["describe_task_definition"] * 3
+
+
+def test_task_choices_describe_the_first_tasks_at_once_and_prime_the_cache(monkeypatch):
+    batches = []
+
+    def _fake_get_session(**kwargs):
+        batches.append(kwargs["task_names"])
+        return {
+            "tasks": [
+                {
+                    "taskArn": task_arn,
+                    "lastStatus": "RUNNING",
+                    "healthStatus": "HEALTHY",
+                    "startedAt": datetime(2024, 5, 1, 12, 30),
+                    "taskDefinitionArn": "arn:aws:ecs:us-east-1:111111111111:task-definition/app:3",
+                    "availabilityZone": "us-east-1a",
+                    "enableExecuteCommand": True,
+                    "containers": [
+                        {
+                            "name": "app",
+                            "managedAgents": [{"name": "ExecuteCommandAgent", "lastStatus": "RUNNING"}],
+                        }
+                    ],
+                }
+                # The second task stopped since it was listed
+                for task_arn in kwargs["task_names"]
+                if not task_arn.endswith("task-1")
+            ]
+        }
+
+    monkeypatch.setattr(helpers, "get_session", _fake_get_session)
+    helpers.clear_describe_cache()
+    task_arns = [f"arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-{index}" for index in range(150)]
+
+    choices = helpers.get_task_choices("dev-profile", "cluster-a", task_arns)
+
+    assert [len(batch) for batch in batches] == [100]
+    assert choices[0] == {
+        "name": "task-0  RUNNING  HEALTHY  2024-05-01 12:30  app:3  us-east-1a  exec:RUNNING",
+        "value": task_arns[0],
+    }
+    assert choices[1] == {"name": "task-1", "value": task_arns[1]}
+    assert choices[149] == {"name": "task-149", "value": task_arns[149]}
+    assert helpers.get_container_name("dev-profile", "cluster-a", task_arns[42]) == ["app"]
+    assert len(batches) == 1
+    helpers.clear_describe_cache()
+
+
+def test_task_label_shows_disabled_exec():
+    label = helpers.get_task_label({"taskArn": TASK_ARN, "lastStatus": "PENDING", "enableExecuteCommand": False})
+
+    assert label == "task-1  PENDING  UNKNOWN  -  -  -  exec:disabled  [no exec]"
+
+
+def test_log_configuration_of_an_unknown_container_exits(api_calls):
+    arn = "arn:aws:ecs:us-east-1:111111111111:task-definition/app:3"
+
+    with pytest.raises(SystemExit):
+        helpers.get_log_configuration("dev-profile", "apq", arn)
@@ -0,0 +1,156 @@
+import io
+import json
+
+import boto3
+import pytest
+
+from botocore.awsrequest import AWSResponse
+
+from ecs_connect_cli import instrumentation
+
+
+class _RawResponse:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    def stream(self, **kwargs):
+        yield self._body
+
+
+@pytest.fixture
+def responses():
+    """Responses returned, in order, instead of sending the requests"""
+    return list()
+
+
+@pytest.fixture
+def ecs_client(responses):
+    instrumentation.clear()
+    client = boto3.client(
+        "ecs",
+        region_name="eu-west-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    instrumentation.instrument(client)
+
+    def _send(request, **kwargs):
+        status, body = responses.pop(0)
+        content = json.dumps(body).encode()
+        return AWSResponse(
+            request.url,
+            status,
+            {"content-length": str(len(content))},
+            _RawResponse(content),
+        )
+
+    client.meta.events.register("before-send", _send)
+    yield client
+    instrumentation.clear()
+
+
+def _call(**overrides) -> dict:
+    call = {
+        "service": "ecs",
+        "operation": "ListTasks",
+        "region": "eu-west-1",
+        "start_time": 1700000000.0,
+        "duration": 0.25,
+        "retries": 0,
+        "throttles": 0,
+        "request_bytes": 10,
+        "response_bytes": 100,
+        "status": 200,
+        "error": None,
+    }
+    call.update(overrides)
+    return call
+
+
+def test_instrument_records_calls_retries_and_throttles(ecs_client, responses):
+    responses.extend(
+        [
+            (200, {"clusterArns": []}),
+            (400, {"__type": "ThrottlingException", "message": "Rate exceeded"}),
+            (200, {"tasks": [], "failures": []}),
+        ]
+    )
+
+    ecs_client.list_clusters()
+    ecs_client.describe_tasks(cluster="my-cluster", tasks=["my-task"])
+
+    list_clusters, describe_tasks = instrumentation.get_calls()
+    assert list_clusters["operation"] == "ListClusters"
+    assert list_clusters["region"] == "eu-west-1"
+    assert list_clusters["status"] == 200
+    assert list_clusters["response_bytes"] == len(b'{"clusterArns": []}')
+    assert list_clusters["request_bytes"] > 0
+    assert describe_tasks["operation"] == "DescribeTasks"
+    assert describe_tasks["retries"] == 1
+    assert describe_tasks["throttles"] == 1
+    assert describe_tasks["error"] is None
+    assert describe_tasks["duration"] >= 0
+
+
+def test_instrument_records_failed_calls(ecs_client, responses):
+    responses.append(
+        (400, {"__type": "ClusterNotFoundException", "message": "Cluster not found."})
+    )
+
+    with pytest.raises(ecs_client.exceptions.ClusterNotFoundException):
+        ecs_client.list_services(cluster="missing")
+
+    (call,) = instrumentation.get_calls()
+    assert call["status"] == 400
+    assert call["error"] == "ClusterNotFoundException"
+
+
+def test_summarize_aggregates_per_operation_slowest_first():
+    calls = [
+        _call(duration=0.1),
+        _call(duration=0.3, retries=2, throttles=1, error="ThrottlingException"),
+        _call(operation="DescribeTasks", duration=1.0),
+    ]
+
+    summaries = instrumentation.summarize(calls)
+
+    assert [summary["operation"] for summary in summaries] == [
+        "DescribeTasks",
+        "ListTasks",
+    ]
+    assert summaries[1]["calls"] == 2
+    assert summaries[1]["total"] == pytest.approx(0.4)
+    assert summaries[1]["max"] == 0.3
+    assert summaries[1]["retries"] == 2
+    assert summaries[1]["throttles"] == 1
+    assert summaries[1]["errors"] == 1
+
+
+def test_export_calls_as_json_lines():
+    output = io.StringIO()
+
+    instrumentation.export_calls([_call(), _call(operation="DescribeTasks")], output)
+
+    lines = output.getvalue().splitlines()
+    assert [json.loads(line)["operation"] for line in lines] == [
+        "ListTasks",
+        "DescribeTasks",
+    ]
+
+
+def test_export_calls_as_otlp_spans():
+    output = io.StringIO()
+
+    instrumentation.export_calls(
+        [_call(), _call(status=400, error="ThrottlingException")], output, "otlp"
+    )
+
+    spans = json.loads(output.getvalue())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len({span["traceId"] for span in spans}) == 1
+    assert spans[0]["name"] == "ecs.ListTasks"
+    assert int(spans[0]["endTimeUnixNano"]) - int(spans[0]["startTimeUnixNano"]) == 250000000
+    assert {"key": "rpc.method", "value": {"stringValue": "ListTasks"}} in spans[0][
+        "attributes"
+    ]
+    assert spans[0]["status"] == {"code": 0}
+    assert spans[1]["status"] == {"code": 2, "message": "ThrottlingException"}
@@ -0,0 +1,139 @@
+import asyncio
+import io
+import json
+
+from ecs_connect_cli import async_helpers
+from ecs_connect_cli import inventory
+
+
+class _FakeEcsClient:
+    def __init__(self, service_count, tasks_per_service):
+        self.services = [f"service-{index}" for index in range(service_count)]
+        self.tasks = [
+            (service, f"task-{service}-{index}") for service in self.services for index in range(tasks_per_service)
+        ]
+        self.calls = []
+
+    def list_clusters(self, **kwargs):
+        self.calls.append("list_clusters")
+        return {"clusterArns": ["arn:aws:ecs:us-east-1:111111111111:cluster/cluster-a"]}
+
+    def list_services(self, **kwargs):
+        self.calls.append("list_services")
+        return {"serviceArns": [f"arn:aws:ecs:us-east-1:111111111111:service/cluster-a/{name}" for name in self.services]}
+
+    def list_tasks(self, **kwargs):
+        self.calls.append("list_tasks")
+        arns = [f"arn:aws:ecs:us-east-1:111111111111:task/cluster-a/{task}" for _, task in self.tasks]
+        arns.append("arn:aws:ecs:us-east-1:111111111111:task/cluster-a/standalone")
+        return {"taskArns": arns}
+
+    def describe_services(self, **kwargs):
+        self.calls.append("describe_services")
+        assert len(kwargs["services"]) <= 10
+        return {
+            "services": [
+                {
+                    "serviceName": arn.rpartition("/")[2],
+                    "status": "ACTIVE",
+                    "taskDefinition": "arn:aws:ecs:us-east-1:111111111111:task-definition/app:7",
+                    "launchType": "FARGATE",
+                    "enableExecuteCommand": True,
+                }
+                for arn in kwargs["services"]
+            ]
+        }
+
+    def describe_tasks(self, **kwargs):
+        self.calls.append("describe_tasks")
+        assert len(kwargs["tasks"]) <= 100
+        services = {task: service for service, task in self.tasks}
+        return {
+            "tasks": [
+                {
+                    "taskArn": arn,
+                    "group": f"service:{services[arn.rpartition('/')[2]]}"
+                    if arn.rpartition("/")[2] in services
+                    else "family:batch",
+                    "lastStatus": "RUNNING",
+                    "healthStatus": "HEALTHY",
+                    "taskDefinitionArn": "arn:aws:ecs:us-east-1:111111111111:task-definition/app:7",
+                    "launchType": "FARGATE",
+                    "containers": [{"name": "app"}, {"name": "sidecar"}],
+                }
+                for arn in kwargs["tasks"]
+            ]
+        }
+
+
+def test_collect_inventory_batches_describe_calls(monkeypatch):
+    client = _FakeEcsClient(service_count=25, tasks_per_service=6)
+    monkeypatch.setattr(async_helpers, "get_client", lambda profile, resource: client)
+
+    records = asyncio.run(inventory.collect_inventory("dev-profile"))
+
+    assert len(records) == 25 * 6 + 1
+    assert client.calls.count("describe_services") == 3
+    assert client.calls.count("describe_tasks") == 2
+    assert client.calls.count("list_tasks") == 1
+    assert records[0] == {
+        "cluster": "cluster-a",
+        "service": "service-0",
+        "task": "task-service-0-0",
+        "status": "RUNNING",
+        "health": "HEALTHY",
+        "revision": "app:7",
+        "launch_type": "FARGATE",
+        "containers": ["app", "sidecar"],
+        "exec": "execute command is enabled on service service-0 but not on task "
+        "task-service-0-0, force a new deployment",
+    }
+    assert records[-1]["task"] == "standalone" and records[-1]["service"] is None
+    assert records[-1]["exec"] == "execute command is not enabled on task standalone"
+
+
+def test_collect_inventory_lists_services_of_the_external_deployment_controller(monkeypatch):
+    client = _FakeEcsClient(service_count=1, tasks_per_service=0)
+    describe_services = client.describe_services
+
+    def _describe_external_services(**kwargs):
+        # The task definition belongs to the task sets of an EXTERNAL service
+        response = describe_services(**kwargs)
+        for service in response["services"]:
+            del service["taskDefinition"]
+        return response
+
+    client.describe_services = _describe_external_services
+    monkeypatch.setattr(async_helpers, "get_client", lambda profile, resource: client)
+
+    records = asyncio.run(inventory.collect_inventory("dev-profile"))
+
+    assert records[0]["service"] == "service-0"
+    assert records[0]["task"] is None and records[0]["revision"] == ""
+
+
+def test_write_inventory_as_json_and_csv():
+    records = [
+        {
+            "cluster": "cluster-a",
+            "service": "service-a",
+            "task": "task-1",
+            "status": "RUNNING",
+            "health": "HEALTHY",
+            "revision": "app:7",
+            "launch_type": "FARGATE",
+            "containers": ["app", "sidecar"],
+            "exec": "ready",
+        }
+    ]
+    json_output = io.StringIO()
+    csv_output = io.StringIO()
+
+    inventory.write_inventory(records, "json", json_output)
+    inventory.write_inventory(records, "csv", csv_output)
+
+    assert json.loads(json_output.getvalue()) == records
+    assert csv_output.getvalue().splitlines() == [
+        "cluster,service,task,status,health,revision,launch_type,containers,exec",
+        "cluster-a,service-a,task-1,RUNNING,HEALTHY,app:7,FARGATE,app sidecar,ready",
+    ]
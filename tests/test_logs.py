@@ -0,0 +1,220 @@
+import io
+
+from ecs_connect_cli import logs
+
+
+class _FakeLogsClient:
+    def __init__(self, responses):
+        self.responses = iter(responses)
+        self.calls = []
+
+    def filter_log_events(self, **kwargs):
+        self.calls.append(kwargs)
+        return next(self.responses)
+
+
+def _event(event_id, timestamp, message):
+    return {"eventId": event_id, "timestamp": timestamp, "message": message, "logStreamName": "ecs/app/task-1"}
+
+
+def test_iter_log_events_follows_next_token_and_dedupes(monkeypatch):
+    client = _FakeLogsClient(
+        [
+            {"events": [_event("1", 1000, "first"), _event("2", 2000, "second")], "nextToken": "page-2"},
+            {"events": [_event("3", 3000, "third")]},
+            # Next poll restarts from the last timestamp and gets event 3 again.
+            {"events": [_event("3", 3000, "third"), _event("4", 3000, "fourth")]},
+        ]
+    )
+    sleeps = []
+    monkeypatch.setattr(logs, "get_client", lambda profile, resource: client)
+    monkeypatch.setattr(logs.time, "sleep", sleeps.append)
+
+    events = logs.iter_log_events("dev-profile", "/ecs/app", start_time=0, batch_size=50, poll_min=1, poll_max=4)
+    messages = [next(events)["message"] for _ in range(4)]
+
+    assert messages == ["first", "second", "third", "fourth"]
+    assert client.calls[1]["nextToken"] == "page-2"
+    assert client.calls[2] == {"logGroupName": "/ecs/app", "limit": 50, "startTime": 3000}
+    assert sleeps == [1]
+
+
+def test_iter_log_events_backs_off_while_idle(monkeypatch):
+    client = _FakeLogsClient([{"events": []}] * 4 + [{"events": [_event("1", 1000, "late")]}])
+    sleeps = []
+    monkeypatch.setattr(logs, "get_client", lambda profile, resource: client)
+    monkeypatch.setattr(logs.time, "sleep", sleeps.append)
+
+    event = next(logs.iter_log_events("dev-profile", "/ecs/app", start_time=0, poll_min=1, poll_max=4))
+
+    assert event["message"] == "late"
+    assert sleeps == [2, 4, 4, 4]
+
+
+def test_seen_events_is_bounded():
+    seen = logs.SeenEvents(maxsize=2)
+
+    assert seen.add("1") and seen.add("2") and seen.add("3")
+    assert seen.add("3") is False
+    assert seen.add("1") is True
+
+
+def test_tail_log_events_writes_each_event():
+    output = io.StringIO()
+    logs.tail_log_events(iter([_event("1", 0, "hello\n")]), output=output)
+
+    assert output.getvalue() == "1970-01-01T00:00:00+00:00 ecs/app/task-1 hello\n"
+
+
+def test_build_log_sources_groups_streams_by_log_group(monkeypatch):
+    monkeypatch.setattr(logs, "get_client", lambda profile, resource: None)
+    monkeypatch.setattr(logs, "MAX_LOG_STREAMS", 2)
+
+    sources = logs.build_log_sources(
+        "dev-profile",
+        [
+            ("/ecs/app", "ecs/app/task-1"),
+            ("/ecs/app", "ecs/app/task-2"),
+            ("/ecs/app", "ecs/app/task-3"),
+            ("/ecs/sidecar", "ecs/sidecar/task-1"),
+            ("/ecs/legacy", None),
+        ],
+        start_time=0,
+    )
+
+    assert [(source.params["logGroupName"], source.params.get("logStreamNames")) for source in sources] == [
+        ("/ecs/app", ["ecs/app/task-1", "ecs/app/task-2"]),
+        ("/ecs/app", ["ecs/app/task-3"]),
+        ("/ecs/sidecar", ["ecs/sidecar/task-1"]),
+        ("/ecs/legacy", None),
+    ]
+
+
+def test_iter_merged_log_events_orders_events_across_sources(monkeypatch):
+    clients = iter(
+        [
+            _FakeLogsClient([{"events": [_event("a1", 1000, "app 1"), _event("a2", 3000, "app 2")]}]),
+            _FakeLogsClient([{"events": [_event("s1", 2000, "sidecar 1"), _event("s2", 4000, "sidecar 2")]}]),
+        ]
+    )
+    monkeypatch.setattr(logs, "get_client", lambda profile, resource: next(clients))
+    sources = logs.build_log_sources(
+        "dev-profile", [("/ecs/app", "ecs/app/task-1"), ("/ecs/sidecar", "ecs/sidecar/task-1")], start_time=0
+    )
+
+    events = logs.iter_merged_log_events(sources, follow=False)
+
+    assert [event["message"] for event in events] == ["app 1", "sidecar 1", "app 2", "sidecar 2"]
+    assert sources[0].params["logStreamNames"] == ["ecs/app/task-1"]
+
+
+class _FakeRangeLogsClient:
+    """Serve events of a fixed list according to startTime/endTime, both inclusive"""
+
+    def __init__(self, events):
+        self.events = events
+        self.calls = []
+
+    def filter_log_events(self, **kwargs):
+        self.calls.append(kwargs)
+        return {
+            "events": [
+                event for event in self.events if kwargs["startTime"] <= event["timestamp"] <= kwargs["endTime"]
+            ]
+        }
+
+
+def test_export_log_events_writes_slices_in_order(monkeypatch, tmp_path):
+    client = _FakeRangeLogsClient([_event(str(index), index * 1000, f"line {index}") for index in range(10)])
+    monkeypatch.setattr(logs, "get_client", lambda profile, resource: client)
+    output = tmp_path / "export.jsonl.gz"
+
+    count = logs.export_log_events(
+        "dev-profile",
+        [("/ecs/app", "ecs/app/task-1")],
+        start_time=0,
+        end_time=10000,
+        output_path=str(output),
+        slice_ms=3000,
+        concurrency=3,
+    )
+
+    with logs.gzip.open(output, "rt") as export_file:
+        messages = [logs.json.loads(line)["message"] for line in export_file]
+    assert count == 10
+    assert messages == [f"line {index}" for index in range(10)]
+    assert len(client.calls) == 4
+    assert not (tmp_path / "export.jsonl.gz.checkpoint").exists()
+
+
+def test_export_log_events_resumes_from_checkpoint(monkeypatch, tmp_path, capsys):
+    client = _FakeRangeLogsClient([_event(str(index), index * 1000, f"line {index}") for index in range(6)])
+    monkeypatch.setattr(logs, "get_client", lambda profile, resource: client)
+    output = tmp_path / "export.jsonl"
+    first_slice = '{"message": "line 0"}\n{"message": "line 1"}\n{"message": "line 2"}\n'
+    output.write_text(first_slice + '{"message": "partial')
+    (tmp_path / "export.jsonl.checkpoint").write_text(
+        logs.json.dumps(
+            {
+                "log_targets": [["/ecs/app", "ecs/app/task-1"]],
+                "start_time": 0,
+                "end_time": 6000,
+                "slice_ms": 3000,
+                "next_slice": 1,
+                "offset": len(first_slice),
+            }
+        )
+    )
+
+    count = logs.export_log_events(
+        "dev-profile",
+        [("/ecs/app", "ecs/app/task-1")],
+        start_time=60000,
+        end_time=66000,
+        output_path=str(output),
+        slice_ms=3000,
+    )
+
+    messages = [logs.json.loads(line)["message"] for line in output.read_text().splitlines()]
+    assert count == 3
+    assert messages == [f"line {index}" for index in range(6)]
+    assert [call["startTime"] for call in client.calls] == [3000]
+    assert "Resuming the export from 1970-01-01T00:00:00+00:00 to 1970-01-01T00:00:06+00:00" in capsys.readouterr().out
+
+
+def test_export_log_events_starts_over_when_the_checkpoint_range_differs(monkeypatch, tmp_path):
+    client = _FakeRangeLogsClient([_event(str(index), index * 1000, f"line {index}") for index in range(6)])
+    monkeypatch.setattr(logs, "get_client", lambda profile, resource: client)
+    output = tmp_path / "export.jsonl"
+    output.write_text('{"message": "stale"}\n')
+    (tmp_path / "export.jsonl.checkpoint").write_text(
+        logs.json.dumps(
+            {
+                "log_targets": [["/ecs/app", "ecs/app/task-1"]],
+                "start_time": 0,
+                "end_time": 3000,
+                "slice_ms": 3000,
+                "next_slice": 1,
+                "offset": len('{"message": "stale"}\n'),
+            }
+        )
+    )
+
+    count = logs.export_log_events(
+        "dev-profile",
+        [("/ecs/app", "ecs/app/task-1")],
+        start_time=0,
+        end_time=6000,
+        output_path=str(output),
+        slice_ms=3000,
+    )
+
+    messages = [logs.json.loads(line)["message"] for line in output.read_text().splitlines()]
+    assert count == 6
+    assert messages == [f"line {index}" for index in range(6)]
+    assert [call["startTime"] for call in client.calls] == [0, 3000]
+
+
+def test_parse_since_reads_utc_dates():
+    assert logs.parse_since("2024-01-02T10:30:00Z") == 1704191400000
+    assert logs.parse_since("2024-01-02T10:30:00") == 1704191400000
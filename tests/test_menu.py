@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from ecs_connect_cli import menu
+from ecs_connect_cli import prefetch
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setenv("ECS_CONNECT_CACHE_TTL_CLUSTERS", "0")
+    monkeypatch.setenv("ECS_CONNECT_CACHE_TTL_SERVICES", "0")
+    prefetch.clear()
+    yield
+    prefetch.clear()
+
+
+def test_make_choice_prefetches_services_of_first_clusters(monkeypatch):
+    loaded = []
+    done = threading.Event()
+
+    def _fake_get_service_name(profile, cluster_name):
+        loaded.append(cluster_name)
+        if len(loaded) == 2:
+            done.set()
+        return [f"{cluster_name}-service"]
+
+    monkeypatch.setenv("ECS_CONNECT_PREFETCH_LIMIT", "2")
+    monkeypatch.setattr(menu, "get_cluster_name", lambda profile: ["cluster-a", "cluster-b", "cluster-c"])
+    monkeypatch.setattr(menu, "get_service_name", _fake_get_service_name)
+
+    assert menu.make_choice(choice="cluster_name", profile="dev-profile") == [
+        "cluster-a",
+        "cluster-b",
+        "cluster-c",
+    ]
+    assert done.wait(timeout=5)
+    assert sorted(loaded) == ["cluster-a", "cluster-b"]
+
+    # Don't prefetch the tasks from AWS once the test is over
+    monkeypatch.setenv("ECS_CONNECT_PREFETCH_LIMIT", "0")
+    services = menu.make_choice(choice="service_name", profile="dev-profile", cluster_name="cluster-b")
+
+    assert services == ["cluster-b-service"]
+    assert sorted(loaded) == ["cluster-a", "cluster-b"]
+
+
+def test_make_choice_without_prefetch_loads_synchronously(monkeypatch):
+    monkeypatch.setenv("ECS_CONNECT_PREFETCH_LIMIT", "0")
+    monkeypatch.setattr(menu, "get_cluster_name", lambda profile: ["cluster-a"])
+    monkeypatch.setattr(menu, "get_service_name", lambda profile, cluster_name: pytest.fail("prefetched"))
+
+    assert menu.make_choice(choice="cluster_name", profile="dev-profile") == ["cluster-a"]
+
+
+def test_make_choice_pages_streams_then_caches_services(monkeypatch, tmp_path):
+    calls = []
+
+    def _fake_iter_pages(profile=None, resource=None, action=None, **params):
+        calls.append((action, params))
+        yield ["arn:aws:ecs:us-east-1:1:service/cluster-a/service-1"]
+        yield ["arn:aws:ecs:us-east-1:1:service/cluster-a/service-2"]
+
+    monkeypatch.setenv("ECS_CONNECT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("ECS_CONNECT_CACHE_TTL_SERVICES", "600")
+    monkeypatch.setenv("ECS_CONNECT_PREFETCH_LIMIT", "0")
+    monkeypatch.setattr(menu, "iter_pages", _fake_iter_pages)
+    monkeypatch.setattr(menu, "get_service_name", lambda profile, cluster_name: pytest.fail("listed twice"))
+
+    pages = menu.make_choice_pages(choice="service_name", profile="dev-profile", cluster_name="cluster-a")
+    assert calls == []
+
+    assert list(pages) == [["cluster-a/service-1"], ["cluster-a/service-2"]]
+    assert calls == [("list_services", {"cluster": "cluster-a"})]
+
+    cached_pages = menu.make_choice_pages(choice="service_name", profile="dev-profile", cluster_name="cluster-a")
+    assert list(cached_pages) == [["cluster-a/service-1", "cluster-a/service-2"]]
+    assert len(calls) == 1
+
+
+def test_make_choice_pages_labels_tasks_and_caches_their_arns(monkeypatch, tmp_path):
+    task_arn = "arn:aws:ecs:us-east-1:1:task/cluster-a/task-1"
+
+    def _fake_iter_pages(profile=None, resource=None, action=None, **params):
+        yield [task_arn]
+
+    monkeypatch.setenv("ECS_CONNECT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("ECS_CONNECT_CACHE_TTL_TASKS", "30")
+    monkeypatch.setenv("ECS_CONNECT_PREFETCH_LIMIT", "0")
+    monkeypatch.setattr(menu, "iter_pages", _fake_iter_pages)
+    monkeypatch.setattr(
+        menu,
+        "get_task_choices",
+        lambda profile, cluster_name, task_arns: [
+            {"name": f"{arn.rpartition('/')[2]}  RUNNING", "value": arn} for arn in task_arns
+        ],
+    )
+    monkeypatch.setattr(menu, "get_task_arn", lambda *args: pytest.fail("listed twice"))
+
+    pages = menu.make_choice_pages(
+        choice="task_arn", profile="dev-profile", cluster_name="cluster-a", service_name="service-a"
+    )
+    cached_pages = menu.make_choice_pages(
+        choice="task_arn", profile="dev-profile", cluster_name="cluster-a", service_name="service-a"
+    )
+
+    assert list(pages) == [[{"name": "task-1  RUNNING", "value": task_arn}]]
+    assert list(cached_pages) == [[{"name": "task-1  RUNNING", "value": task_arn}]]
+
+
+def test_menus_held_by_the_daemon_are_not_fetched(monkeypatch):
+    monkeypatch.setenv("ECS_CONNECT_PREFETCH_LIMIT", "0")
+    monkeypatch.setattr(
+        menu.daemon,
+        "query",
+        lambda choice, profile, cluster_name, service_name, task_name: ["cluster-a/service-1"],
+    )
+    monkeypatch.setattr(menu, "iter_pages", lambda **kwargs: pytest.fail("listed from AWS"))
+    monkeypatch.setattr(menu, "get_service_name", lambda profile, cluster_name: pytest.fail("listed from AWS"))
+
+    pages = menu.make_choice_pages(choice="service_name", profile="dev-profile", cluster_name="cluster-a")
+
+    assert list(pages) == [["cluster-a/service-1"]]
+    assert menu.make_choice(choice="service_name", profile="dev-profile", cluster_name="cluster-a") == [
+        "cluster-a/service-1"
+    ]
@@ -0,0 +1,113 @@
+import random
+import statistics
+import time
+
+import pytest
+
+from ecs_connect_cli import picker
+from ecs_connect_cli.picker import NameIndex
+
+
+@pytest.fixture(autouse=True)
+def home(monkeypatch, tmp_path):
+    # EchoPrompt keeps its config.toml and history under HOME
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+
+def _service_names(count):
+    generator = random.Random(42)
+    words = "api billing worker auth gateway payments orders search users reports cache queue sync".split()
+    envs = "prod staging dev qa sandbox".split()
+    return [
+        f"{generator.choice(envs)}-{generator.choice(words)}-{generator.choice(words)}-{index:05d}"
+        for index in range(count)
+    ]
+
+
+def test_search_ranks_prefix_then_substring_then_fuzzy_matches():
+    index = NameIndex(["staging-api", "api-gateway", "auth-proxy", "dev-api"])
+    index.add(["app-importer"])
+
+    names = [index.names[name_id] for name_id in index.search("API")]
+
+    assert names == ["api-gateway", "staging-api", "dev-api", "app-importer"]
+    assert index.positions(4, "api") == [0, 1, 4]
+
+
+def test_search_narrows_incrementally_and_respects_limit():
+    index = NameIndex(_service_names(1000))
+
+    fuzzy = index.search("prdbill")
+    narrowed = index.search("prdbilling")
+
+    assert set(narrowed) <= set(fuzzy)
+    assert narrowed
+    assert all(picker._subsequence_positions("prdbilling", index._lowered[name_id]) for name_id in narrowed)
+    assert len(index.search("a", limit=10)) == 10
+    assert index.search("zzz") == []
+
+
+def test_search_keystroke_latency_on_10k_names():
+    index = NameIndex()
+    names = _service_names(10000)
+    for start in range(0, len(names), 100):
+        index.add(names[start : start + 100])
+
+    timings = list()
+    for query in ("prod-billing", "paymnts", "qa-cache-q", "wrkr"):
+        for length in range(1, len(query) + 1):
+            best = None
+            previous = index._last
+            for _ in range(3):
+                # Replay the same keystroke, from the state of the previous one
+                index._last = previous
+                started = time.perf_counter()
+                index.search(query[:length], picker.DEFAULT_PICKER_LIMIT)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+
+    assert statistics.median(timings) < 0.001
+
+
+def test_prompt_choice_keeps_plain_menu_for_short_lists(monkeypatch):
+    prompted = []
+    monkeypatch.setattr(
+        picker.EchoPrompt, "prompt_choice", lambda self, name, choices: prompted.append(choices) or choices[0]
+    )
+    monkeypatch.setattr(picker, "IndexedFuzzyPrompt", lambda **_kwargs: pytest.fail("fuzzy picker used"))
+
+    prompt = picker.PickerPrompt("ecs-connect-test")
+
+    assert prompt.prompt_choice("cluster_name", iter([["cluster-a"], ["cluster-b"]])) == "cluster-a"
+    assert prompted == [["cluster-a", "cluster-b"]]
+
+
+def test_prompt_choice_switches_to_fuzzy_picker_with_remaining_pages(monkeypatch):
+    created = {}
+
+    class _FakeFuzzyPrompt:
+        def __init__(self, message, choices, pages):
+            created.update(message=message, choices=list(choices), pages=list(pages))
+
+        def execute(self):
+            return "service-7"
+
+    monkeypatch.setenv("ECS_CONNECT_PICKER_THRESHOLD", "5")
+    monkeypatch.setattr(picker, "IndexedFuzzyPrompt", _FakeFuzzyPrompt)
+    prompt = picker.PickerPrompt("ecs-connect-test")
+    prompt.history.set("service_name", "service-3")
+
+    pages = iter([[f"service-{index}" for index in range(start, start + 4)] for start in (0, 4, 8)])
+
+    assert prompt.prompt_choice("service_name", pages) == "service-7"
+    assert created["message"] == "Service Name"
+    assert created["choices"] == ["service-3", "service-0", "service-1", "service-2"] + [
+        "service-4",
+        "service-5",
+        "service-6",
+        "service-7",
+    ]
+    assert created["pages"] == [["service-8", "service-9", "service-10", "service-11"]]
+    assert prompt.history.get("service_name") == "service-7"
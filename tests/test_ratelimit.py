@@ -0,0 +1,46 @@
+from ecs_connect_cli.ratelimit import TokenBucket
+from ecs_connect_cli.ratelimit import get_rate_limiter
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.now += delay
+
+
+def test_token_bucket_waits_for_refill_once_the_burst_is_spent():
+    clock = _FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        bucket.acquire()
+
+    assert clock.now == 1.0
+
+
+def test_token_bucket_without_rate_never_blocks():
+    assert TokenBucket(rate=0).try_acquire(100) == 0
+
+
+def test_rate_limiter_is_shared_by_profile(monkeypatch):
+    monkeypatch.setenv("ECS_CONNECT_RATE_LIMIT", "3")
+
+    bucket = get_rate_limiter("test-ratelimit-profile")
+
+    assert bucket is get_rate_limiter("test-ratelimit-profile")
+    assert bucket.rate == 3
+
+
+def test_rate_limiter_rate_can_be_changed(monkeypatch):
+    monkeypatch.setenv("ECS_CONNECT_RATE_BURST", "5")
+
+    bucket = get_rate_limiter("test-ratelimit-rate-profile")
+    get_rate_limiter("test-ratelimit-rate-profile", 0)
+
+    assert bucket.capacity == 5
+    assert bucket.rate == 0
@@ -0,0 +1,52 @@
+import pytest
+
+from ecs_connect_cli import readiness
+
+
+def _task(agent_status="RUNNING", **overrides):
+    task = {
+        "taskArn": "arn:aws:ecs:us-east-1:111111111111:task/cluster-a/task-1",
+        "lastStatus": "RUNNING",
+        "enableExecuteCommand": True,
+        "containers": [
+            {"name": "sidecar"},
+            {
+                "name": "app",
+                "managedAgents": [{"name": "ExecuteCommandAgent", "lastStatus": agent_status}],
+            },
+        ],
+    }
+    task.update(overrides)
+    return task
+
+
+def test_running_task_with_running_agent_is_ready():
+    assert readiness.get_exec_problems(_task(), "app") == []
+    readiness.check_exec_readiness(_task())
+
+
+def test_agent_not_running_is_reported():
+    assert readiness.get_exec_problems(_task("PENDING")) == [
+        "ExecuteCommandAgent of task task-1 is PENDING, not RUNNING"
+    ]
+    assert readiness.get_exec_problems(_task(), "sidecar") == [
+        "ExecuteCommandAgent of task task-1 is UNKNOWN, not RUNNING"
+    ]
+
+
+def test_stopping_task_and_missing_container_are_reported():
+    with pytest.raises(readiness.ExecNotReady) as error:
+        readiness.check_exec_readiness(_task(lastStatus="DEACTIVATING"), "worker")
+
+    assert str(error.value) == "task task-1 is DEACTIVATING; task task-1 has no container worker"
+
+
+def test_service_with_exec_enabled_hints_a_new_deployment():
+    problems = readiness.get_exec_problems(
+        _task(enableExecuteCommand=False),
+        service={"serviceName": "api", "enableExecuteCommand": True},
+    )
+
+    assert problems == [
+        "execute command is enabled on service api but not on task task-1, force a new deployment"
+    ]
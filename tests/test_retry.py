@@ -0,0 +1,94 @@
+import json
+
+import boto3
+
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+
+from ecs_connect_cli import retry
+
+
+class _RawResponse:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    def stream(self, **kwargs):
+        yield self._body
+
+
+class _CountingBucket:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, tokens=1.0):
+        self.acquired += 1
+
+
+def _client(resource, responses):
+    client = boto3.client(
+        resource,
+        region_name="eu-west-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        config=Config(retries=retry.get_retry_config()),
+    )
+
+    def _send(request, **kwargs):
+        status, body = responses.pop(0)
+        return AWSResponse(request.url, status, {}, _RawResponse(json.dumps(body).encode()))
+
+    client.meta.events.register("before-send", _send)
+    return client
+
+
+def test_retry_config_defaults_to_adaptive_mode(monkeypatch):
+    monkeypatch.setenv("ECS_CONNECT_RETRY_MODE", "unknown")
+    monkeypatch.setenv("ECS_CONNECT_MAX_ATTEMPTS", "0")
+
+    assert retry.get_retry_config() == {"mode": "adaptive", "max_attempts": 1}
+
+    monkeypatch.setenv("ECS_CONNECT_RETRY_MODE", "standard")
+    monkeypatch.delenv("ECS_CONNECT_MAX_ATTEMPTS")
+
+    assert retry.get_retry_config() == {
+        "mode": "standard",
+        "max_attempts": retry.DEFAULT_MAX_ATTEMPTS,
+    }
+
+
+def test_throttled_call_is_retried_instead_of_failing(monkeypatch):
+    monkeypatch.delenv("ECS_CONNECT_RETRY_MODE", raising=False)
+    monkeypatch.delenv("AWS_RETRY_MODE", raising=False)
+    responses = [
+        (400, {"__type": "ThrottlingException", "message": "Rate exceeded"}),
+        (200, {"clusterArns": ["arn:aws:ecs:eu-west-1:1:cluster/main"]}),
+    ]
+    client = _client("ecs", responses)
+
+    response = client.list_clusters()
+
+    assert response["clusterArns"] == ["arn:aws:ecs:eu-west-1:1:cluster/main"]
+    assert response["ResponseMetadata"]["RetryAttempts"] == 1
+
+
+def test_limit_rate_shares_the_bucket_of_a_profile(monkeypatch):
+    buckets = {"dev": _CountingBucket(), "prod": _CountingBucket()}
+    monkeypatch.setattr(retry, "get_rate_limiter", lambda profile: buckets[profile])
+    responses = [
+        (200, {"clusterArns": []}),
+        (200, {"logGroups": []}),
+        (200, {"clusterArns": []}),
+    ]
+    dev_ecs = _client("ecs", responses)
+    dev_logs = _client("logs", responses)
+    prod_ecs = _client("ecs", responses)
+    retry.limit_rate(dev_ecs, "dev")
+    retry.limit_rate(dev_logs, "dev")
+    retry.limit_rate(prod_ecs, "prod")
+
+    dev_ecs.list_clusters()
+    dev_logs.describe_log_groups()
+    prod_ecs.list_clusters()
+
+    assert buckets["dev"].acquired == 2
+    assert buckets["prod"].acquired == 1
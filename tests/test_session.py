@@ -0,0 +1,110 @@
+import boto3
+import pytest
+
+from ecs_connect_cli import session
+
+
+class _FakeBoto3Session:
+    created = 0
+
+    def __init__(self, profile_name=None, region_name=None):
+        _FakeBoto3Session.created += 1
+        self.profile_name = profile_name
+        self.region_name = region_name
+
+    def client(self, resource, **kwargs):
+        return {"resource": resource, "session": self, **kwargs}
+
+
+@pytest.fixture(autouse=True)
+def fake_boto3(monkeypatch):
+    _FakeBoto3Session.created = 0
+    monkeypatch.setattr(boto3, "Session", _FakeBoto3Session)
+    monkeypatch.setattr(session, "limit_rate", lambda client, profile: None)
+    monkeypatch.delenv("ECS_CONNECT_AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    session.clear_clients()
+    yield
+    session.clear_clients()
+
+
+def test_get_client_reuses_session_and_client():
+    ecs = session.get_client("dev-profile", "ecs", region_name="us-east-1")
+    logs = session.get_client("dev-profile", "logs", region_name="us-east-1")
+
+    assert session.get_client("dev-profile", "ecs", region_name="us-east-1") is ecs
+    assert logs["session"] is ecs["session"]
+    assert _FakeBoto3Session.created == 1
+
+
+def test_get_client_is_keyed_by_region_and_endpoint(monkeypatch):
+    ecs = session.get_client("dev-profile", "ecs", region_name="us-east-1")
+    other_region = session.get_client("dev-profile", "ecs", region_name="eu-west-1")
+    monkeypatch.setenv("ECS_CONNECT_AWS_ENDPOINT_URL", "http://localhost:4566")
+    local = session.get_client("dev-profile", "ecs", region_name="us-east-1")
+
+    assert other_region is not ecs
+    assert local is not ecs
+    assert local["endpoint_url"] == "http://localhost:4566"
+
+
+def test_get_client_uses_configured_pool_size(monkeypatch):
+    monkeypatch.setenv("ECS_CONNECT_MAX_POOL_CONNECTIONS", "42")
+    client = session.get_client("EC2_INSTANCE_METADATA", "ecs", region_name="us-east-1")
+
+    assert client["config"].max_pool_connections == 42
+    assert client["session"].profile_name is None
+
+
+def test_get_client_retries_throttled_calls(monkeypatch):
+    monkeypatch.setenv("ECS_CONNECT_MAX_ATTEMPTS", "5")
+    monkeypatch.delenv("ECS_CONNECT_RETRY_MODE", raising=False)
+    monkeypatch.delenv("AWS_RETRY_MODE", raising=False)
+    client = session.get_client("dev-profile", "ecs", region_name="us-east-1")
+
+    assert client["config"].retries == {"mode": "adaptive", "max_attempts": 5}
+
+
+class _FakePaginator:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def paginate(self, **kwargs):
+        self.calls.append(kwargs)
+        yield from self.pages
+
+
+def test_iter_pages_streams_every_page(monkeypatch):
+    paginator = _FakePaginator(
+        [{"serviceArns": ["arn/service-a", "arn/service-b"]}, {"serviceArns": ["arn/service-c"]}]
+    )
+    fake_client = type("FakeClient", (), {"get_paginator": lambda self, action: paginator})()
+    monkeypatch.setattr(session, "get_client", lambda *_args, **_kwargs: fake_client)
+    monkeypatch.setenv("ECS_CONNECT_MAX_ITEMS", "500")
+
+    pages = session.iter_pages("dev-profile", "ecs", "list_services", cluster="cluster-a")
+
+    assert next(pages) == ["arn/service-a", "arn/service-b"]
+    assert next(pages) == ["arn/service-c"]
+    assert paginator.calls == [{"cluster": "cluster-a", "PaginationConfig": {"MaxItems": 500, "PageSize": 100}}]
+
+
+def test_get_session_list_action_collects_all_pages(monkeypatch):
+    paginator = _FakePaginator([{"clusterArns": ["arn/cluster-a"]}, {"clusterArns": ["arn/cluster-b"]}])
+    fake_client = type("FakeClient", (), {"get_paginator": lambda self, action: paginator})()
+    monkeypatch.setattr(session, "get_client", lambda *_args, **_kwargs: fake_client)
+
+    response = session.get_session(profile="dev-profile", resource="ecs", action="list_clusters")
+
+    assert response == {"clusterArns": ["arn/cluster-a", "arn/cluster-b"]}
+
+
+def test_get_config_region_reads_the_profile(monkeypatch, tmp_path):
+    config = tmp_path / "config"
+    config.write_text("[default]\nregion = us-east-1\n\n[profile dev-profile]\nregion = eu-west-1\n")
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(config))
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "ap-south-1")
+
+    assert session.get_config_region("dev-profile") == "eu-west-1"
+    assert session.get_config_region("EC2_INSTANCE_METADATA") == "us-east-1"
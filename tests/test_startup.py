@@ -0,0 +1,70 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Seconds allowed to import the cli, ECS_CONNECT_STARTUP_BUDGET overrides it
+# on slow machines.
+STARTUP_BUDGET = float(os.getenv("ECS_CONNECT_STARTUP_BUDGET", "0.5"))
+# Modules only needed once a command calls AWS or prompts
+DEFERRED_MODULES = (
+    "asyncio",
+    "boto3",
+    "botocore",
+    "deepdiff",
+    "InquirerPy",
+    "prompt_toolkit",
+)
+
+_STARTUP_SCRIPT = """
+import json
+import sys
+import time
+
+started = time.perf_counter()
+from ecs_connect_cli import cli
+elapsed = time.perf_counter() - started
+
+for args in (["--version"], ["--help"], ["logs", "--help"]):
+    try:
+        cli.app(args=args, prog_name="ecs-connect-cli")
+    except SystemExit:
+        pass
+
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _cold_start() -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", _STARTUP_SCRIPT],
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.PIPE,
+        check=True,
+        text=True,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def test_help_and_version_do_not_import_deferred_modules():
+    modules = set(_cold_start()["modules"])
+
+    assert [name for name in DEFERRED_MODULES if name in modules] == []
+
+
+@pytest.mark.skipif(
+    platform.python_implementation() != "CPython",
+    reason="the budget is set for CPython, other interpreters import slower",
+)
+def test_cli_import_stays_within_startup_budget():
+    # Best of three runs, to ignore a busy machine
+    elapsed = min(_cold_start()["elapsed"] for _ in range(3))
+
+    assert elapsed < STARTUP_BUDGET